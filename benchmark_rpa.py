@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ponta a ponta do RPA contra o portal simulado
+Sobe o portal_simulado.py localmente, gera uma planilha sintética e emite as notas com o
+Chrome em modo headless, reportando notas/minuto e a latência por nota (p50/p95).
+
+Uso:
+    python benchmark_rpa.py --notas 50 --latencia-ms 150
+    python benchmark_rpa.py --comparar-perfis padrao desempenho   # carga da página e memória
+    python benchmark_rpa.py --notas 50 --lote --saida resultado.json
+    python benchmark_rpa.py --notas 500 --http   # envio direto por POST JSF após abrir a página
+    python benchmark_rpa.py --notas 20 --minimo-notas-min 10   # falha (código 1) abaixo do limite
+    python benchmark_rpa.py --enderecos 100000   # custo por linha da decomposição do endereço, sem Chrome
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import pandas as pd
+
+from endereco import extrair_endereco, extrair_enderecos_serie
+from envio_http import EnvioHTTP, ENVIO_EMITIDA
+from nota_fiscal import notas_do_dataframe
+from perfis_navegador import PERFIS_NAVEGADOR
+from portal_simulado import MUNICIPIOS_BASE, PortalSimulado
+from rastreamento import Rastreador
+from rede_cdp import percentil
+from rpa_notas_fiscais import RPANotasFiscais
+from validacao import normalizar_planilha
+
+# psutil é opcional: sem ele a memória vem apenas do heap JS (CDP Performance.getMetrics)
+try:
+    import psutil
+    PSUTIL_DISPONIVEL = True
+except ImportError:
+    PSUTIL_DISPONIVEL = False
+
+NOMES = ['Abigail', 'Adriana', 'Ana', 'Bruno', 'Carla', 'Daniel', 'Elisa', 'Fabio', 'Gabriela', 'Heitor']
+PETS = ['Lorenzo', 'Maggie', 'Thunder', 'Mel', 'Bob', 'Luna', 'Thor', 'Nina']
+ITENS = ['CONSULTA', 'VACINA V10', 'BANHO E TOSA', 'EXAME DE SANGUE', 'CASTRACAO']
+ENDERECOS = ['R DAS FLORES, 123', 'AV BRASIL, 1500', 'AL SANTOS, 45', 'JD PAULISTA, 10']
+# Formatos variados para o benchmark de endereços (prefixos novos, sem vírgula, sem número, vazios)
+FORMATOS_ENDERECO = ['R DAS FLORES, {}', 'AV BRASIL, {}', 'AL SANTOS, {} AP 12', 'JD PAULISTA, {}',
+                     'TRAV DAS PALMEIRAS, {} FUNDOS', 'ROD ANHANGUERA, {}', 'EST VELHA,{}', 'PC DA SE, {}',
+                     'AV PAULISTA {}', 'RUA SEM NUMERO', '  R AUGUSTA,{}  ', None, '']
+
+
+def gerar_cpf(rng):
+    """Gera um CPF com dígitos verificadores válidos"""
+    digitos = [rng.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        digitos.append(soma * 10 % 11 % 10)
+    return ''.join(map(str, digitos))
+
+
+def gerar_notas_sinteticas(quantidade, recorrentes=0.3, semente=42):
+    """
+    Gera uma planilha sintética no formato esperado pelo RPA
+
+    Args:
+        quantidade (int): Número de notas
+        recorrentes (float): Fração de notas de tomadores que já aparecem antes (AJAX do CPF preenche)
+        semente (int): Semente do gerador, para execuções comparáveis
+
+    Returns:
+        pd.DataFrame: Colunas Data, Nome_Cliente, CPF, Nome_Pet, Nome_Item, Valor, Endereco, Cidade
+    """
+    rng = random.Random(semente)
+    cidades = [nome for _, nome in MUNICIPIOS_BASE['SP']]
+    tomadores = []
+    linhas = []
+    for _ in range(quantidade):
+        if tomadores and rng.random() < recorrentes:
+            tomador = rng.choice(tomadores)
+        else:
+            tomador = {
+                'Nome_Cliente': rng.choice(NOMES),
+                'CPF': gerar_cpf(rng),
+                'Nome_Pet': rng.choice(PETS),
+                'Endereco': rng.choice(ENDERECOS),
+                'Cidade': rng.choice(cidades),
+            }
+            tomadores.append(tomador)
+        linhas.append(dict(
+            tomador,
+            Data=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/25",
+            Nome_Item=rng.choice(ITENS),
+            Valor=round(rng.uniform(50, 500), 2),
+        ))
+    return pd.DataFrame(linhas, columns=['Data', 'Nome_Cliente', 'CPF', 'Nome_Pet', 'Nome_Item',
+                                         'Valor', 'Endereco', 'Cidade'])
+
+
+JS_TEMPO_CARREGAMENTO = """
+var nav = performance.getEntriesByType('navigation')[0];
+var recursos = performance.getEntriesByType('resource');
+return {
+    carga_ms: nav.loadEventEnd - nav.startTime,
+    dom_ms: nav.domContentLoadedEventEnd - nav.startTime,
+    recursos: recursos.length,
+    bytes: recursos.reduce(function(total, r) { return total + (r.transferSize || 0); }, nav.transferSize || 0)
+};
+"""
+
+
+def memoria_chrome(driver):
+    """
+    Mede a memória da sessão do Chrome
+
+    Returns:
+        dict: rss_total_mb e processos (psutil, árvore do chromedriver) e heap_js_mb (CDP)
+    """
+    memoria = {'rss_total_mb': None, 'processos': None, 'heap_js_mb': None}
+    if PSUTIL_DISPONIVEL:
+        try:
+            raiz = psutil.Process(driver.service.process.pid)
+            processos = [p for p in raiz.children(recursive=True) if 'chrom' in p.name().lower()]
+            memoria['rss_total_mb'] = sum(p.memory_info().rss for p in processos) / 1024 ** 2
+            memoria['processos'] = len(processos)
+        except (psutil.Error, AttributeError):
+            pass
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+        metricas = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        heap = next((m['value'] for m in metricas if m['name'] == 'JSHeapUsedSize'), None)
+        memoria['heap_js_mb'] = heap / 1024 ** 2 if heap is not None else None
+    except Exception:
+        pass
+    return memoria
+
+
+def medir_perfil(url, perfil, recargas=5, cliente='cliente_a', headless=False):
+    """Inicia o Chrome com o perfil, recarrega a página e mede carga e memória"""
+    rpa = RPANotasFiscais(url, 'planilha_sintetica.xlsx', cliente, delay=0,
+                          headless=headless, perfil_navegador=perfil,
+                          caminho_tempos=None, caminho_catalogo=None, caminho_cache_cpf=None)
+    inicio = time.perf_counter()
+    rpa.configurar_driver()
+    tempo_inicializacao = time.perf_counter() - inicio
+
+    cargas = []
+    try:
+        for _ in range(recargas):
+            rpa.driver.get(url)
+            cargas.append(rpa.driver.execute_script(JS_TEMPO_CARREGAMENTO))
+        memoria = memoria_chrome(rpa.driver)
+    finally:
+        rpa.driver.quit()
+
+    tempos = [carga['carga_ms'] for carga in cargas]
+    return dict(
+        memoria,
+        perfil=perfil,
+        inicializacao_s=round(tempo_inicializacao, 3),
+        carga_p50_ms=round(percentil(tempos, 50), 1),
+        carga_p95_ms=round(percentil(tempos, 95), 1),
+        recursos=cargas[-1]['recursos'] if cargas else 0,
+        kb_por_carga=round(cargas[-1]['bytes'] / 1024, 1) if cargas else 0.0,
+    )
+
+
+def comparar_perfis(perfis, recargas=5, latencia_ms=150, cliente='cliente_a', headless=False):
+    """Mede cada perfil contra o mesmo portal simulado"""
+    with PortalSimulado(latencia_ajax_ms=latencia_ms) as portal:
+        return [medir_perfil(portal.url, perfil, recargas, cliente, headless) for perfil in perfis]
+
+
+def mostrar_comparacao_perfis(medicoes):
+    formatar = lambda valor, formato: format(valor, formato) if valor is not None else '-'
+    print("\n" + "=" * 96)
+    print("🧭 COMPARAÇÃO DE PERFIS DO NAVEGADOR")
+    print("=" * 96)
+    print(f"{'Perfil':<12} {'Boot':>7} {'Carga p50':>10} {'Carga p95':>10} {'Recursos':>9} "
+          f"{'KB/carga':>9} {'RSS total':>10} {'Processos':>9} {'MB/proc':>8} {'Heap JS':>8}")
+    for m in medicoes:
+        por_processo = m['rss_total_mb'] / m['processos'] if m['rss_total_mb'] and m['processos'] else None
+        print(f"{m['perfil']:<12} {m['inicializacao_s']:>6.2f}s {m['carga_p50_ms']:>8.0f}ms "
+              f"{m['carga_p95_ms']:>8.0f}ms {m['recursos']:>9} {m['kb_por_carga']:>9.0f} "
+              f"{formatar(m['rss_total_mb'], '.0f'):>8}MB {formatar(m['processos'], 'd'):>9} "
+              f"{formatar(por_processo, '.0f'):>8} {formatar(m['heap_js_mb'], '.1f'):>6}MB")
+    print("=" * 96)
+    if not PSUTIL_DISPONIVEL:
+        print("💡 Instale psutil para medir a memória (RSS) dos processos do Chrome")
+
+
+def executar_benchmark(notas=20, latencia_ms=150, cliente='cliente_a', lote=False, headless=True,
+                       recorrentes=0.3, semente=42, caminho_trace=None, perfil='padrao', http=False,
+                       diferencial=False):
+    """
+    Emite as notas sintéticas no portal simulado e mede o desempenho
+
+    Returns:
+        dict: Resumo com notas/minuto, latências p50/p95 e contagem de sucessos
+    """
+    df_dados = normalizar_planilha(gerar_notas_sinteticas(notas, recorrentes, semente))
+    rastreador = Rastreador(caminho_trace) if caminho_trace else None
+
+    with PortalSimulado(latencia_ajax_ms=latencia_ms) as portal:
+        rpa = RPANotasFiscais(portal.url, 'planilha_sintetica.xlsx', cliente, delay=0,
+                              preenchimento_lote=lote, dados=df_dados, headless=headless,
+                              rastreador=rastreador, perfil_navegador=perfil,
+                              preenchimento_diferencial=diferencial,
+                              # Tempos, municípios e CPFs do portal simulado não devem alimentar os da produção
+                              caminho_tempos=None, caminho_catalogo=None, caminho_cache_cpf=None)
+        registros = notas_do_dataframe(rpa.ler_dados_excel())
+
+        inicio_driver = time.perf_counter()
+        rpa.configurar_driver()
+        rpa.navegar_para_site()
+        rpa.atualizar_catalogo_municipios()
+        if http:
+            rpa.sessao_http = EnvioHTTP.capturar_do_navegador(rpa.driver)
+        tempo_inicializacao = time.perf_counter() - inicio_driver
+
+        tempos = []
+        sucessos = 0
+        inicio = time.perf_counter()
+        try:
+            for index, nota in enumerate(registros):
+                inicio_nota = time.perf_counter()
+                if http:
+                    ok = rpa.emitir_nota_http(None, None, index + 1, nota)['status'] == ENVIO_EMITIDA
+                else:
+                    ok = rpa.preencher_nota(nota) and rpa.emitir_nota()
+                tempos.append(time.perf_counter() - inicio_nota)
+                sucessos += bool(ok)
+                print(f"  {'✅' if ok else '❌'} Nota {index + 1}/{len(registros)} em {tempos[-1]:.2f}s")
+        finally:
+            tempo_total = time.perf_counter() - inicio
+            if rpa.sessao_http:
+                rpa.sessao_http.fechar()
+            rpa.driver.quit()
+
+        emitidas_portal = len(portal.estado.notas_emitidas)
+        rede = rpa.rede.estatisticas() if rpa.rede and rpa.rede.disponivel else None
+
+    if rastreador:
+        rastreador.finalizar()
+
+    return {
+        'notas': notas,
+        'sucessos': sucessos,
+        'emitidas_no_portal': emitidas_portal,
+        'modo': ('http' if http else 'lote' if lote else 'campo a campo') + (' (diferencial)' if diferencial else ''),
+        'perfil': perfil,
+        'latencia_ajax_ms': latencia_ms,
+        'tempo_inicializacao_s': round(tempo_inicializacao, 3),
+        'tempo_total_s': round(tempo_total, 3),
+        'notas_por_minuto': round(sucessos / tempo_total * 60, 2) if tempo_total else 0.0,
+        'p50_s': round(percentil(tempos, 50), 3),
+        'p95_s': round(percentil(tempos, 95), 3),
+        'max_s': round(max(tempos), 3) if tempos else 0.0,
+        'ajax': rede,
+        'esperas': rpa.tempo.valores_aprendidos(),
+    }
+
+
+def medir_enderecos(quantidade=100000, semente=42):
+    """
+    Compara a decomposição do endereço linha a linha com a vetorizada sobre a mesma coluna
+
+    Returns:
+        dict: Tempo total e por linha de cada abordagem e se os resultados coincidem
+    """
+    rng = random.Random(semente)
+    formatos = [rng.choice(FORMATOS_ENDERECO) for _ in range(quantidade)]
+    serie = pd.Series([formato.format(rng.randint(1, 3000)) if formato else formato for formato in formatos],
+                      dtype=object)
+
+    inicio = time.perf_counter()
+    por_linha = [extrair_endereco(str(endereco)) if endereco is not None and str(endereco).strip() else ('', '', '')
+                 for endereco in serie.tolist()]
+    tempo_por_linha = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vetorizado = extrair_enderecos_serie(serie)
+    tempo_vetorizado = time.perf_counter() - inicio
+
+    return {
+        'linhas': quantidade,
+        'enderecos_distintos': int(serie.nunique()),
+        'por_linha_s': round(tempo_por_linha, 4),
+        'vetorizado_s': round(tempo_vetorizado, 4),
+        'por_linha_us_linha': round(tempo_por_linha / quantidade * 1e6, 3),
+        'vetorizado_us_linha': round(tempo_vetorizado / quantidade * 1e6, 3),
+        'resultados_iguais': por_linha == list(vetorizado.itertuples(index=False, name=None)),
+    }
+
+
+def mostrar_medicao_enderecos(medicao):
+    print("\n" + "=" * 60)
+    print(f"🏠 DECOMPOSIÇÃO DE ENDEREÇOS ({medicao['linhas']} linhas, {medicao['enderecos_distintos']} distintos)")
+    print("=" * 60)
+    print(f"Linha a linha: {medicao['por_linha_s']:.3f}s ({medicao['por_linha_us_linha']:.2f}µs/linha)")
+    print(f"Vetorizada:    {medicao['vetorizado_s']:.3f}s ({medicao['vetorizado_us_linha']:.2f}µs/linha)")
+    print(f"Resultados iguais: {'sim' if medicao['resultados_iguais'] else 'NÃO'}")
+    print("=" * 60)
+
+
+def mostrar_resumo(resumo):
+    print("\n" + "=" * 60)
+    print("📊 BENCHMARK DO RPA (portal simulado)")
+    print("=" * 60)
+    print(f"Modo de preenchimento: {resumo['modo']} | perfil do navegador: {resumo['perfil']}")
+    print(f"Latência AJAX simulada: {resumo['latencia_ajax_ms']}ms")
+    print(f"Inicialização do Chrome: {resumo['tempo_inicializacao_s']:.2f}s")
+    print(f"Notas: {resumo['sucessos']}/{resumo['notas']} (portal registrou {resumo['emitidas_no_portal']})")
+    print(f"Tempo total: {resumo['tempo_total_s']:.2f}s")
+    print(f"Vazão: {resumo['notas_por_minuto']:.2f} notas/min")
+    print(f"Latência por nota: p50 {resumo['p50_s']:.2f}s | p95 {resumo['p95_s']:.2f}s | máx {resumo['max_s']:.2f}s")
+    if resumo['ajax']:
+        ajax = resumo['ajax']
+        print(f"AJAX do portal: {ajax['requisicoes']} requisições | p50 {ajax['p50_ms']:.0f}ms | "
+              f"p95 {ajax['p95_ms']:.0f}ms")
+    for etapa, info in resumo.get('esperas', {}).items():
+        print(f"Espera '{etapa}': {info['padrao_s']:.2f}s → {info['espera_s']:.2f}s ({info['amostras']} medições)")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do RPA contra o portal DEISS simulado")
+    parser.add_argument('--notas', type=int, default=20, help="Quantidade de notas sintéticas")
+    parser.add_argument('--latencia-ms', type=int, default=150, help="Latência de cada AJAX simulado")
+    parser.add_argument('--cliente', default='cliente_a', help="Mapeamento de cliente usado")
+    parser.add_argument('--lote', action='store_true', help="Usa o preenchimento em lote")
+    parser.add_argument('--diferencial', action='store_true',
+                        help="Escreve só os campos que diferem do estado atual do formulário")
+    parser.add_argument('--http', action='store_true', help="Emite por POST JSF direto (envio_http.py)")
+    parser.add_argument('--recorrentes', type=float, default=0.3,
+                        help="Fração de notas de tomadores repetidos (preenchidos pelo AJAX do CPF)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--com-janela', action='store_true', help="Mostra o Chrome em vez de headless")
+    parser.add_argument('--trace', nargs='?', const='benchmark_trace.json', metavar='ARQUIVO',
+                        help="Salva o tempo de cada etapa como Chrome trace")
+    parser.add_argument('--perfil', choices=list(PERFIS_NAVEGADOR), default='padrao',
+                        help="Perfil do navegador usado na emissão")
+    parser.add_argument('--comparar-perfis', nargs='+', choices=list(PERFIS_NAVEGADOR), metavar='PERFIL',
+                        help="Compara carga da página e memória entre perfis do navegador")
+    parser.add_argument('--recargas', type=int, default=5, help="Recargas da página por perfil")
+    parser.add_argument('--enderecos', type=int, metavar='LINHAS',
+                        help="Mede só a decomposição do endereço (linha a linha x vetorizada)")
+    parser.add_argument('--saida', help="Grava o resumo em JSON (para comparar execuções no CI)")
+    parser.add_argument('--minimo-notas-min', type=float,
+                        help="Sai com código 1 se a vazão ficar abaixo deste valor")
+    args = parser.parse_args()
+
+    if args.comparar_perfis:
+        medicoes = comparar_perfis(args.comparar_perfis, args.recargas, args.latencia_ms, args.cliente,
+                                   headless=not args.com_janela)
+        mostrar_comparacao_perfis(medicoes)
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                json.dump(medicoes, arquivo, indent=2, ensure_ascii=False)
+            print(f"💾 Medições salvas em {args.saida}")
+        return
+
+    if args.enderecos:
+        medicao = medir_enderecos(args.enderecos, args.semente)
+        mostrar_medicao_enderecos(medicao)
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                json.dump(medicao, arquivo, indent=2, ensure_ascii=False)
+            print(f"💾 Medição salva em {args.saida}")
+        if not medicao['resultados_iguais']:
+            sys.exit(1)
+        return
+
+    resumo = executar_benchmark(args.notas, args.latencia_ms, args.cliente, args.lote,
+                                not args.com_janela, args.recorrentes, args.semente, args.trace,
+                                args.perfil, args.http, args.diferencial)
+    mostrar_resumo(resumo)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resumo salvo em {args.saida}")
+
+    if resumo['sucessos'] < resumo['notas']:
+        sys.exit(1)
+    if args.minimo_notas_min is not None and resumo['notas_por_minuto'] < args.minimo_notas_min:
+        print(f"❌ Vazão abaixo do mínimo de {args.minimo_notas_min} notas/min")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
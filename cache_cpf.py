@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Cache persistente do preenchimento automático por CPF
+Para cada tomador guarda quais campos o portal preencheu sozinho após o AJAX do CPF e a
+latência observada, para que as próximas notas do mesmo cliente saibam de antemão o que
+digitar e quanto esperar.
+
+Os CPFs não são gravados: a chave de cada entrada é um HMAC-SHA256 do CPF com um segredo
+aleatório criado na primeira execução (segredo_cpf.key, ao lado do cache, permissão 0600).
+Como há poucos CPFs possíveis, um hash simples poderia ser revertido testando todos; sem o
+segredo, o arquivo do cache não revela quais CPFs estão nele.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+from datetime import datetime
+
+from cache_planilha import PASTA_CACHE
+
+ARQUIVO_CACHE_CPF = os.path.join(PASTA_CACHE, 'autopreenchimento_cpf.json')
+ARQUIVO_SEGREDO = 'segredo_cpf.key'
+# Marca o formato das chaves; caches antigos (SHA-256 sem segredo) são descartados
+FORMATO_CHAVE = 'hmac-sha256'
+
+# Campo lógico → ID do elemento preenchido pelo portal a partir do CPF
+CAMPOS_AUTOPREENCHIMENTO = {
+    'nome': 'frmConteudo:itRazaoSocialT',
+    'uf': 'frmConteudo:somUfT',
+    'municipio': 'frmConteudo:somMunicipioT',
+    'logradouro': 'frmConteudo:itLogradouroT',
+    'numero': 'frmConteudo:itNumeroT',
+    'cep': 'frmConteudo:itCepT',
+    'telefone': 'frmConteudo:itTelefoneT',
+    'email': 'frmConteudo:itEmailT',
+    'tipo_logradouro': 'frmConteudo:somTipoLogradouroT',
+}
+
+# A cada quantas atualizações o arquivo é regravado (além do salvar() no fim da execução)
+SALVAR_A_CADA = 20
+
+logger = logging.getLogger(__name__)
+
+
+def carregar_segredo(pasta):
+    """
+    Lê o segredo da instalação guardado na pasta, criando-o (0600) na primeira vez
+
+    Returns:
+        bytes: Segredo aleatório de 32 bytes
+    """
+    caminho = os.path.join(pasta, ARQUIVO_SEGREDO)
+    os.makedirs(pasta, mode=0o700, exist_ok=True)
+    try:
+        descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(caminho, 'rb') as arquivo:
+            segredo = arquivo.read()
+        if len(segredo) < 32:
+            raise ValueError(f"segredo do cache de CPF inválido em {caminho}")
+        return segredo
+    segredo = secrets.token_bytes(32)
+    with os.fdopen(descritor, 'wb') as arquivo:
+        arquivo.write(segredo)
+    return segredo
+
+
+class CacheCPF:
+    """CPF → campos preenchidos automaticamente e latência do AJAX, gravado em JSON"""
+
+    def __init__(self, caminho=ARQUIVO_CACHE_CPF):
+        """
+        Args:
+            caminho (str): Arquivo JSON do cache (None mantém apenas em memória)
+        """
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self.lock_arquivo = threading.Lock()
+        self.alteracoes = 0
+        self.segredo = self._carregar_segredo()
+        self.entradas = self._carregar()
+
+    def _carregar_segredo(self):
+        if self.caminho:
+            try:
+                return carregar_segredo(os.path.dirname(self.caminho) or '.')
+            except (OSError, ValueError) as e:
+                logger.warning(f"Segredo do cache de CPF indisponível, cache só em memória: {e}")
+                self.caminho = None
+        return secrets.token_bytes(32)
+
+    def _carregar(self):
+        if not self.caminho:
+            return {}
+        try:
+            with open(self.caminho, encoding='utf-8') as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(conteudo, dict) or conteudo.get('formato') != FORMATO_CHAVE:
+            # Formato antigo: regravado (sem os hashes reversíveis) no próximo salvar()
+            self.alteracoes += 1
+            return {}
+        return conteudo.get('entradas', {})
+
+    def _chave(self, cpf):
+        return hmac.new(self.segredo, str(cpf).encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+    def obter(self, cpf):
+        """Retorna a entrada do CPF ({'campos', 'latencia_ms', 'confirmacoes'}) ou None"""
+        with self.lock:
+            entrada = self.entradas.get(self._chave(cpf))
+            return dict(entrada) if entrada else None
+
+    def ids_esperados(self, cpf):
+        """IDs dos campos que o portal deve preencher sozinho para este CPF (vazio se desconhecido)"""
+        entrada = self.obter(cpf)
+        if not entrada:
+            return []
+        return [CAMPOS_AUTOPREENCHIMENTO[campo] for campo, preenchido in entrada['campos'].items()
+                if preenchido and campo in CAMPOS_AUTOPREENCHIMENTO]
+
+    @staticmethod
+    def timeout_previsto(entrada, padrao):
+        """Tempo de espera a partir da latência observada, com folga e limitado ao padrão"""
+        return min(padrao, max(1.0, entrada['latencia_ms'] * 3 / 1000 + 0.5))
+
+    def registrar(self, cpf, campos, latencia_ms=None):
+        """
+        Registra a resposta observada na página
+
+        Returns:
+            bool: True se confirmou o que estava no cache; False se era desconhecida ou divergente
+        """
+        campos = {campo: bool(campos.get(campo)) for campo in CAMPOS_AUTOPREENCHIMENTO}
+        chave = self._chave(cpf)
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            confirmou = bool(entrada) and entrada['campos'] == campos
+            if entrada and not confirmou:
+                logger.info("Preenchimento automático diferente do cache para o CPF, atualizando")
+
+            latencia_anterior = entrada['latencia_ms'] if confirmou else None
+            if latencia_ms is None:
+                latencia_ms = latencia_anterior if latencia_anterior is not None else 1000
+            elif latencia_anterior is not None:
+                # Média móvel: um AJAX lento isolado não derruba a previsão
+                latencia_ms = 0.7 * latencia_anterior + 0.3 * latencia_ms
+
+            self.entradas[chave] = {
+                'campos': campos,
+                'latencia_ms': round(latencia_ms, 1),
+                'confirmacoes': entrada['confirmacoes'] + 1 if confirmou else 0,
+                'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+            }
+            self.alteracoes += 1
+            salvar = self.alteracoes % SALVAR_A_CADA == 0
+        if salvar:
+            self.salvar()
+        return confirmou
+
+    def invalidar(self, cpf):
+        with self.lock:
+            self.entradas.pop(self._chave(cpf), None)
+            self.alteracoes += 1
+
+    def salvar(self):
+        """Grava o cache de forma atômica"""
+        if not self.caminho:
+            return
+        with self.lock:
+            if not self.alteracoes:
+                return
+            conteudo = json.dumps({'formato': FORMATO_CHAVE, 'entradas': self.entradas}, indent=1)
+        try:
+            with self.lock_arquivo:
+                os.makedirs(os.path.dirname(self.caminho) or '.', mode=0o700, exist_ok=True)
+                temporario = self.caminho + '.tmp'
+                with open(temporario, 'w', encoding='utf-8') as arquivo:
+                    arquivo.write(conteudo)
+                os.replace(temporario, self.caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de CPF: {e}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Cache da leitura das planilhas Excel
+Guarda o DataFrame já normalizado (validacao.normalizar_planilha), junto com a máscara de
+problemas calculada sobre os dados brutos, indexado pelo hash do conteúdo do arquivo, pelo
+cliente e pela versão da normalização. Cada versão da planilha é interpretada (xlsx) e
+normalizada no máximo uma vez. Só a versão mais recente de cada arquivo fica no cache: ao
+editar a planilha, os arquivos da versão anterior são apagados.
+
+O cache é gravado em Parquet (pyarrow). Sem o pyarrow, usa pickle, que executa código ao ser
+lido: o arquivo só é carregado se pertencer ao usuário atual e ninguém mais puder alterá-lo
+(a pasta é criada com permissão 0700). No Windows essa conferência não existe, então a pasta
+de trabalho não deve ser compartilhada; instale o pyarrow para não depender dela.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import stat
+
+import pandas as pd
+
+from validacao import VERSAO_NORMALIZACAO, normalizar_planilha, validar_dados
+
+try:
+    import pyarrow  # noqa: F401 (motor do to_parquet/read_parquet)
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+PASTA_CACHE = '.cache_rpa'
+ARQUIVO_INDICE = 'indice_planilhas.json'
+# Colunas da máscara de validação gravadas ao lado dos dados no mesmo arquivo
+PREFIXO_MASCARA = '__problema__'
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do conteúdo do arquivo lendo em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _carregar_indice(pasta_cache):
+    try:
+        with open(os.path.join(pasta_cache, ARQUIVO_INDICE), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_indice(pasta_cache, indice):
+    caminho = os.path.join(pasta_cache, ARQUIVO_INDICE)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(indice, arquivo, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _remover_caches_orfaos(pasta_cache, indice, hashes):
+    """Apaga os arquivos (de todos os clientes) dos hashes que nenhuma planilha do índice usa mais"""
+    em_uso = {entrada['hash'] for entrada in indice.values()}
+    orfaos = tuple(f"{hash_antigo}_" for hash_antigo in set(hashes) - em_uso)
+    if not orfaos:
+        return
+    for nome in os.listdir(pasta_cache):
+        if nome.startswith(orfaos):
+            try:
+                os.remove(os.path.join(pasta_cache, nome))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível apagar o cache antigo da planilha: {e}")
+
+
+def hash_planilha(caminho, pasta_cache=PASTA_CACHE):
+    """
+    Retorna o hash do conteúdo da planilha
+
+    O hash só é recalculado quando o mtime ou o tamanho do arquivo mudam. A versão
+    anterior do arquivo e as planilhas que não existem mais saem do índice, junto com
+    seus arquivos em cache.
+    """
+    os.makedirs(pasta_cache, mode=0o700, exist_ok=True)
+    caminho_absoluto = os.path.abspath(caminho)
+    info = os.stat(caminho)
+    indice = _carregar_indice(pasta_cache)
+
+    entrada = indice.get(caminho_absoluto)
+    if entrada and entrada['mtime'] == info.st_mtime and entrada['tamanho'] == info.st_size:
+        return entrada['hash']
+
+    hash_conteudo = calcular_hash_arquivo(caminho)
+    substituidos = [entrada['hash']] if entrada else []
+    for outro in [outro for outro in indice if outro != caminho_absoluto and not os.path.exists(outro)]:
+        substituidos.append(indice.pop(outro)['hash'])
+    indice[caminho_absoluto] = {'mtime': info.st_mtime, 'tamanho': info.st_size, 'hash': hash_conteudo}
+    _salvar_indice(pasta_cache, indice)
+    _remover_caches_orfaos(pasta_cache, indice, substituidos)
+    return hash_conteudo
+
+
+def _arquivo_privado(caminho):
+    """Indica se o arquivo (e sua pasta) pertencem ao usuário atual e só ele pode alterá-los"""
+    if not hasattr(os, 'getuid'):
+        return True  # Windows: sem dono/permissões POSIX para conferir (ver docstring do módulo)
+    for alvo in (caminho, os.path.dirname(os.path.abspath(caminho))):
+        info = os.stat(alvo)
+        if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return False
+    return True
+
+
+def _ler_cache(arquivo_cache):
+    if PARQUET_DISPONIVEL:
+        return pd.read_parquet(arquivo_cache)
+    if not _arquivo_privado(arquivo_cache):
+        raise PermissionError("arquivo ou pasta do cache alterável por outros usuários; pickle ignorado")
+    return pd.read_pickle(arquivo_cache)
+
+
+def _gravar_cache(combinado, arquivo_cache):
+    temporario = arquivo_cache + '.tmp'
+    if PARQUET_DISPONIVEL:
+        combinado.to_parquet(temporario)
+    else:
+        combinado.to_pickle(temporario)
+        os.chmod(temporario, 0o600)
+    os.replace(temporario, arquivo_cache)
+
+
+def ler_planilha(caminho, cliente=None, pasta_cache=PASTA_CACHE):
+    """
+    Lê a planilha Excel já normalizada, usando o cache quando a mesma versão já foi lida
+
+    Args:
+        caminho (str): Caminho do arquivo Excel
+        cliente (str): Cliente do mapeamento (define as colunas opcionais criadas vazias)
+        pasta_cache (str): Pasta onde ficam os DataFrames em cache
+
+    Returns:
+        tuple: (DataFrame de normalizar_planilha, máscara de validar_dados sobre os dados brutos)
+    """
+    try:
+        chave = hash_planilha(caminho, pasta_cache)
+    except OSError as e:
+        logger.warning(f"Cache de planilha indisponível: {e}")
+        bruto = pd.read_excel(caminho)
+        return normalizar_planilha(bruto, cliente), validar_dados(bruto)
+
+    extensao = 'parquet' if PARQUET_DISPONIVEL else 'pkl'
+    arquivo_cache = os.path.join(pasta_cache, f"{chave}_{cliente or 'padrao'}_v{VERSAO_NORMALIZACAO}.{extensao}")
+    if os.path.exists(arquivo_cache):
+        try:
+            combinado = _ler_cache(arquivo_cache)
+            colunas_mascara = [coluna for coluna in combinado.columns if coluna.startswith(PREFIXO_MASCARA)]
+            mascara = combinado[colunas_mascara].rename(columns=lambda coluna: coluna[len(PREFIXO_MASCARA):])
+            logger.info(f"Planilha carregada do cache ({chave[:12]})")
+            return combinado.drop(columns=colunas_mascara), mascara
+        except Exception as e:
+            logger.warning(f"Cache da planilha ignorado, relendo o Excel: {e}")
+
+    bruto = pd.read_excel(caminho)
+    df = normalizar_planilha(bruto, cliente)
+    mascara = validar_dados(bruto)
+    try:
+        _gravar_cache(pd.concat([df, mascara.add_prefix(PREFIXO_MASCARA)], axis=1), arquivo_cache)
+    except Exception as e:
+        # Ex.: colunas com tipos misturados que o Parquet não representa
+        logger.warning(f"Não foi possível gravar o cache da planilha: {e}")
+    return df, mascara
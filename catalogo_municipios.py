@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Catálogo em disco dos municípios do portal
+Guarda, para cada dropdown de município (tomador, incidência e serviço) e cada UF, a lista
+(código, nome) lida do próprio portal, com validade para ser coletada de novo de tempos em
+tempos. Um índice sem acentos e sem diferença de maiúsculas permite validar a coluna Cidade
+antes de abrir o navegador e informar ao dropdown o código exato da opção, sem busca.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from cache_planilha import PASTA_CACHE
+from opcoes_dropdown import DEPENDENCIAS_DROPDOWN, normalizar_texto
+
+ARQUIVO_CATALOGO = os.path.join(PASTA_CACHE, 'catalogo_municipios.json')
+VALIDADE_CATALOGO = 30 * 24 * 3600  # segundos
+
+# Dropdown de UF → dropdown de municípios que ele recarrega
+DROPDOWNS_MUNICIPIO = {uf: dependentes[0] for uf, dependentes in DEPENDENCIAS_DROPDOWN.items()}
+MUNICIPIO_TOMADOR = 'frmConteudo:somMunicipioT'
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoMunicipios:
+    """Listas de municípios por dropdown e UF, persistidas em JSON e indexadas pelo nome normalizado"""
+
+    def __init__(self, caminho=ARQUIVO_CATALOGO, validade=VALIDADE_CATALOGO):
+        """
+        Args:
+            caminho (str): Arquivo JSON do catálogo (None mantém apenas em memória)
+            validade (int): Idade máxima (segundos) de uma lista antes de ser coletada de novo
+        """
+        self.caminho = caminho
+        self.validade = validade
+        self.lock = threading.Lock()
+        self._listas = {}   # dropdown → {uf: {'coletado_em': timestamp, 'opcoes': [[codigo, nome], ...]}}
+        self._indices = {}  # (dropdown, uf) → {nome normalizado: (codigo, nome)}
+        self._nomes = {}    # codigo → nome (os códigos do portal não se repetem entre UFs)
+        self._alterado = False
+        if caminho:
+            self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, encoding='utf-8') as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, ValueError):
+            return
+        for dropdown, ufs in conteudo.get('municipios', {}).items():
+            for uf, lista in ufs.items():
+                self._guardar(dropdown, uf, lista['opcoes'], lista.get('coletado_em', 0))
+
+    def _guardar(self, dropdown, uf, opcoes, coletado_em):
+        opcoes = [(str(codigo), str(nome).strip()) for codigo, nome in opcoes if str(codigo).strip()]
+        self._listas.setdefault(dropdown, {})[uf] = {'coletado_em': coletado_em, 'opcoes': opcoes}
+        indice = {}
+        for codigo, nome in opcoes:
+            indice.setdefault(normalizar_texto(nome), (codigo, nome))
+            self._nomes.setdefault(codigo, nome)
+        self._indices[(dropdown, uf)] = indice
+
+    def registrar(self, dropdown, uf, opcoes):
+        """
+        Guarda a lista de municípios lida do portal para a UF
+
+        Args:
+            dropdown (str): ID do dropdown de municípios
+            uf (str): UF selecionada no dropdown pai
+            opcoes (list): Tuplas (value, label) do dropdown; o placeholder sem value é descartado
+        """
+        with self.lock:
+            self._guardar(dropdown, normalizar_texto(uf), opcoes, time.time())
+            self._alterado = True
+
+    def opcoes(self, dropdown, uf):
+        """Lista (codigo, nome) guardada para o dropdown e a UF, ou None"""
+        lista = self._listas.get(dropdown, {}).get(normalizar_texto(uf))
+        return lista['opcoes'] if lista else None
+
+    def expirado(self, dropdown, uf):
+        """Indica se a lista da UF nunca foi coletada ou passou da validade"""
+        lista = self._listas.get(dropdown, {}).get(normalizar_texto(uf))
+        return lista is None or time.time() - lista['coletado_em'] > self.validade
+
+    def conhece_uf(self, uf, dropdown=MUNICIPIO_TOMADOR):
+        """Indica se há alguma lista de municípios para a UF (no dropdown pedido ou em outro)"""
+        return any((candidato, normalizar_texto(uf)) in self._indices for candidato in self._candidatos(dropdown))
+
+    def _candidatos(self, dropdown):
+        # Os três dropdowns listam os mesmos municípios: qualquer um serve de reserva
+        return [dropdown] + [outro for outro in DROPDOWNS_MUNICIPIO.values() if outro != dropdown]
+
+    def procurar(self, cidade, uf, dropdown=MUNICIPIO_TOMADOR):
+        """
+        Procura o município pelo nome, ignorando acentos, maiúsculas e espaços repetidos
+
+        Returns:
+            tuple: (codigo, nome) como no portal, ou None se a cidade (ou a UF) não estiver no catálogo
+        """
+        chave_uf = normalizar_texto(uf)
+        chave = normalizar_texto(cidade)
+        for candidato in self._candidatos(dropdown):
+            indice = self._indices.get((candidato, chave_uf))
+            if indice is not None:
+                return indice.get(chave)
+        return None
+
+    def nome_municipio(self, codigo):
+        """Nome do município com o código no portal, ou None se o código não estiver no catálogo"""
+        return self._nomes.get(str(codigo))
+
+    def validar_cidades(self, cidades, uf, dropdown=MUNICIPIO_TOMADOR):
+        """
+        Confere uma coluna de cidades contra o catálogo
+
+        Args:
+            cidades (iterable): Nomes de cidade (vazios são ignorados)
+            uf (str): UF onde as cidades devem existir
+
+        Returns:
+            dict: {cidade: quantidade} das cidades não encontradas; vazio se todas existem
+                  ou se a UF ainda não foi coletada
+        """
+        if not self.conhece_uf(uf, dropdown):
+            return {}
+        contagem = {}
+        for cidade in cidades:
+            if cidade:
+                contagem[cidade] = contagem.get(cidade, 0) + 1
+        return {cidade: quantidade for cidade, quantidade in contagem.items()
+                if self.procurar(cidade, uf, dropdown) is None}
+
+    def resumo(self):
+        """{dropdown: {uf: quantidade de municípios}}"""
+        return {dropdown: {uf: len(lista['opcoes']) for uf, lista in sorted(ufs.items())}
+                for dropdown, ufs in self._listas.items()}
+
+    def salvar(self):
+        """Grava o catálogo se houve coletas desde a última gravação"""
+        if not self.caminho or not self._alterado:
+            return
+        with self.lock:
+            conteudo = {
+                'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+                'municipios': {dropdown: {uf: {'coletado_em': lista['coletado_em'],
+                                               'opcoes': [list(opcao) for opcao in lista['opcoes']]}
+                                          for uf, lista in ufs.items()}
+                               for dropdown, ufs in self._listas.items()},
+            }
+            self._alterado = False
+        try:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            temporario = self.caminho + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(conteudo, arquivo, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o catálogo de municípios: {e}")
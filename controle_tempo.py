@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Controle adaptativo das esperas do RPA
+Substitui as pausas fixas (0,3s após cada dropdown, 0,5s antes do CPF, 1s entre tentativas...)
+por esperas derivadas das latências medidas durante a execução. Cada etapa guarda uma
+janela móvel das últimas medições; a espera é um percentil dessa janela com margem de
+segurança. Até haver amostras suficientes vale o tempo padrão da etapa, que é o valor
+fixo usado antes. Os valores aprendidos podem ser salvos e reaproveitados na próxima execução.
+
+Só as esperas concluídas medem a etapa; um timeout entra como amostra censurada (o dobro do
+limite que estourou, nunca menos que o padrão), para que um modelo otimista demais volte a
+subir. Nenhuma espera aprendida fica abaixo do mínimo da etapa (metade do padrão).
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from cache_planilha import PASTA_CACHE
+from rede_cdp import percentil
+
+ARQUIVO_TEMPOS = os.path.join(PASTA_CACHE, 'tempos_etapas.json')
+
+# Etapa → espera padrão (segundos), usada enquanto não há medições suficientes
+TEMPOS_PADRAO = {
+    'dropdown': 0.3,        # AJAX/renderização após selecionar uma opção
+    'antes_cpf': 0.5,       # Tipo de pessoa aplicado antes de digitar o CPF
+    'cpf': 0.5,             # Nova tentativa de preencher o CPF
+    'campo': 0.2,           # Nova tentativa de preencher um campo de texto
+    'modal': 0.5,           # Fechamento de modal/overlay
+    'retentativa': 1.0,     # Entre tentativas de selecionar um dropdown
+    'navegacao': 1.0,       # Após carregar a página de emissão
+    'entre_notas': 0.5,     # Página pronta para a próxima nota
+}
+
+# Piso de cada etapa: o modelo pode encurtar a espera padrão, mas não abaixo da metade dela
+FRACAO_MINIMA = 0.5
+TEMPOS_MINIMOS = {etapa: padrao * FRACAO_MINIMA for etapa, padrao in TEMPOS_PADRAO.items()}
+
+MINIMO_AMOSTRAS = 5
+TAMANHO_JANELA = 50
+
+logger = logging.getLogger(__name__)
+
+
+class ControladorTempo:
+    """Modelo de percentis móveis por etapa que define quanto tempo esperar"""
+
+    def __init__(self, padroes=None, percentil_alvo=95, margem=1.5, minimos=None, espera_maxima=15.0,
+                 tamanho_janela=TAMANHO_JANELA, adaptativo=True):
+        """
+        Args:
+            padroes (dict): Espera padrão por etapa (segundos); completa TEMPOS_PADRAO
+            percentil_alvo (int): Percentil das medições usado como base da espera
+            margem (float): Fator de segurança aplicado ao percentil
+            minimos (dict): Espera mínima por etapa (segundos); completa TEMPOS_MINIMOS e, para
+                etapas sem mínimo, vale FRACAO_MINIMA do padrão
+            espera_maxima (float): Limite superior de qualquer espera (segundos)
+            tamanho_janela (int): Quantidade de medições mantidas por etapa
+            adaptativo (bool): False mantém sempre os tempos padrão (comportamento original)
+        """
+        self.padroes = dict(TEMPOS_PADRAO, **(padroes or {}))
+        self.percentil_alvo = percentil_alvo
+        self.margem = margem
+        self.minimos = dict(TEMPOS_MINIMOS, **(minimos or {}))
+        self.espera_maxima = espera_maxima
+        self.tamanho_janela = tamanho_janela
+        self.adaptativo = adaptativo
+        self.amostras = {}
+        self.lock = threading.Lock()
+
+    def registrar(self, etapa, segundos):
+        """Adiciona a duração medida de uma etapa à janela móvel"""
+        self._adicionar(etapa, segundos)
+
+    def registrar_timeout(self, etapa, limite):
+        """
+        Registra uma espera que estourou o limite (amostra censurada)
+
+        A duração real é desconhecida, só se sabe que passou do limite: entra o dobro dele,
+        nunca menos que o padrão da etapa, o que faz a espera aprendida subir a cada timeout.
+        """
+        self._adicionar(etapa, min(self.espera_maxima, max(2 * float(limite), self.padroes.get(etapa, 0.5))))
+
+    def _adicionar(self, etapa, segundos):
+        with self.lock:
+            if etapa not in self.amostras:
+                self.amostras[etapa] = deque(maxlen=self.tamanho_janela)
+            self.amostras[etapa].append(max(0.0, float(segundos)))
+
+    def espera(self, etapa):
+        """Tempo de espera (segundos) para a etapa segundo o modelo atual"""
+        padrao = self.padroes.get(etapa, 0.5)
+        with self.lock:
+            amostras = list(self.amostras.get(etapa, ()))
+        if not self.adaptativo or len(amostras) < MINIMO_AMOSTRAS:
+            return padrao
+        estimada = percentil(amostras, self.percentil_alvo) * self.margem
+        minimo = self.minimos.get(etapa, padrao * FRACAO_MINIMA)
+        return min(self.espera_maxima, max(minimo, estimada))
+
+    def valores_aprendidos(self):
+        """
+        Resumo do modelo por etapa
+
+        Returns:
+            dict: {etapa: {amostras, p50_s, p95_s, padrao_s, espera_s}}
+        """
+        with self.lock:
+            etapas = {etapa: list(amostras) for etapa, amostras in self.amostras.items()}
+        return {
+            etapa: {
+                'amostras': len(amostras),
+                'p50_s': round(percentil(amostras, 50), 3),
+                'p95_s': round(percentil(amostras, 95), 3),
+                'padrao_s': self.padroes.get(etapa, 0.5),
+                'espera_s': round(self.espera(etapa), 3),
+            }
+            for etapa, amostras in sorted(etapas.items())
+        }
+
+    def mostrar_resumo(self):
+        valores = self.valores_aprendidos()
+        if not valores:
+            return
+        print("\n⏱️  Esperas adaptativas (padrão → aprendida):")
+        for etapa, info in valores.items():
+            print(f"   {etapa:<12} {info['padrao_s']:.2f}s → {info['espera_s']:.2f}s "
+                  f"(p50 {info['p50_s']:.2f}s, p95 {info['p95_s']:.2f}s, {info['amostras']} medições)")
+
+    def salvar(self, caminho=ARQUIVO_TEMPOS):
+        """Grava as medições de cada etapa para a próxima execução"""
+        with self.lock:
+            conteudo = {
+                'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+                'etapas': {etapa: [round(valor, 4) for valor in amostras]
+                           for etapa, amostras in self.amostras.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+            temporario = caminho + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(conteudo, arquivo, indent=1)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar os tempos aprendidos: {e}")
+
+    def carregar(self, caminho=ARQUIVO_TEMPOS):
+        """
+        Carrega as medições de uma execução anterior
+
+        Returns:
+            bool: True se havia tempos salvos
+        """
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, ValueError):
+            return False
+
+        with self.lock:
+            for etapa, valores in conteudo.get('etapas', {}).items():
+                self.amostras[etapa] = deque((float(valor) for valor in valores), maxlen=self.tamanho_janela)
+        return bool(self.amostras)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Diário de execução do RPA
+Registra em SQLite o estado de cada nota antes e depois da emissão, permitindo
+retomar um processamento interrompido sem emitir notas em duplicidade
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+STATUS_EM_ANDAMENTO = 'em_andamento'
+STATUS_EMITIDA = 'emitida'
+STATUS_ERRO = 'erro'
+
+CAMPOS_IMPRESSAO = ['CPF', 'Nome_Cliente', 'Nome_Item', 'Valor', 'Data']
+
+
+def _normalizar_campo(valor):
+    """Normaliza um valor da planilha para compor a impressão digital"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    if isinstance(valor, float):
+        return f"{valor:.2f}"
+    if isinstance(valor, pd.Timestamp):
+        return valor.strftime('%Y-%m-%d')
+    return str(valor).strip().upper()
+
+
+class ImpressoesLinhas:
+    """
+    Gera impressões digitais estáveis para as linhas da planilha
+
+    Linhas idênticas (mesmo cliente, item, valor e data) recebem um ordinal para que
+    cada uma tenha sua própria entrada no diário.
+    """
+
+    def __init__(self):
+        self._ocorrencias = {}
+
+    def gerar(self, linha):
+        """Retorna a impressão digital da linha (hash SHA-1 dos campos + ordinal)"""
+        base = '|'.join(_normalizar_campo(linha.get(campo)) for campo in CAMPOS_IMPRESSAO)
+        ocorrencia = self._ocorrencias.get(base, 0)
+        self._ocorrencias[base] = ocorrencia + 1
+        return hashlib.sha1(f"{base}|{ocorrencia}".encode('utf-8')).hexdigest()
+
+
+class DiarioExecucao:
+    """Diário persistente e seguro contra falhas, indexado pela impressão digital da linha"""
+
+    def __init__(self, caminho='rpa_diario.sqlite3'):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=FULL")
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS notas (
+                impressao TEXT PRIMARY KEY,
+                registro INTEGER,
+                cpf TEXT,
+                nome_cliente TEXT,
+                status TEXT NOT NULL,
+                detalhe TEXT,
+                atualizado_em TEXT NOT NULL
+            )
+        """)
+        # Carrega os estados uma única vez: a consulta por linha é O(1) em memória
+        self._status = dict(self.conexao.execute("SELECT impressao, status FROM notas"))
+
+    def status(self, impressao):
+        """Retorna o status registrado para a linha ou None se nunca processada"""
+        return self._status.get(impressao)
+
+    def _registrar(self, impressao, status, registro=None, linha=None, detalhe=''):
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            if linha is not None:
+                self.conexao.execute(
+                    "INSERT OR REPLACE INTO notas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (impressao, registro, _normalizar_campo(linha.get('CPF')),
+                     _normalizar_campo(linha.get('Nome_Cliente')), status, detalhe, agora)
+                )
+            else:
+                self.conexao.execute(
+                    "UPDATE notas SET status = ?, detalhe = ?, atualizado_em = ? WHERE impressao = ?",
+                    (status, detalhe, agora, impressao)
+                )
+            self._status[impressao] = status
+
+    def marcar_em_andamento(self, impressao, registro, linha):
+        """Registra que a emissão da linha vai começar (antes do clique em emitir)"""
+        self._registrar(impressao, STATUS_EM_ANDAMENTO, registro=registro, linha=linha)
+
+    def marcar_emitida(self, impressao, detalhe=''):
+        """Registra a emissão confirmada da linha"""
+        self._registrar(impressao, STATUS_EMITIDA, detalhe=detalhe)
+
+    def marcar_erro(self, impressao, detalhe=''):
+        """Registra que a emissão falhou e a linha pode ser reprocessada"""
+        self._registrar(impressao, STATUS_ERRO, detalhe=detalhe)
+
+    def registros_em_andamento(self):
+        """Lista (registro, cpf, nome_cliente, atualizado_em) das linhas que precisam de conferência"""
+        with self._lock:
+            return self.conexao.execute(
+                "SELECT registro, cpf, nome_cliente, atualizado_em FROM notas WHERE status = ? ORDER BY registro",
+                (STATUS_EM_ANDAMENTO,)
+            ).fetchall()
+
+    def fechar(self):
+        """Fecha a conexão com o banco do diário"""
+        with self._lock:
+            self.conexao.close()
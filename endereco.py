@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Decomposição do endereço da planilha em tipo de logradouro, logradouro e número
+A coluna Endereco inteira (ou cada bloco da leitura em streaming) é interpretada de uma vez
+com Series.str.extract; a versão escalar (mesma gramática) atende um endereço isolado.
+
+Gramática: "<PREFIXO> <LOGRADOURO>, <NÚMERO>..." (ex.: "AV BRASIL, 1500 AP 12"). Fora desse
+formato o prefixo é descartado, o número é o que houver no final e o tipo fica RUA.
+"""
+
+import re
+
+import pandas as pd
+
+# Prefixo usado na planilha → texto da opção no dropdown de tipo de logradouro
+TIPOS_LOGRADOURO = {
+    'AL': 'ALAMEDA',
+    'R': 'RUA',
+    'AV': 'AVENIDA',
+    'JD': 'JARDIM',
+    'TRAV': 'TRAVESSA',
+    'ROD': 'RODOVIA',
+    'EST': 'ESTRADA',
+    'PC': 'PRAÇA',
+}
+TIPO_LOGRADOURO_PADRAO = 'RUA'
+
+_PREFIXOS = '|'.join(sorted(TIPOS_LOGRADOURO, key=len, reverse=True))
+_RE_ENDERECO = re.compile(rf'^(?P<prefixo>{_PREFIXOS})\s+(?P<logradouro>.+?),\s*(?P<numero>\d+).*$')
+_RE_PREFIXO = re.compile(rf'^(?:{_PREFIXOS})\s+')
+_RE_NUMERO_FINAL = re.compile(r'(?P<logradouro>.+?)\s*,?\s*(?P<numero>\d+)$')
+
+COLUNAS_ENDERECO = ['logradouro', 'numero', 'tipo_logradouro']
+
+
+def mapear_tipo_logradouro(prefixo):
+    """Mapeia prefixo do endereço para tipo de logradouro"""
+    return TIPOS_LOGRADOURO.get(prefixo, TIPO_LOGRADOURO_PADRAO)
+
+
+def extrair_endereco(endereco_completo):
+    """
+    Extrai os componentes de um endereço
+
+    Returns:
+        tuple: (logradouro, numero, tipo_logradouro)
+    """
+    endereco = endereco_completo.strip()
+
+    match = _RE_ENDERECO.match(endereco)
+    if match:
+        return (match.group('logradouro').strip(), match.group('numero'),
+                mapear_tipo_logradouro(match.group('prefixo')))
+
+    endereco_sem_prefixo = _RE_PREFIXO.sub('', endereco)
+    match = _RE_NUMERO_FINAL.search(endereco_sem_prefixo)
+    if match:
+        return match.group('logradouro').strip(), match.group('numero'), TIPO_LOGRADOURO_PADRAO
+    return endereco_sem_prefixo, '', TIPO_LOGRADOURO_PADRAO
+
+
+def extrair_enderecos_serie(serie):
+    """
+    Decompõe uma coluna de endereços de forma vetorizada, com as regras de extrair_endereco
+
+    Cada endereço distinto é interpretado uma única vez (clientes recorrentes repetem o endereço).
+
+    Args:
+        serie (pd.Series): Endereços completos (vazios/NaN são aceitos)
+
+    Returns:
+        pd.DataFrame: Colunas logradouro, numero e tipo_logradouro, com o índice da série;
+        linhas sem endereço ficam com as três colunas vazias
+    """
+    # Vazios/NaN ficam com o código -1 do factorize e apontam para um endereço vazio no final
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    unicos = pd.Series([str(endereco).strip() for endereco in unicos] + [''], dtype=object)
+    codigos[codigos < 0] = len(unicos) - 1
+
+    decompostos = pd.DataFrame('', index=unicos.index, columns=COLUNAS_ENDERECO, dtype=object)
+    partes = unicos.str.extract(_RE_ENDERECO).dropna(subset=['prefixo'])
+    decompostos.loc[partes.index, 'logradouro'] = partes['logradouro'].str.strip()
+    decompostos.loc[partes.index, 'numero'] = partes['numero']
+    decompostos.loc[partes.index, 'tipo_logradouro'] = partes['prefixo'].map(TIPOS_LOGRADOURO)
+
+    # Fora do formato: descarta o prefixo e procura o número no final
+    fora_do_formato = unicos.drop(partes.index)
+    fora_do_formato = fora_do_formato[fora_do_formato != '']
+    sem_prefixo = fora_do_formato.str.replace(_RE_PREFIXO, '', regex=True)
+    finais = sem_prefixo.str.extract(_RE_NUMERO_FINAL)
+    decompostos.loc[sem_prefixo.index, 'logradouro'] = finais['logradouro'].str.strip().fillna(sem_prefixo)
+    decompostos.loc[sem_prefixo.index, 'numero'] = finais['numero'].fillna('')
+    decompostos.loc[sem_prefixo.index, 'tipo_logradouro'] = TIPO_LOGRADOURO_PADRAO
+
+    resultado = decompostos.take(codigos)
+    resultado.index = serie.index
+    return resultado
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Envio direto das notas por HTTP, sem renderizar o formulário no navegador
+O login continua manual no Chrome; depois dele a sessão (cookies, javax.faces.ViewState e
+opções dos dropdowns) é capturada e cada nota é enviada como o POST parcial que o botão
+Emitir do PrimeFaces faria, com o mesmo conjunto de campos frmConteudo:* montado por
+montar_plano_preenchimento. A resposta (partial-response XML) é interpretada para
+identificar sucesso, erros de validação ou sessão expirada.
+
+Os cookies capturados do navegador são atualizados a cada resposta (Set-Cookie), como o
+Chrome faria, para acompanhar um JSESSIONID renovado ou cookies de balanceador.
+"""
+
+import html
+import json
+import re
+import time
+import xml.etree.ElementTree as ET
+from http.cookies import CookieError, SimpleCookie
+from typing import NamedTuple
+from urllib.parse import urlencode, urljoin
+
+import urllib3
+
+from opcoes_dropdown import DEPENDENCIAS_DROPDOWN, IndiceOpcoes
+
+ENVIO_EMITIDA = 'emitida'
+ENVIO_ERRO = 'erro'
+ENVIO_SEM_CONFIRMACAO = 'sem_confirmacao'
+ENVIO_SESSAO_EXPIRADA = 'sessao_expirada'
+
+# Severidades das mensagens do portal: aviso também impede a emissão; sucesso só com o número da nota
+SEVERIDADES_ERRO = ('error', 'fatal', 'warn')
+SEVERIDADES_SUCESSO = ('info', 'success')
+
+JS_CAPTURAR_SESSAO = """
+var formulario = document.getElementById(arguments[0]);
+var viewState = document.querySelector('input[name="javax.faces.ViewState"]');
+var opcoes = {};
+var selecionados = {};
+formulario.querySelectorAll('select[id$="_input"]').forEach(function(select) {
+    var id = select.id.slice(0, -'_input'.length);
+    opcoes[id] = Array.prototype.map.call(select.options, function(o) { return [o.value, o.text.trim()]; });
+    selecionados[id] = select.value;
+});
+return {
+    acao: formulario.action || window.location.href,
+    view_state: viewState ? viewState.value : null,
+    opcoes: opcoes,
+    selecionados: selecionados,
+    user_agent: navigator.userAgent
+};
+"""
+
+_RE_MENSAGEM_GROWL = re.compile(r'\{[^{}]*severity[^{}]*\}')
+_RE_CAMPO_MENSAGEM = {
+    campo: re.compile(r'["\']?' + campo + r'["\']?\s*:\s*(?:"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\')')
+    for campo in ('summary', 'detail', 'severity')
+}
+_RE_MENSAGEM_HTML = re.compile(
+    r'class="[^"]*ui-messages?-(info|warn|error|fatal)-(?:summary|detail)[^"]*"[^>]*>(.*?)</', re.S)
+_RE_OPCAO = re.compile(r'<option[^>]*value="([^"]*)"[^>]*>(.*?)</option>', re.S)
+_RE_NUMERO_NOTA = re.compile(r'n[º°o.]*\s*(\d{3,})', re.I)
+
+
+class ResultadoEmissao(NamedTuple):
+    """Resultado da emissão pelo navegador; verdadeiro apenas quando o portal confirmou a nota"""
+    status: str
+    numero_nota: str = None
+    tempo_ms: int = 0
+    mensagens: tuple = ()
+
+    def __bool__(self):
+        return self.status == ENVIO_EMITIDA
+
+
+class SessaoExpirada(Exception):
+    """O portal redirecionou (login) ou respondeu ViewExpiredException"""
+
+
+def extrair_numero_nota(mensagens):
+    """Número da nota na primeira mensagem que o contém ([(severidade, texto)]), ou None"""
+    for _, texto in mensagens:
+        numero = _RE_NUMERO_NOTA.search(texto)
+        if numero:
+            return numero.group(1)
+    return None
+
+
+def _severidade(severidade):
+    # O JSF pode enviar "INFO 0"; o growl do PrimeFaces, "info"
+    return str(severidade).split()[0].lower() if str(severidade).strip() else ''
+
+
+def classificar_mensagens(mensagens):
+    """
+    Classifica a resposta ao Emitir pelas mensagens do portal ([(severidade, texto)])
+
+    Mensagem de erro ou aviso recusa a nota; ela só conta como emitida quando uma mensagem
+    de sucesso traz o número. Qualquer outra resposta fica sem confirmação.
+
+    Returns:
+        tuple: (status, numero_nota) — numero_nota é None fora de ENVIO_EMITIDA
+    """
+    if any(_severidade(severidade) in SEVERIDADES_ERRO for severidade, _ in mensagens):
+        return ENVIO_ERRO, None
+    numero = extrair_numero_nota([(severidade, texto) for severidade, texto in mensagens
+                                  if _severidade(severidade) in SEVERIDADES_SUCESSO])
+    if numero:
+        return ENVIO_EMITIDA, numero
+    return ENVIO_SEM_CONFIRMACAO, None
+
+
+def sessao_expirou(resposta):
+    """Indica se a resposta interpretada é um redirect (login) ou ViewExpiredException"""
+    return bool(resposta['redirect']) or 'ViewExpiredException' in (resposta['erro'] or '')
+
+
+def _texto_js(texto):
+    try:
+        return json.loads(f'"{texto}"')
+    except ValueError:
+        return texto
+
+
+def interpretar_resposta_parcial(xml):
+    """
+    Interpreta o partial-response do JSF
+
+    Returns:
+        dict: view_state (novo, se enviado), redirect, erro (elemento <error>),
+        validacao_falhou, mensagens [(severidade, texto)] e atualizacoes {id: html}
+    """
+    resultado = {
+        'view_state': None, 'redirect': None, 'erro': None,
+        'validacao_falhou': False, 'mensagens': [], 'atualizacoes': {},
+    }
+    raiz = ET.fromstring(xml)
+
+    redirect = raiz.find('redirect')
+    if redirect is not None:
+        resultado['redirect'] = redirect.get('url')
+
+    erro = raiz.find('error')
+    if erro is not None:
+        nome = erro.findtext('error-name', '')
+        mensagem = erro.findtext('error-message', '')
+        resultado['erro'] = f"{nome}: {mensagem}".strip(': ')
+
+    for update in raiz.iter('update'):
+        id_update = update.get('id', '')
+        conteudo = update.text or ''
+        if 'javax.faces.ViewState' in id_update:
+            resultado['view_state'] = conteudo.strip()
+            continue
+        resultado['atualizacoes'][id_update] = conteudo
+
+        for objeto in _RE_MENSAGEM_GROWL.findall(conteudo):
+            campos = {}
+            for campo, regex in _RE_CAMPO_MENSAGEM.items():
+                encontrado = regex.search(objeto)
+                if encontrado:
+                    campos[campo] = _texto_js(encontrado.group(1) if encontrado.group(1) is not None else encontrado.group(2))
+            if campos.get('severity'):
+                texto = ' '.join(campos[c] for c in ('summary', 'detail') if campos.get(c))
+                resultado['mensagens'].append((campos['severity'].lower(), texto.strip()))
+        for severidade, texto in _RE_MENSAGEM_HTML.findall(conteudo):
+            resultado['mensagens'].append((severidade, html.unescape(re.sub(r'<[^>]+>', '', texto)).strip()))
+
+    for extensao in raiz.iter('extension'):
+        if extensao.get('type') == 'args':
+            try:
+                argumentos = json.loads(extensao.text or '{}')
+            except ValueError:
+                continue
+            resultado['validacao_falhou'] = resultado['validacao_falhou'] or bool(argumentos.get('validationFailed'))
+
+    return resultado
+
+
+class EnvioHTTP:
+    """Sessão HTTP que emite notas reenviando o formulário JSF capturado após o login"""
+
+    def __init__(self, url_acao, cookies, view_state, opcoes, selecionados=None, user_agent=None,
+                 id_formulario='frmConteudo', botao_emitir='frmConteudo:cbEmitirNf',
+                 timeout=15, tamanho_pool=4):
+        """
+        Args:
+            url_acao (str): URL do action do formulário (destino do POST)
+            cookies (list): Cookies da sessão no formato de driver.get_cookies()
+            view_state (str): Valor atual de javax.faces.ViewState
+            opcoes (dict): {id do dropdown: [(value, label)]} lidos da página
+            selecionados (dict): {id do dropdown: value} selecionado na página (estado do servidor)
+            timeout (float): Timeout de cada requisição (segundos)
+            tamanho_pool (int): Conexões mantidas abertas (keep-alive) no pool
+        """
+        self.url_acao = url_acao
+        self.view_state = view_state
+        self.opcoes = {id_dropdown: [tuple(opcao) for opcao in lista] for id_dropdown, lista in opcoes.items()}
+        self.selecionados = dict(selecionados or {})
+        self._indices = {}
+        self.id_formulario = id_formulario
+        self.botao_emitir = botao_emitir
+        self.timeout = timeout
+        self.cabecalhos = {
+            'Faces-Request': 'partial/ajax',
+            'X-Requested-With': 'XMLHttpRequest',
+            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+            'Accept': 'application/xml, text/xml, */*; q=0.01',
+        }
+        self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+        if user_agent:
+            self.cabecalhos['User-Agent'] = user_agent
+        self.pool = urllib3.PoolManager(maxsize=tamanho_pool, retries=False,
+                                        timeout=urllib3.Timeout(total=timeout))
+
+    @classmethod
+    def capturar_do_navegador(cls, driver, id_formulario='frmConteudo', **kwargs):
+        """Cria o envio HTTP a partir da página de emissão aberta (e logada) no Chrome"""
+        sessao = driver.execute_script(JS_CAPTURAR_SESSAO, id_formulario)
+        if not sessao.get('view_state'):
+            raise ValueError("javax.faces.ViewState não encontrado: abra a página de emissão antes de capturar a sessão")
+        return cls(urljoin(driver.current_url, sessao['acao']), driver.get_cookies(), sessao['view_state'],
+                   sessao['opcoes'], sessao['selecionados'], sessao['user_agent'],
+                   id_formulario=id_formulario, **kwargs)
+
+    def _atualizar_cookies(self, resposta):
+        """Aplica os Set-Cookie da resposta aos cookies da sessão (Max-Age=0 remove o cookie)"""
+        for cabecalho in resposta.headers.getlist('Set-Cookie'):
+            try:
+                recebidos = SimpleCookie(cabecalho)
+            except CookieError:
+                continue
+            for nome, morsel in recebidos.items():
+                if morsel['max-age'] in ('0', '-1') or not morsel.value:
+                    self.cookies.pop(nome, None)
+                else:
+                    self.cookies[nome] = morsel.value
+
+    def _post_parcial(self, origem, campos, executar='@all', renderizar='@all', evento=None):
+        """Envia um POST parcial do JSF e retorna a resposta interpretada"""
+        parametros = {
+            'javax.faces.partial.ajax': 'true',
+            'javax.faces.source': origem,
+            'javax.faces.partial.execute': executar,
+            'javax.faces.partial.render': renderizar,
+            self.id_formulario: self.id_formulario,
+        }
+        if evento:
+            parametros['javax.faces.behavior.event'] = evento
+            parametros['javax.faces.partial.event'] = evento
+        else:
+            parametros[origem] = origem
+        parametros.update(campos)
+        parametros['javax.faces.ViewState'] = self.view_state
+
+        cabecalhos = dict(self.cabecalhos)
+        if self.cookies:
+            cabecalhos['Cookie'] = '; '.join(f"{nome}={valor}" for nome, valor in self.cookies.items())
+        resposta = self.pool.request('POST', self.url_acao, body=urlencode(parametros), headers=cabecalhos)
+        self._atualizar_cookies(resposta)
+        if resposta.status >= 400:
+            raise ConnectionError(f"HTTP {resposta.status} ao enviar {origem}")
+        if 300 <= resposta.status < 400:
+            # Sem seguir redirects (retries=False): um 302 aqui é o portal mandando para o login
+            return {'view_state': None, 'redirect': resposta.headers.get('Location') or str(resposta.status),
+                    'erro': None, 'validacao_falhou': False, 'mensagens': [], 'atualizacoes': {}}
+
+        interpretada = interpretar_resposta_parcial(resposta.data.decode('utf-8', errors='replace'))
+        if interpretada['view_state']:
+            self.view_state = interpretada['view_state']
+        return interpretada
+
+    def _alterar_dropdown_pai(self, id_pai, valor):
+        """Dispara o change do dropdown pai (ex.: UF) e lê as novas opções dos dependentes"""
+        dependentes = DEPENDENCIAS_DROPDOWN.get(id_pai, [])
+        resposta = self._post_parcial(id_pai, {f'{id_pai}_input': valor}, executar=id_pai,
+                                      renderizar=' '.join(dependentes), evento='change')
+        if sessao_expirou(resposta):
+            raise SessaoExpirada(resposta['erro'] or f"redirecionado para {resposta['redirect']} ao enviar {id_pai}")
+        self.selecionados[id_pai] = valor
+        for dependente in dependentes:
+            conteudo = next((html_update for id_update, html_update in resposta['atualizacoes'].items()
+                             if id_update.startswith(dependente)), '')
+            self.opcoes[dependente] = [(value, html.unescape(texto).strip())
+                                       for value, texto in _RE_OPCAO.findall(conteudo)]
+
+    def _alterar_cpf(self, id_cpf, cpf):
+        """
+        Dispara o change do CPF do tomador, como o navegador faz ao sair do campo
+
+        No portal esse AJAX consulta o cadastro e guarda o tomador no estado da view; o
+        Emitir enviado sem ele pode ser recusado ou usar o tomador da nota anterior.
+        """
+        resposta = self._post_parcial(id_cpf, {id_cpf: cpf}, executar=id_cpf, renderizar='@form', evento='change')
+        if sessao_expirou(resposta):
+            raise SessaoExpirada(resposta['erro'] or f"redirecionado para {resposta['redirect']} ao enviar {id_cpf}")
+
+    def indice_opcoes(self, id_dropdown):
+        """IndiceOpcoes da lista atual do dropdown, remontado só quando a lista é substituída"""
+        opcoes = self.opcoes.get(id_dropdown, [])
+        lista, indice = self._indices.get(id_dropdown, (None, None))
+        if lista is not opcoes:
+            indice = IndiceOpcoes(opcoes)
+            self._indices[id_dropdown] = (opcoes, indice)
+        return indice
+
+    def converter_plano(self, plano):
+        """
+        Converte o plano de preenchimento no conjunto de campos do POST
+
+        Dropdowns são resolvidos de label para value com as opções capturadas; quando um
+        dropdown pai muda de valor, o change é enviado antes para carregar os dependentes.
+        O change do CPF é sempre reenviado, para o portal consultar o tomador desta nota.
+        Falhas desses POSTs de change (rede, HTTP, XML inválido ou SessaoExpirada) são propagadas.
+
+        Returns:
+            tuple: (campos, erros) — erros lista os passos que não puderam ser resolvidos
+        """
+        campos = {}
+        erros = []
+        for passo in plano:
+            if passo['tipo'] != 'dropdown':
+                campos[passo['id']] = passo['valor']
+                if passo['tipo'] == 'cpf':
+                    self._alterar_cpf(passo['id'], passo['valor'])
+                continue
+
+            opcao = self.indice_opcoes(passo['id']).procurar(passo['valor'])
+            if opcao is None:
+                erros.append(f"{passo['id']}: opção '{passo['valor']}' não encontrada")
+                continue
+            valor = opcao[0]
+            campos[f"{passo['id']}_input"] = valor
+            if passo['id'] in DEPENDENCIAS_DROPDOWN and self.selecionados.get(passo['id']) != valor:
+                self._alterar_dropdown_pai(passo['id'], valor)
+        return campos, erros
+
+    def enviar(self, plano):
+        """
+        Emite uma nota enviando o plano de preenchimento
+
+        Returns:
+            dict: status (emitida, erro, sem_confirmacao ou sessao_expirada), numero_nota,
+            mensagens e tempo_ms
+        """
+        inicio = time.time()
+        resultado = {'status': ENVIO_ERRO, 'numero_nota': None, 'mensagens': [], 'tempo_ms': 0}
+        try:
+            try:
+                campos, erros = self.converter_plano(plano)
+            except SessaoExpirada as e:
+                resultado['status'] = ENVIO_SESSAO_EXPIRADA
+                resultado['mensagens'] = [('error', str(e))]
+                return resultado
+            except (urllib3.exceptions.HTTPError, ConnectionError, ET.ParseError) as e:
+                # Só os POSTs de change (CPF, dropdowns pai) foram enviados: a nota não chegou a ser emitida
+                resultado['mensagens'] = [('error', f"Falha ao preparar o formulário: {e}")]
+                return resultado
+            if erros:
+                resultado['mensagens'] = [('error', erro) for erro in erros]
+                return resultado
+
+            try:
+                resposta = self._post_parcial(self.botao_emitir, campos)
+            except (urllib3.exceptions.HTTPError, ConnectionError, ET.ParseError) as e:
+                # O POST pode ter chegado ao portal: a nota fica para conferência manual
+                resultado['status'] = ENVIO_SEM_CONFIRMACAO
+                resultado['mensagens'] = [('error', f"Falha no envio: {e}")]
+                return resultado
+            resultado['mensagens'] = resposta['mensagens']
+
+            if sessao_expirou(resposta):
+                resultado['status'] = ENVIO_SESSAO_EXPIRADA
+                if resposta['erro']:
+                    resultado['mensagens'].append(('error', resposta['erro']))
+            elif resposta['erro'] or resposta['validacao_falhou']:
+                if resposta['erro']:
+                    resultado['mensagens'].append(('error', resposta['erro']))
+            else:
+                # Sem mensagem de sucesso com número não dá para afirmar que a nota foi emitida
+                resultado['status'], resultado['numero_nota'] = classificar_mensagens(resposta['mensagens'])
+            return resultado
+        finally:
+            resultado['tempo_ms'] = int((time.time() - inicio) * 1000)
+
+    def fechar(self):
+        self.pool.clear()
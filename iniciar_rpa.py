@@ -15,10 +15,20 @@ Autor: Assistente IA
 Versão: 2.0 - Amigável para usuários
 """
 
+import argparse
+import importlib.util
+import logging
 import os
 import sys
-import pandas as pd
+import threading
+import time
 from pathlib import Path
+from typing import NamedTuple
+
+# pandas, selenium e o próprio RPA são importados só quando usados: a verificação de
+# dependências usa find_spec e o Chrome sobe em segundo plano durante a validação
+
+URL_SITE = "https://deiss.indaiatuba.sp.gov.br/Deiss/restrito/nf_emissao.jsf"
 
 def limpar_tela():
     """Limpa a tela do terminal"""
@@ -49,13 +59,12 @@ def verificar_dependencias():
     faltando = []
     instaladas = []
 
-    # Primeiro, verifica quais estão faltando
+    # Primeiro, verifica quais estão faltando (find_spec localiza o pacote sem importá-lo)
     for lib_name, pip_name in dependencias.items():
-        try:
-            __import__(lib_name)
+        if importlib.util.find_spec(lib_name) is not None:
             print(f"   ✅ {lib_name} - OK")
             instaladas.append(lib_name)
-        except ImportError:
+        else:
             print(f"   ❌ {lib_name} - FALTANDO")
             faltando.append((lib_name, pip_name))
 
@@ -70,7 +79,6 @@ def verificar_dependencias():
     print()
 
     import subprocess
-    import sys
 
     sucesso_instalacao = []
     erro_instalacao = []
@@ -89,11 +97,11 @@ def verificar_dependencias():
 
             if resultado.returncode == 0:
                 # Verifica se realmente foi instalado
-                try:
-                    __import__(lib_name)
+                importlib.invalidate_caches()
+                if importlib.util.find_spec(lib_name) is not None:
                     print(f"   ✅ {lib_name} instalado com sucesso!")
                     sucesso_instalacao.append(lib_name)
-                except ImportError:
+                else:
                     print(f"   ❌ {lib_name} instalado mas não pode ser importado")
                     erro_instalacao.append((lib_name, "Erro na importação após instalação"))
             else:
@@ -185,18 +193,61 @@ def encontrar_arquivo_excel():
         except ValueError:
             print("❌ Digite apenas números!")
 
+def mostrar_registro(df, i, mascara):
+    """Mostra um registro da planilha normalizada (ler_planilha) com os problemas dos dados brutos"""
+    import pandas as pd
+
+    row = df.iloc[i]
+    problemas = mascara.iloc[i]
+    print(f"\n📌 REGISTRO {i + 1}:")
+    print(f"   👤 Cliente: {row.get('Nome_Cliente', 'N/A')}")
+    print(f"   🐕 Pet: {row.get('Nome_Pet', 'N/A')}")
+
+    # CPF formatado (já normalizado; vazio segundo a máscara dos dados brutos)
+    if not problemas.get('CPF_vazio', False):
+        cpf_clean = row.get('CPF')
+        cpf_formatted = f"{cpf_clean[:3]}.{cpf_clean[3:6]}.{cpf_clean[6:9]}-{cpf_clean[9:]}"
+        if problemas.get('cpf_formato', False):
+            print(f"   ⚠️  CPF: {cpf_clean} (FORMATO INVÁLIDO)")
+        elif problemas.get('cpf_digito', False):
+            print(f"   ⚠️  CPF: {cpf_formatted} (DÍGITO VERIFICADOR INVÁLIDO)")
+        else:
+            print(f"   🆔 CPF: {cpf_formatted}")
+    else:
+        print(f"   ❌ CPF: Não informado")
+
+    # Valor formatado
+    if problemas.get('Valor_vazio', False):
+        print(f"   ❌ Valor: Não informado")
+    elif problemas.get('valor_invalido', False):
+        print(f"   ⚠️  Valor: não numérico (FORMATO INVÁLIDO)")
+    else:
+        print(f"   💰 Valor: R$ {row.get('Valor'):.2f}")
+
+    # Dados opcionais
+    if pd.notna(row.get('Data')):
+        print(f"   📅 Data: {row.get('Data'):%d/%m/%Y}")
+    if 'Cidade' in df.columns and pd.notna(row.get('Cidade')):
+        print(f"   🏘️  Cidade: {row.get('Cidade')}")
+    if 'Endereco' in df.columns and pd.notna(row.get('Endereco')):
+        print(f"   📍 Endereço: {row.get('Endereco')}")
+
 def validar_arquivo_excel(caminho_arquivo):
     """Valida se o arquivo Excel tem as colunas necessárias com validações detalhadas"""
     print(f"🔍 Validando arquivo: {os.path.basename(caminho_arquivo)}")
     print("=" * 60)
 
     try:
-        # Lê o arquivo Excel
-        df = pd.read_excel(caminho_arquivo)
+        from cache_planilha import ler_planilha
+        from validacao import COLUNAS_OBRIGATORIAS, COLUNAS_OPCIONAIS
+
+        # Lê o arquivo Excel já normalizado, com a validação vetorizada compartilhada com o RPA
+        # (reaproveita o cache se esta versão já foi lida)
+        df, mascara = ler_planilha(caminho_arquivo)
 
         # Colunas obrigatórias e opcionais
-        colunas_obrigatorias = ['Nome_Cliente', 'Nome_Pet', 'CPF', 'Valor']
-        colunas_opcionais = ['Data', 'Cidade', 'Endereco']
+        colunas_obrigatorias = COLUNAS_OBRIGATORIAS
+        colunas_opcionais = COLUNAS_OPCIONAIS
 
         print(f"📊 INFORMAÇÕES GERAIS:")
         print(f"   • Total de registros: {len(df)}")
@@ -231,13 +282,13 @@ def validar_arquivo_excel(caminho_arquivo):
             print("   🔸 Data (data) - Data do serviço DD/MM/AA (opcional)")
             print("   🔸 Cidade (texto) - Cidade do cliente (opcional)")
             print("   🔸 Endereco (texto) - Endereço completo (opcional)")
-            return False, None
+            return False, None, None
 
         # 2. VERIFICAÇÃO DE DADOS VAZIOS
         print("\n🔸 VERIFICAÇÃO DE DADOS VAZIOS:")
         registros_problema = 0
         for coluna in colunas_obrigatorias:
-            vazios = df[coluna].isna().sum()
+            vazios = int(mascara[f'{coluna}_vazio'].sum())
             if vazios > 0:
                 print(f"   ⚠️  {coluna}: {vazios} registros vazios")
                 registros_problema += vazios
@@ -248,39 +299,26 @@ def validar_arquivo_excel(caminho_arquivo):
         print("\n🔸 VALIDAÇÃO DOS DADOS:")
 
         # Validar CPFs
-        cpfs_invalidos = 0
-        if 'CPF' in df.columns:
-            for i, cpf in df['CPF'].items():
-                if pd.notna(cpf):
-                    # Limpeza similar à do RPA
-                    cpf_str = str(cpf).replace('.0', '').replace('.', '').replace('-', '').replace(' ', '')
-                    if not cpf_str.isdigit() or len(cpf_str) != 11:
-                        cpfs_invalidos += 1
-
-            if cpfs_invalidos > 0:
-                print(f"   ⚠️  CPF: {cpfs_invalidos} CPFs inválidos (devem ter 11 dígitos)")
-            else:
-                print(f"   ✅ CPF: todos válidos")
+        cpfs_invalidos = int(mascara['cpf_formato'].sum())
+        cpfs_digito_invalido = int(mascara['cpf_digito'].sum())
+        if cpfs_invalidos > 0:
+            print(f"   ⚠️  CPF: {cpfs_invalidos} CPFs inválidos (devem ter 11 dígitos)")
+        if cpfs_digito_invalido > 0:
+            print(f"   ⚠️  CPF: {cpfs_digito_invalido} CPFs com dígito verificador incorreto")
+        if cpfs_invalidos == 0 and cpfs_digito_invalido == 0:
+            print(f"   ✅ CPF: todos válidos")
 
         # Validar valores
-        valores_invalidos = 0
-        if 'Valor' in df.columns:
-            for i, valor in df['Valor'].items():
-                if pd.notna(valor):
-                    try:
-                        float(str(valor).replace(',', '.'))
-                    except:
-                        valores_invalidos += 1
-
-            if valores_invalidos > 0:
-                print(f"   ⚠️  Valor: {valores_invalidos} valores inválidos")
-            else:
-                print(f"   ✅ Valor: todos válidos")
+        valores_invalidos = int(mascara['valor_invalido'].sum())
+        if valores_invalidos > 0:
+            print(f"   ⚠️  Valor: {valores_invalidos} valores inválidos")
+        else:
+            print(f"   ✅ Valor: todos válidos")
 
         # Verifica se há dados
         if len(df) == 0:
             print("\n❌ ERRO: Arquivo Excel está vazio!")
-            return False, None
+            return False, None, None
 
         # 4. PREVIEW DETALHADO DOS DADOS
         print("\n" + "=" * 60)
@@ -289,44 +327,7 @@ def validar_arquivo_excel(caminho_arquivo):
 
         preview_limit = min(5, len(df))
         for i in range(preview_limit):
-            row = df.iloc[i]
-            print(f"\n📌 REGISTRO {i+1}:")
-            print(f"   👤 Cliente: {row.get('Nome_Cliente', 'N/A')}")
-            print(f"   🐕 Pet: {row.get('Nome_Pet', 'N/A')}")
-
-            # CPF formatado
-            cpf_raw = row.get('CPF', 'N/A')
-            if pd.notna(cpf_raw):
-                # Limpeza igual à do RPA
-                cpf_clean = str(cpf_raw).replace('.0', '').replace('.', '').replace('-', '').replace(' ', '')
-                if len(cpf_clean) == 11 and cpf_clean.isdigit():
-                    cpf_formatted = f"{cpf_clean[:3]}.{cpf_clean[3:6]}.{cpf_clean[6:9]}-{cpf_clean[9:]}"
-                    print(f"   🆔 CPF: {cpf_formatted}")
-                else:
-                    print(f"   ⚠️  CPF: {cpf_raw} → {cpf_clean} (FORMATO INVÁLIDO)")
-            else:
-                print(f"   ❌ CPF: Não informado")
-
-            # Valor formatado
-            valor_raw = row.get('Valor', 'N/A')
-            if pd.notna(valor_raw):
-                try:
-                    valor_num = float(str(valor_raw).replace(',', '.'))
-                    print(f"   💰 Valor: R$ {valor_num:.2f}")
-                except:
-                    print(f"   ⚠️  Valor: {valor_raw} (FORMATO INVÁLIDO)")
-            else:
-                print(f"   ❌ Valor: Não informado")
-
-            # Dados opcionais
-            if 'Data' in df.columns and pd.notna(row.get('Data')):
-                print(f"   📅 Data: {row.get('Data')}")
-
-            if 'Cidade' in df.columns and pd.notna(row.get('Cidade')):
-                print(f"   🏘️  Cidade: {row.get('Cidade')}")
-
-            if 'Endereco' in df.columns and pd.notna(row.get('Endereco')):
-                print(f"   📍 Endereço: {row.get('Endereco')}")
+            mostrar_registro(df, i, mascara)
 
         if len(df) > preview_limit:
             print(f"\n... e mais {len(df) - preview_limit} registros")
@@ -336,7 +337,7 @@ def validar_arquivo_excel(caminho_arquivo):
         print("📊 RESUMO DA VALIDAÇÃO")
         print("=" * 60)
 
-        total_problemas = registros_problema + cpfs_invalidos + valores_invalidos
+        total_problemas = registros_problema + cpfs_invalidos + cpfs_digito_invalido + valores_invalidos
 
         if total_problemas == 0:
             print("✅ ARQUIVO PERFEITO!")
@@ -357,9 +358,9 @@ def validar_arquivo_excel(caminho_arquivo):
             continuar = input("\n⚠️  Encontrados problemas nos dados. Continuar mesmo assim? (S/N): ").strip().upper()
             if continuar != 'S':
                 print("❌ Operação cancelada. Corrija o arquivo Excel e tente novamente.")
-                return False, None
+                return False, None, None
 
-        return True, df
+        return True, df, mascara
 
     except Exception as e:
         print(f"❌ ERRO CRÍTICO ao ler arquivo Excel: {str(e)}")
@@ -368,10 +369,12 @@ def validar_arquivo_excel(caminho_arquivo):
         print("   • Arquivo está aberto em outro programa (feche o Excel)")
         print("   • Problema de permissões de arquivo")
         print("   • Formato de arquivo não suportado")
-        return False, None
+        return False, None, None
 
-def mostrar_estatisticas_detalhadas(df):
+def mostrar_estatisticas_detalhadas(df, mascara):
     """Mostra análise dos dados focada em problemas e validações"""
+    from validacao import COLUNAS_OBRIGATORIAS
+
     print("\n" + "=" * 60)
     print("🔍 ANÁLISE DOS DADOS")
     print("=" * 60)
@@ -386,10 +389,9 @@ def mostrar_estatisticas_detalhadas(df):
 
     # Verificar dados vazios
     print(f"\n🔸 VERIFICAÇÃO DE DADOS VAZIOS:")
-    colunas_obrigatorias = ['Nome_Cliente', 'Nome_Pet', 'CPF', 'Valor']
-    for coluna in colunas_obrigatorias:
+    for coluna in COLUNAS_OBRIGATORIAS:
         if coluna in df.columns:
-            vazios = df[coluna].isna().sum()
+            vazios = int(mascara[f'{coluna}_vazio'].sum())
             if vazios > 0:
                 print(f"   ⚠️  {coluna}: {vazios} registros vazios")
                 problemas_encontrados.append(f"{vazios} registros sem {coluna}")
@@ -398,31 +400,22 @@ def mostrar_estatisticas_detalhadas(df):
 
     # Verificar CPFs inválidos
     print(f"\n🔸 VERIFICAÇÃO DE CPFs:")
-    cpfs_problemas = 0
     if 'CPF' in df.columns:
-        for i, cpf in df['CPF'].items():
-            if pd.notna(cpf):
-                cpf_clean = str(cpf).replace('.0', '').replace('.', '').replace('-', '').replace(' ', '')
-                if not cpf_clean.isdigit() or len(cpf_clean) != 11:
-                    cpfs_problemas += 1
-
+        cpfs_problemas = int(mascara['cpf_formato'].sum())
+        cpfs_digito = int(mascara['cpf_digito'].sum())
         if cpfs_problemas > 0:
             print(f"   ⚠️  {cpfs_problemas} CPFs com formato inválido")
             problemas_encontrados.append(f"{cpfs_problemas} CPFs inválidos")
-        else:
+        if cpfs_digito > 0:
+            print(f"   ⚠️  {cpfs_digito} CPFs com dígito verificador incorreto")
+            problemas_encontrados.append(f"{cpfs_digito} CPFs com dígito verificador incorreto")
+        if cpfs_problemas == 0 and cpfs_digito == 0:
             print(f"   ✅ Todos os CPFs são válidos")
 
     # Verificar valores inválidos
     print(f"\n🔸 VERIFICAÇÃO DE VALORES:")
-    valores_problemas = 0
     if 'Valor' in df.columns:
-        for i, valor in df['Valor'].items():
-            if pd.notna(valor):
-                try:
-                    float(str(valor).replace(',', '.'))
-                except:
-                    valores_problemas += 1
-
+        valores_problemas = int(mascara['valor_invalido'].sum())
         if valores_problemas > 0:
             print(f"   ⚠️  {valores_problemas} valores com formato inválido")
             problemas_encontrados.append(f"{valores_problemas} valores inválidos")
@@ -449,7 +442,7 @@ def mostrar_estatisticas_detalhadas(df):
 
     print("=" * 60)
 
-def mostrar_preview_completo(df):
+def mostrar_preview_completo(df, mascara):
     """Mostra preview de todos os registros com paginação"""
     print("\n" + "=" * 60)
     print("📋 PREVIEW COMPLETO DE TODOS OS REGISTROS")
@@ -467,42 +460,7 @@ def mostrar_preview_completo(df):
         print("-" * 60)
 
         for i in range(inicio, fim):
-            row = df.iloc[i]
-            print(f"\n📌 REGISTRO {i + 1}:")
-            print(f"   👤 Cliente: {row.get('Nome_Cliente', 'N/A')}")
-            print(f"   🐕 Pet: {row.get('Nome_Pet', 'N/A')}")
-
-            # CPF formatado
-            cpf_raw = row.get('CPF', 'N/A')
-            if pd.notna(cpf_raw):
-                # Limpeza igual à do RPA
-                cpf_clean = str(cpf_raw).replace('.0', '').replace('.', '').replace('-', '').replace(' ', '')
-                if len(cpf_clean) == 11 and cpf_clean.isdigit():
-                    cpf_formatted = f"{cpf_clean[:3]}.{cpf_clean[3:6]}.{cpf_clean[6:9]}-{cpf_clean[9:]}"
-                    print(f"   🆔 CPF: {cpf_formatted}")
-                else:
-                    print(f"   ⚠️  CPF: {cpf_raw} → {cpf_clean} (INVÁLIDO)")
-            else:
-                print(f"   ❌ CPF: Não informado")
-
-            # Valor formatado
-            valor_raw = row.get('Valor', 'N/A')
-            if pd.notna(valor_raw):
-                try:
-                    valor_num = float(str(valor_raw).replace(',', '.'))
-                    print(f"   💰 Valor: R$ {valor_num:.2f}")
-                except:
-                    print(f"   ⚠️  Valor: {valor_raw} (INVÁLIDO)")
-            else:
-                print(f"   ❌ Valor: Não informado")
-
-            # Dados opcionais
-            if 'Data' in df.columns and pd.notna(row.get('Data')):
-                print(f"   📅 Data: {row.get('Data')}")
-            if 'Cidade' in df.columns and pd.notna(row.get('Cidade')):
-                print(f"   🏘️  Cidade: {row.get('Cidade')}")
-            if 'Endereco' in df.columns and pd.notna(row.get('Endereco')):
-                print(f"   📍 Endereço: {row.get('Endereco')}")
+            mostrar_registro(df, i, mascara)
 
         print("\n" + "-" * 60)
 
@@ -566,11 +524,120 @@ def escolher_cliente():
         else:
             print("❌ Opção inválida! Digite 1 ou 2.")
 
+class InicioNavegador(NamedTuple):
+    """Resultado da abertura do Chrome em segundo plano"""
+    rpa: object
+    erro: Exception
+    tempos: dict
+
+
+class RetencaoTerminal(logging.Filter):
+    """
+    Retém os registros de log de uma thread em um handler do terminal
+
+    O arquivo de log recebe tudo na hora; no terminal, as mensagens da abertura do Chrome só
+    aparecem em liberar(), sem se misturar ao relatório de validação da thread principal.
+    """
+
+    def __init__(self, handler, id_thread):
+        super().__init__()
+        self.handler = handler
+        self.id_thread = id_thread
+        self.retidos = []
+
+    def filter(self, record):
+        if record.thread != self.id_thread:
+            return True
+        self.retidos.append(record)
+        return False
+
+    def liberar(self):
+        """Remove o filtro e emite no terminal os registros retidos"""
+        self.handler.removeFilter(self)
+        retidos, self.retidos = self.retidos, []
+        for record in retidos:
+            self.handler.handle(record)
+
+
+def handlers_do_terminal():
+    """Handlers do logger raiz que escrevem no terminal (StreamHandler que não é arquivo)"""
+    return [handler for handler in logging.getLogger().handlers
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler)]
+
+
+class NavegadorEmSegundoPlano:
+    """Importa o RPA e abre o Chrome em uma thread enquanto o usuário confere a validação"""
+
+    def __init__(self, url_site, caminho_excel):
+        self.url_site = url_site
+        self.caminho_excel = caminho_excel
+        self.resultado = None
+        self.retencoes = []
+        self.erro_informado = False
+        self.thread = threading.Thread(target=self._iniciar, name='inicio-chrome', daemon=True)
+        self.thread.start()
+
+    def _reter_terminal(self):
+        # Os handlers do terminal são criados pelo setup_logging do RPA, dentro desta thread
+        for handler in handlers_do_terminal():
+            retencao = RetencaoTerminal(handler, threading.get_ident())
+            handler.addFilter(retencao)
+            self.retencoes.append(retencao)
+
+    def _iniciar(self):
+        rpa = None
+        tempos = {}
+        try:
+            inicio = time.perf_counter()
+            from rpa_notas_fiscais import RPANotasFiscais
+            tempos['importação do RPA (selenium, pandas)'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            # O cliente é escolhido depois; configurar_cliente aplica o mapeamento
+            rpa = RPANotasFiscais(self.url_site, self.caminho_excel, None, delay=0.5)
+            self._reter_terminal()
+            rpa.configurar_driver()
+            rpa.navegar_para_site()
+            tempos['abertura do Chrome (em segundo plano)'] = time.perf_counter() - inicio
+            self.resultado = InicioNavegador(rpa, None, tempos)
+        except Exception as e:
+            if rpa and rpa.driver:
+                rpa.driver.quit()
+            self.resultado = InicioNavegador(None, e, tempos)
+
+    def obter(self):
+        """
+        Aguarda a abertura terminar e retorna o InicioNavegador (rpa None se falhou)
+
+        Os registros da thread retidos no terminal são mostrados uma única vez.
+        """
+        self.thread.join()
+        for retencao in self.retencoes:
+            retencao.liberar()
+        self.retencoes.clear()
+        erro = self.resultado.erro
+        if erro and not self.erro_informado:
+            self.erro_informado = True
+            if logging.getLogger().handlers:
+                logging.getLogger(__name__).error(f"Falha ao abrir o Chrome em segundo plano: {erro!r}")
+            print(f"⚠️  Não foi possível abrir o Chrome em segundo plano: {erro}")
+        return self.resultado
+
+
+def mostrar_tempos_inicializacao(tempos, total):
+    """Mostra quanto cada etapa da inicialização levou (--timings)"""
+    print("\n⏱️  TEMPOS DE INICIALIZAÇÃO")
+    print("=" * 50)
+    for etapa, segundos in tempos.items():
+        print(f"   {etapa:<42} {segundos:6.2f}s")
+    print(f"   {'total até o processamento (com as perguntas)':<42} {total:6.2f}s")
+    print("=" * 50)
+
 def mostrar_instrucoes_navegador():
     """Mostra instruções para o navegador"""
     print("\n🌐 INSTRUÇÕES PARA O NAVEGADOR")
     print("=" * 40)
-    print("📋 O navegador será aberto automaticamente.")
+    print("📋 O navegador já foi aberto automaticamente.")
     print("💡 VOCÊ PRECISA FAZER:")
     print()
     print("1. 🔐 Fazer LOGIN no site da prefeitura")
@@ -614,40 +681,65 @@ def confirmar_execucao(total_notas):
 
 def main():
     """Função principal simplificada"""
+    parser = argparse.ArgumentParser(description="Gerador automático de notas fiscais")
+    parser.add_argument('--timings', action='store_true',
+                        help="Mostra o tempo de cada etapa da inicialização")
+    args = parser.parse_args()
+
+    inicio_programa = time.perf_counter()
+    tempos = {}
+    navegador = None
     try:
         limpar_tela()
         mostrar_banner()
 
         # 1. Verificar dependências
+        inicio = time.perf_counter()
         if not verificar_dependencias():
             return
+        tempos['verificação de dependências'] = time.perf_counter() - inicio
 
         # 2. Encontrar arquivo Excel
         caminho_excel = encontrar_arquivo_excel()
         if not caminho_excel:
             return
 
+        # O Chrome sobe enquanto o usuário lê a validação e responde às perguntas
+        navegador = NavegadorEmSegundoPlano(URL_SITE, caminho_excel)
+
         # 3. Validar arquivo Excel e obter dados
-        validacao_ok, df_dados = validar_arquivo_excel(caminho_excel)
+        inicio = time.perf_counter()
+        validacao_ok, df_dados, mascara = validar_arquivo_excel(caminho_excel)
         if not validacao_ok:
             input("Pressione ENTER para sair...")
             return
+        tempos['leitura e validação do Excel'] = time.perf_counter() - inicio
 
         # 4. Mostrar estatísticas detalhadas
-        mostrar_estatisticas_detalhadas(df_dados)
+        mostrar_estatisticas_detalhadas(df_dados, mascara)
 
         # Pergunta se quer ver preview completo
         if len(df_dados) > 5:
             ver_todos = input(f"\n🔍 Quer ver o preview de TODOS os {len(df_dados)} registros? (S/N): ").strip().upper()
             if ver_todos == 'S':
-                mostrar_preview_completo(df_dados)
+                mostrar_preview_completo(df_dados, mascara)
 
         # 5. Escolher cliente
         cliente = escolher_cliente()
 
-        # 6. Usar dados já carregados da validação
+        # 6. Usar dados já carregados da validação (o RPA não relê o Excel)
         total_notas = len(df_dados)
 
+        # Antes da confirmação: o Chrome precisa estar aberto para o login, e uma falha na
+        # abertura (com a saída da thread) aparece agora, não depois de o usuário confirmar
+        inicio = time.perf_counter()
+        inicio_navegador = navegador.obter()
+        rpa = inicio_navegador.rpa
+        tempos['espera pelo Chrome após as perguntas'] = time.perf_counter() - inicio
+        tempos.update(inicio_navegador.tempos)
+        if rpa is None:
+            print("   O robô tentará abrir o Chrome de novo depois da confirmação.")
+
         # 7. Confirmar execução
         modo_teste = confirmar_execucao(total_notas)
 
@@ -660,13 +752,18 @@ def main():
         print("=" * 30)
 
         try:
-            from rpa_notas_fiscais import RPANotasFiscais
-
-            # URL do site (pode ser configurada)
-            url_site = "https://deiss.indaiatuba.sp.gov.br/Deiss/restrito/nf_emissao.jsf"
-
-            # Criar e executar RPA (com delay otimizado)
-            rpa = RPANotasFiscais(url_site, caminho_excel, cliente, delay=0.5)
+            if rpa is None:
+                # Abertura em segundo plano falhou: segue pelo caminho sequencial
+                navegador = None
+                from rpa_notas_fiscais import RPANotasFiscais
+                rpa = RPANotasFiscais(URL_SITE, caminho_excel, None, delay=0.5)
+            rpa.configurar_cliente(cliente)
+            rpa.dados = df_dados
+            # A partir daqui o processar_notas é quem fecha o Chrome
+            navegador = None
+
+            if args.timings:
+                mostrar_tempos_inicializacao(tempos, time.perf_counter() - inicio_programa)
             rpa.processar_notas(modo_teste=modo_teste)
 
         except ImportError:
@@ -680,6 +777,12 @@ def main():
     except Exception as e:
         print(f"\n❌ ERRO INESPERADO: {str(e)}")
         print("Entre em contato com o suporte técnico.")
+    finally:
+        # Saída antes de o RPA assumir o Chrome aberto em segundo plano
+        if navegador is not None:
+            rpa_pendente = navegador.obter().rpa
+            if rpa_pendente and rpa_pendente.driver:
+                rpa_pendente.driver.quit()
 
     input("\nPressione ENTER para sair...")
 
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Inicialização rápida ("warm start") do Chrome
+Guarda o caminho do ChromeDriver resolvido pelo webdriver-manager para não consultar novas
+versões a cada execução (a resolução é refeita apenas quando o Chrome recusa o driver) e
+mantém um perfil dedicado do Chrome (--user-data-dir), para que os cookies da sessão do
+portal sobrevivam entre execuções e o login manual só seja necessário quando ela expirar.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+
+from cache_planilha import PASTA_CACHE
+
+ARQUIVO_DRIVER = os.path.join(PASTA_CACHE, 'chromedriver.json')
+PASTA_PERFIL_CHROME = os.path.join(PASTA_CACHE, 'perfil_chrome')
+
+# Elemento que só existe na página de emissão com o usuário logado
+ID_PAGINA_EMISSAO = 'frmConteudo:cbEmitirNf'
+
+logger = logging.getLogger(__name__)
+
+
+def carregar_caminho_driver(caminho_cache=ARQUIVO_DRIVER):
+    """Caminho do ChromeDriver resolvido anteriormente, se o binário ainda existir"""
+    try:
+        with open(caminho_cache, encoding='utf-8') as arquivo:
+            caminho = json.load(arquivo).get('caminho')
+    except (OSError, ValueError):
+        return None
+    return caminho if caminho and os.path.isfile(caminho) else None
+
+
+def resolver_chromedriver(instalar, forcar=False, caminho_cache=ARQUIVO_DRIVER):
+    """
+    Retorna o caminho do ChromeDriver, resolvendo (download/verificação de versão) só quando preciso
+
+    Args:
+        instalar (callable): Resolve o driver e retorna o caminho (ex.: ChromeDriverManager().install)
+        forcar (bool): Ignora o cache, por exemplo quando o Chrome foi atualizado e recusou o driver
+        caminho_cache (str): Arquivo JSON onde o caminho resolvido é guardado
+
+    Returns:
+        tuple: (caminho, veio_do_cache)
+    """
+    if not forcar:
+        caminho = carregar_caminho_driver(caminho_cache)
+        if caminho:
+            return caminho, True
+
+    caminho = instalar()
+    try:
+        os.makedirs(os.path.dirname(caminho_cache) or '.', exist_ok=True)
+        temporario = caminho_cache + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'caminho': caminho, 'resolvido_em': datetime.now().isoformat(timespec='seconds')},
+                      arquivo, indent=1)
+        os.replace(temporario, caminho_cache)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o caminho do ChromeDriver: {e}")
+    return caminho, False
+
+
+def pasta_perfil(base=PASTA_PERFIL_CHROME, numero_worker=None):
+    """Pasta do perfil do Chrome; cada worker precisa da sua, o Chrome trava o perfil em uso"""
+    pasta = os.path.abspath(base if numero_worker is None else f"{base}_{numero_worker}")
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def pagina_emissao_aberta(driver, id_elemento=ID_PAGINA_EMISSAO):
+    """Indica se a página carregada já é a de emissão (sessão do perfil ainda válida)"""
+    try:
+        return bool(driver.execute_script("return !!document.getElementById(arguments[0]);", id_elemento))
+    except Exception:
+        return False
@@ -160,7 +160,7 @@ def main():
     print()
 
     # Lista de dependências
-    dependencias = ['pandas', 'selenium', 'openpyxl']
+    dependencias = ['pandas', 'selenium', 'openpyxl', 'pyarrow']
 
     print("📋 DEPENDÊNCIAS A INSTALAR:")
     for dep in dependencias:
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Scripts JavaScript injetados na página de emissão do DEISS
+Centraliza os trechos maiores executados via execute_script / execute_async_script
+"""
+
+# Predicados reutilizáveis e espera orientada a eventos (MutationObserver + hooks de AJAX).
+# Cada condição é uma lista [nome, argumento opcional]; a espera termina quando todas valem.
+_JS_PREDICADOS = r"""
+var predicados = {
+    ajax_ocioso: function() {
+        var jqueryAtivo = (typeof jQuery !== 'undefined' && jQuery.active > 0);
+        var pfAtivo = false;
+        if (typeof PrimeFaces !== 'undefined' && PrimeFaces.ajax && PrimeFaces.ajax.Queue &&
+            PrimeFaces.ajax.Queue.isEmpty !== undefined) {
+            pfAtivo = !PrimeFaces.ajax.Queue.isEmpty();
+        }
+        return !jqueryAtivo && !pfAtivo;
+    },
+    sem_loading: function() {
+        var loadings = document.querySelectorAll('.ui-blockui, .loading, [id*="loading"], .ui-ajax-status');
+        return !Array.from(loadings).some(function(el) {
+            return el.style.display !== 'none' && el.offsetParent !== null;
+        });
+    },
+    dropdown_habilitado: function(id) {
+        var dropdown = document.getElementById(id);
+        return !!dropdown && !dropdown.disabled;
+    },
+    dropdown_carregado: function(id) {
+        var select = document.getElementById(id + '_input');
+        return !!select && !select.disabled && select.options.length > 1;
+    },
+    municipios_carregados: function(id) {
+        var dropdown = document.getElementById(id);
+        if (!dropdown || dropdown.disabled) return false;
+        var panel = document.getElementById(id + '_panel');
+        if (panel) return panel.querySelectorAll('.ui-selectonemenu-item').length > 1;
+        return true;
+    },
+    campos_cpf_disponiveis: function() {
+        var ids = ['frmConteudo:itRazaoSocialT', 'frmConteudo:somUfT', 'frmConteudo:itLogradouroT'];
+        return ids.filter(function(id) {
+            var campo = document.getElementById(id);
+            return campo && !campo.disabled;
+        }).length >= 2;
+    },
+    campos_preenchidos: function(ids) {
+        return ids.every(campoPreenchido);
+    },
+    sem_modal: function() {
+        var overlays = document.querySelectorAll('.ui-widget-overlay, .ui-dialog-mask');
+        return !Array.from(overlays).some(function(el) {
+            var estilo = window.getComputedStyle(el);
+            return estilo.display !== 'none' && estilo.visibility !== 'hidden';
+        });
+    },
+    documento_pronto: function() {
+        return document.readyState === 'complete';
+    }
+};
+
+// Campo de texto com valor ou dropdown PrimeFaces com opção além do placeholder
+function campoPreenchido(id) {
+    var select = document.getElementById(id + '_input');
+    if (select && select.tagName === 'SELECT') return select.selectedIndex > 0;
+    var campo = document.getElementById(id);
+    return !!campo && !!campo.value && !!campo.value.trim();
+}
+
+function condicoesAtendidas(condicoes) {
+    return condicoes.every(function(condicao) {
+        try {
+            return predicados[condicao[0]](condicao[1]);
+        } catch (e) {
+            return false;
+        }
+    });
+}
+
+function aguardarCondicoes(condicoes, timeoutMs, pronto) {
+    var inicio = Date.now();
+    var finalizado = false;
+    var observer = null;
+    var seguranca = null;
+    var limite = null;
+    var temJQuery = typeof jQuery !== 'undefined' && jQuery(document).on;
+
+    function finalizar(ok) {
+        if (finalizado) return;
+        finalizado = true;
+        if (observer) observer.disconnect();
+        clearInterval(seguranca);
+        clearTimeout(limite);
+        if (temJQuery) jQuery(document).off('.rpaEspera');
+        pronto({ok: ok, tempo_ms: Date.now() - inicio});
+    }
+
+    function verificar() {
+        if (!finalizado && condicoesAtendidas(condicoes)) finalizar(true);
+    }
+
+    verificar();
+    if (finalizado) return;
+
+    observer = new MutationObserver(verificar);
+    observer.observe(document.body, {childList: true, subtree: true, attributes: true,
+                                     attributeFilter: ['disabled', 'style', 'class']});
+    // jQuery.active só é decrementado depois do ajaxComplete, por isso o setTimeout
+    if (temJQuery) {
+        jQuery(document).on('ajaxComplete.rpaEspera pfAjaxComplete.rpaEspera', function() {
+            setTimeout(verificar, 0);
+        });
+    }
+    // Rede de segurança para mudanças de estado que não geram mutação nem evento
+    seguranca = setInterval(verificar, 250);
+    limite = setTimeout(function() { finalizar(false); }, timeoutMs);
+}
+"""
+
+# Página sem AJAX pendente nem indicador de carregamento (base das esperas adaptativas)
+CONDICOES_PAGINA_PRONTA = [['ajax_ocioso'], ['sem_loading']]
+
+# Aguarda na própria página até que todas as condições sejam verdadeiras.
+# arguments[0]: lista de condições [[nome, argumento], ...]
+# arguments[1]: timeout (ms)
+# Retorna {ok, tempo_ms}
+JS_AGUARDAR_CONDICOES = _JS_PREDICADOS + r"""
+var callback = arguments[arguments.length - 1];
+aguardarCondicoes(arguments[0], arguments[1], callback);
+"""
+
+# Aguarda o AJAX do CPF e lê, na mesma chamada, quais campos o portal preencheu sozinho.
+# arguments[0]: condições de espera (inclui campos_preenchidos quando o cache prevê os campos)
+# arguments[1]: timeout (ms)
+# arguments[2]: {campo lógico: ID do elemento}
+# Retorna {ok, tempo_ms, campos: {campo lógico: bool}}
+JS_AGUARDAR_AUTOPREENCHIMENTO = _JS_PREDICADOS + r"""
+var mapa = arguments[2];
+var callback = arguments[arguments.length - 1];
+aguardarCondicoes(arguments[0], arguments[1], function(resultado) {
+    resultado.campos = {};
+    Object.keys(mapa).forEach(function(campo) {
+        resultado.campos[campo] = campoPreenchido(mapa[campo]);
+    });
+    callback(resultado);
+});
+"""
+
+# Executa um plano de preenchimento inteiro em uma única chamada execute_async_script.
+# arguments[0]: lista de passos {tipo, id, valor, se_vazio, se_diferente, aguardar, esperar_campos, fechar_modal};
+#               nos dropdowns, valor é o value da opção, já escolhida em Python com IndiceOpcoes
+# arguments[1]: timeout (ms) de cada espera de AJAX
+# Retorna {resultados: {id: 'ok' | 'auto' | 'mantido' | 'erro: ...'}, tempo_ms}
+JS_PREENCHER_PLANO = _JS_PREDICADOS + r"""
+var passos = arguments[0];
+var timeoutAjax = arguments[1];
+var callback = arguments[arguments.length - 1];
+var resultados = {};
+var inicio = Date.now();
+
+function disparar(elemento, eventos) {
+    eventos.forEach(function(nome) {
+        elemento.dispatchEvent(new Event(nome, {bubbles: true}));
+    });
+}
+
+function fecharModais() {
+    document.querySelectorAll('.ui-dialog').forEach(function(dialogo) {
+        var estilo = window.getComputedStyle(dialogo);
+        if (estilo.display === 'none' || estilo.visibility === 'hidden') return;
+        var fechar = dialogo.querySelector('.ui-dialog-titlebar-close');
+        if (fechar) fechar.click();
+    });
+}
+
+function selecionarOpcao(passo) {
+    var select = document.getElementById(passo.id + '_input');
+    if (!select) throw new Error('select não encontrado');
+    if (select.disabled) throw new Error('dropdown desabilitado');
+    if (passo.se_vazio && select.selectedIndex > 0) return 'auto';
+
+    // Só o value: a busca por texto é do IndiceOpcoes, a mesma do preenchimento por campo e do envio HTTP
+    var alvo = String(passo.valor);
+    var escolhida = Array.from(select.options).find(function(o) { return o.value === alvo; });
+    if (!escolhida) throw new Error("opção '" + alvo + "' não encontrada");
+    // Valor mantido desde a nota anterior: sem change, sem AJAX e sem espera
+    if (passo.se_diferente && select.value === escolhida.value) return 'mantido';
+
+    if (select.value !== escolhida.value) {
+        select.value = escolhida.value;
+        disparar(select, ['change']);
+    }
+    var label = document.getElementById(passo.id + '_label');
+    if (label) label.textContent = escolhida.text;
+    return 'ok';
+}
+
+function preencherTexto(passo) {
+    var campo = document.getElementById(passo.id);
+    if (!campo) throw new Error('campo não encontrado');
+    if (campo.disabled) throw new Error('campo desabilitado');
+    if (passo.se_vazio && campo.value && campo.value.trim()) return 'auto';
+    if (passo.se_diferente && campo.value === String(passo.valor)) return 'mantido';
+
+    campo.focus();
+    campo.value = passo.valor;
+    disparar(campo, ['input', 'change']);
+    if (passo.tipo === 'cpf') {
+        campo.blur();
+        disparar(campo, ['blur']);
+    }
+    return 'ok';
+}
+
+function executar(indice) {
+    if (indice >= passos.length) {
+        callback({resultados: resultados, tempo_ms: Date.now() - inicio});
+        return;
+    }
+    var passo = passos[indice];
+    try {
+        resultados[passo.id] = passo.tipo === 'dropdown' ? selecionarOpcao(passo) : preencherTexto(passo);
+    } catch (e) {
+        resultados[passo.id] = 'erro: ' + e.message;
+    }
+    if (passo.fechar_modal) fecharModais();
+
+    // Dá tempo para o PrimeFaces disparar a requisição antes de verificar se terminou
+    var atrasoInicial = passo.tipo === 'cpf' ? 100 : 25;
+    var proximo = function() { executar(indice + 1); };
+    if (resultados[passo.id] !== 'ok' || !passo.aguardar) {
+        proximo();
+        return;
+    }
+    var condicoes = [['ajax_ocioso'], ['sem_loading']];
+    if (passo.aguardar !== 'ajax') condicoes.push(['dropdown_carregado', passo.aguardar]);
+    if (passo.esperar_campos && passo.esperar_campos.length) {
+        condicoes.push(['campos_preenchidos', passo.esperar_campos]);
+    }
+    setTimeout(function() { aguardarCondicoes(condicoes, timeoutAjax, proximo); }, atrasoInicial);
+}
+
+document.body.click();
+document.querySelectorAll('[id$="_panel"]').forEach(function(panel) {
+    if (panel.style.display !== 'none') panel.style.display = 'none';
+});
+executar(0);
+"""
+
+# Lê em uma única chamada o estado atual dos campos do formulário.
+# arguments[0]: lista de IDs (dropdowns PrimeFaces pelo ID do componente, campos pelo ID do input)
+# Retorna {id: {valor, texto, desabilitado}}; IDs inexistentes ficam de fora
+JS_LER_ESTADO_FORMULARIO = r"""
+var estado = {};
+arguments[0].forEach(function(id) {
+    var select = document.getElementById(id + '_input');
+    if (select && select.tagName === 'SELECT') {
+        var opcao = select.options[select.selectedIndex];
+        estado[id] = {valor: select.value, texto: opcao ? opcao.text.trim() : '', desabilitado: select.disabled};
+        return;
+    }
+    var campo = document.getElementById(id);
+    if (campo && 'value' in campo) {
+        estado[id] = {valor: campo.value, texto: campo.value, desabilitado: campo.disabled};
+    }
+});
+return estado;
+"""
+
+# Clica em Emitir e aguarda a resposta do portal na mesma chamada: a mensagem de sucesso
+# (com o número da nota) ou de erro que surgir depois do clique.
+# arguments[0]: ID do botão Emitir
+# arguments[1]: timeout (ms)
+# Retorna {clicado, ok, tempo_ms, mensagens: [[severidade, texto], ...]}
+JS_EMITIR_E_AGUARDAR = _JS_PREDICADOS + r"""
+var botao = document.getElementById(arguments[0]);
+var timeoutMs = arguments[1];
+var callback = arguments[arguments.length - 1];
+var SELETOR_MENSAGENS = '.ui-growl-item-container, .ui-growl-item, .ui-messages-info, .ui-messages-warn, ' +
+                        '.ui-messages-error, .ui-messages-fatal, .ui-message-error';
+
+// Mensagens já na tela antes do clique (ex.: growl da nota anterior) não contam
+var anteriores = new Set(document.querySelectorAll(SELETOR_MENSAGENS));
+
+function severidade(elemento) {
+    var classes = elemento.className;
+    if (/error|fatal/.test(classes)) return 'error';
+    if (/warn/.test(classes)) return 'warn';
+    return 'info';
+}
+
+function mensagensNovas() {
+    return Array.from(document.querySelectorAll(SELETOR_MENSAGENS)).filter(function(elemento) {
+        var pai = elemento.parentElement && elemento.parentElement.closest(SELETOR_MENSAGENS);
+        return !anteriores.has(elemento) && !pai && elemento.textContent.trim();
+    }).map(function(elemento) {
+        return [severidade(elemento), elemento.textContent.replace(/\s+/g, ' ').trim()];
+    });
+}
+
+predicados.mensagem_nova = function() {
+    return mensagensNovas().length > 0;
+};
+
+if (!botao || botao.disabled) {
+    callback({clicado: false, ok: false, tempo_ms: 0, mensagens: [['error', 'botão Emitir indisponível']]});
+} else {
+    botao.click();
+    aguardarCondicoes([['mensagem_nova'], ['ajax_ocioso']], timeoutMs, function(resultado) {
+        resultado.clicado = true;
+        resultado.mensagens = mensagensNovas();
+        callback(resultado);
+    });
+}
+"""
+
+# Procura a opção no painel aberto de um dropdown PrimeFaces em uma única chamada: a cascata
+# de seletores e as buscas (data-label exato, texto exato, texto sem acentos e trecho do nome)
+# rodam no navegador, sem um comando do WebDriver por item.
+# arguments[0]: ID do painel
+# arguments[1]: valor procurado
+# arguments[2]: seletor que já funcionou para o painel (testado primeiro) ou null
+# Retorna {elemento, seletor, criterio, data_label, texto, concorrentes} ou, sem correspondência,
+# {elemento: null, seletor, total, rotulos} com os rótulos visíveis para a busca em Python
+JS_ENCONTRAR_OPCAO_PAINEL = r"""
+var painel = document.getElementById(arguments[0]);
+var alvo = String(arguments[1]);
+var lembrado = arguments[2];
+var SELETORES = ['.ui-selectonemenu-item', 'li', '.ui-selectonemenu-list-item', '.ui-menu-item',
+                 "[role='option']", '[data-label]'];
+
+if (!painel) return {elemento: null, seletor: null, total: 0, rotulos: []};
+
+function visivel(elemento) {
+    return !!(elemento.offsetWidth || elemento.offsetHeight || elemento.getClientRects().length);
+}
+
+function normalizar(texto) {
+    return String(texto).normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+        .toUpperCase().replace(/\s+/g, ' ').trim();
+}
+
+var seletores = lembrado ? [lembrado].concat(SELETORES.filter(function(s) { return s !== lembrado; })) : SELETORES;
+var seletor = null;
+var itens = [];
+for (var i = 0; i < seletores.length && !itens.length; i++) {
+    itens = Array.from(painel.querySelectorAll(seletores[i]));
+    seletor = seletores[i];
+}
+if (!itens.length) {
+    seletor = '*';
+    itens = Array.from(painel.querySelectorAll('*'));
+}
+
+var candidatos = itens.filter(visivel).map(function(elemento) {
+    return {elemento: elemento, data_label: elemento.getAttribute('data-label') || '',
+            texto: (elemento.textContent || '').trim()};
+});
+
+function encontrado(candidato, criterio, concorrentes) {
+    return {elemento: candidato.elemento, seletor: seletor, criterio: criterio,
+            data_label: candidato.data_label, texto: candidato.texto, concorrentes: concorrentes || []};
+}
+
+var candidato = candidatos.find(function(c) { return c.data_label === alvo; });
+if (candidato) return encontrado(candidato, 'data-label exato');
+
+candidato = candidatos.find(function(c) { return c.texto === alvo; });
+if (candidato) return encontrado(candidato, 'texto exato');
+
+var alvoNormalizado = normalizar(alvo);
+if (alvoNormalizado) {
+    candidato = candidatos.find(function(c) { return normalizar(c.data_label || c.texto) === alvoNormalizado; });
+    if (candidato) return encontrado(candidato, 'texto normalizado');
+
+    // Trecho do nome: vence o rótulo mais curto (maior parte dele coberta pelo valor procurado)
+    var parciais = candidatos.map(function(c) {
+        var rotulo = normalizar(c.data_label || c.texto);
+        return {candidato: c, rotulo: rotulo, pontuacao: alvoNormalizado.length / (rotulo.length || 1)};
+    }).filter(function(p) {
+        return p.rotulo.indexOf(alvoNormalizado) !== -1;
+    }).sort(function(a, b) { return b.pontuacao - a.pontuacao; });
+    if (parciais.length) {
+        var concorrentes = parciais.length > 1 ? parciais.slice(0, 5).map(function(p) {
+            return [p.candidato.data_label || p.candidato.texto, Math.round(p.pontuacao * 100) / 100];
+        }) : [];
+        return encontrado(parciais[0].candidato, 'busca parcial', concorrentes);
+    }
+}
+
+return {elemento: null, seletor: seletor, total: itens.length,
+        rotulos: candidatos.map(function(c) { return c.data_label || c.texto; })};
+"""
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Registro compacto de uma nota fiscal da planilha
+Substitui as linhas do df.iterrows() (uma pd.Series por linha) por tuplas nomeadas montadas
+uma única vez na carga, com os campos já normalizados e formatados para o formulário:
+CPF como texto, nome em maiúsculas, valor com vírgula decimal e o endereço separado em
+tipo de logradouro, logradouro e número. O laço de emissão só lê atributos.
+"""
+
+from typing import NamedTuple
+
+import pandas as pd
+
+from endereco import extrair_enderecos_serie
+
+# Colunas da planilha preservadas como vieram (após validacao.normalizar_planilha),
+# para que a impressão digital do diário não mude
+COLUNAS_PLANILHA = ['Nome_Cliente', 'CPF', 'Nome_Item', 'Valor', 'Data', 'Cidade', 'Endereco']
+
+
+class NotaFiscal(NamedTuple):
+    """Dados de uma linha da planilha prontos para o preenchimento"""
+    Nome_Cliente: object
+    CPF: str
+    Nome_Item: object
+    Valor: float
+    Data: object
+    Cidade: object
+    Endereco: object
+    nome: str = ''                 # Nome_Cliente em maiúsculas ('' se vazio)
+    valor_formatado: str = ''      # '1234,50'
+    cidade: str = ''               # Cidade em maiúsculas ('' se vazia)
+    tipo_logradouro: str = ''
+    logradouro: str = ''           # Em maiúsculas ('' sem endereço)
+    numero: str = ''
+
+    def get(self, campo, padrao=None):
+        """Acesso por nome da coluna, como em uma linha do DataFrame (usado pelo diário)"""
+        return getattr(self, campo, padrao)
+
+    def __getitem__(self, chave):
+        if isinstance(chave, str):
+            try:
+                return getattr(self, chave)
+            except AttributeError:
+                raise KeyError(chave) from None
+        return tuple.__getitem__(self, chave)
+
+
+def notas_do_dataframe(df):
+    """
+    Converte o DataFrame normalizado por validacao.normalizar_planilha em registros NotaFiscal
+
+    Todas as colunas derivadas, inclusive o endereço, são calculadas de forma vetorizada.
+
+    Args:
+        df (pd.DataFrame): Dados já normalizados (CPF, Valor e Data)
+
+    Returns:
+        list: NotaFiscal na ordem das linhas
+    """
+    vazia = pd.Series([None] * len(df), index=df.index, dtype=object)
+    colunas = {coluna: df[coluna] if coluna in df.columns else vazia for coluna in COLUNAS_PLANILHA}
+
+    nomes = colunas['Nome_Cliente'].fillna('').astype(str).str.upper()
+    valores = [f"{valor:.2f}".replace('.', ',') for valor in colunas['Valor'].tolist()]
+    cidades = colunas['Cidade'].fillna('').astype(str).str.strip().str.upper()
+    enderecos = extrair_enderecos_serie(colunas['Endereco'])
+
+    return list(map(NotaFiscal._make, zip(
+        *(colunas[coluna].tolist() for coluna in COLUNAS_PLANILHA),
+        nomes.tolist(), valores, cidades.tolist(),
+        enderecos['tipo_logradouro'].tolist(), enderecos['logradouro'].str.upper().tolist(),
+        enderecos['numero'].tolist(),
+    )))
+
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Índice de opções dos dropdowns PrimeFaces
+Mantém em memória, por sessão do navegador, a lista (value, label) de cada dropdown
+para que a busca da opção aconteça em Python sem round-trips ao WebDriver; o navegador
+só recebe o value escolhido
+"""
+
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+# Dropdowns cuja lista é recarregada via AJAX quando o dropdown pai muda (UF → município)
+DEPENDENCIAS_DROPDOWN = {
+    'frmConteudo:somUfT': ['frmConteudo:somMunicipioT'],
+    'frmConteudo:somUfIncidencia': ['frmConteudo:somMunicipioIncidencia'],
+    'frmConteudo:somUfServico': ['frmConteudo:somMunicipioServico'],
+}
+DROPDOWNS_DEPENDENTES = {dependente for lista in DEPENDENCIAS_DROPDOWN.values() for dependente in lista}
+
+
+# Semelhança mínima da busca aproximada e diferença de pontuação abaixo da qual há empate
+LIMIAR_APROXIMADO = 0.85
+MARGEM_AMBIGUIDADE = 0.02
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_texto(texto):
+    """Forma usada nas comparações de opções: sem acentos (NFKD), maiúsculas e espaços simples"""
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+    return ' '.join(sem_acentos.upper().split())
+
+
+class IndiceOpcoes:
+    """
+    Índice de uma lista (value, label) de dropdown para buscar a opção sem consultar a página
+
+    Os rótulos são comparados na forma de normalizar_texto, então "SAO PAULO" encontra
+    "SÃO PAULO". A busca segue a ordem: value exato, texto exato, texto normalizado, prefixo
+    (bisect sobre os rótulos ordenados), trecho do rótulo e, por último, semelhança (difflib).
+    Quando mais de uma opção serve, a mais bem pontuada vence e a ambiguidade vai para o log.
+    """
+
+    def __init__(self, opcoes, limiar_aproximado=LIMIAR_APROXIMADO):
+        """
+        Args:
+            opcoes (list): Lista de tuplas (value, label)
+            limiar_aproximado (float): Semelhança mínima (0 a 1) aceita na busca aproximada
+        """
+        self.opcoes = [(str(value), str(label)) for value, label in opcoes]
+        self.limiar_aproximado = limiar_aproximado
+        self._por_value = {}
+        self._por_texto = {}
+        self._por_normalizado = {}
+        normalizados = []
+        for posicao, (value, label) in enumerate(self.opcoes):
+            self._por_value.setdefault(value, posicao)
+            self._por_texto.setdefault(label, posicao)
+            if not value:
+                continue  # Placeholder ("Selecione...") só é escolhido pelo value ou texto exato
+            chave = normalizar_texto(label)
+            self._por_normalizado.setdefault(chave, posicao)
+            normalizados.append((chave, posicao))
+        normalizados.sort()
+        self._chaves = [chave for chave, _ in normalizados]
+        self._posicoes = [posicao for _, posicao in normalizados]
+
+    def __len__(self):
+        return len(self.opcoes)
+
+    def _melhor(self, alvo, candidatos, criterio):
+        """Escolhe o candidato [(pontuacao, posicao)] de maior pontuação, registrando empates"""
+        candidatos.sort(key=lambda candidato: (-candidato[0], candidato[1]))
+        if len(candidatos) > 1:
+            nivel = logging.WARNING if candidatos[0][0] - candidatos[1][0] < MARGEM_AMBIGUIDADE else logging.DEBUG
+            logger.log(nivel, f"Opção ambígua para '{alvo}' ({criterio}): " + ', '.join(
+                f"'{self.opcoes[posicao][1]}'={pontuacao:.2f}" for pontuacao, posicao in candidatos[:5]))
+        return candidatos[0][1], criterio
+
+    def procurar(self, valor):
+        """
+        Encontra a opção correspondente ao valor desejado
+
+        Returns:
+            tuple: (value, label, criterio) ou None se não encontrada
+        """
+        encontrada = self.localizar(valor)
+        if encontrada is None:
+            return None
+        posicao, criterio = encontrada
+        value, label = self.opcoes[posicao]
+        return value, label, criterio
+
+    def localizar(self, valor):
+        """
+        Como procurar, mas retorna a posição da opção na lista original
+
+        Returns:
+            tuple: (posicao, criterio) ou None se não encontrada
+        """
+        alvo = str(valor)
+        if alvo in self._por_value:
+            return self._por_value[alvo], 'value'
+        if alvo in self._por_texto:
+            return self._por_texto[alvo], 'texto exato'
+
+        chave = normalizar_texto(alvo)
+        if not chave:
+            return None
+        if chave in self._por_normalizado:
+            return self._por_normalizado[chave], 'texto normalizado'
+
+        # Prefixo: as chaves ordenadas que começam com o alvo formam um intervalo contíguo
+        inicio = bisect_left(self._chaves, chave)
+        fim = bisect_left(self._chaves, chave + '\uffff', inicio)
+        if inicio < fim:
+            return self._melhor(alvo, [(len(chave) / len(self._chaves[i]), self._posicoes[i])
+                                       for i in range(inicio, fim)], 'prefixo')
+
+        trechos = [(len(chave) / len(texto), posicao) for texto, posicao in zip(self._chaves, self._posicoes)
+                   if chave in texto]
+        if trechos:
+            return self._melhor(alvo, trechos, 'busca flexível')
+
+        return self._procurar_aproximado(alvo, chave)
+
+    def _procurar_aproximado(self, alvo, chave):
+        comparador = SequenceMatcher(autojunk=False)
+        comparador.set_seq2(chave)
+        candidatos = []
+        for texto, posicao in zip(self._chaves, self._posicoes):
+            comparador.set_seq1(texto)
+            if (comparador.real_quick_ratio() >= self.limiar_aproximado
+                    and comparador.quick_ratio() >= self.limiar_aproximado):
+                pontuacao = comparador.ratio()
+                if pontuacao >= self.limiar_aproximado:
+                    candidatos.append((pontuacao, posicao))
+        if not candidatos:
+            return None
+        candidatos.sort(key=lambda candidato: (-candidato[0], candidato[1]))
+        if len(candidatos) > 1 and candidatos[0][0] - candidatos[1][0] < MARGEM_AMBIGUIDADE:
+            # Empate entre nomes parecidos: melhor falhar do que escolher o município errado
+            logger.warning(f"Opção '{alvo}' ambígua na busca aproximada, nenhuma escolhida: " + ', '.join(
+                f"'{self.opcoes[posicao][1]}'={pontuacao:.2f}" for pontuacao, posicao in candidatos[:5]))
+            return None
+        pontuacao, posicao = candidatos[0]
+        logger.warning(f"Opção '{alvo}' escolhida por semelhança: '{self.opcoes[posicao][1]}' ({pontuacao:.2f})")
+        return posicao, f"aproximada ({pontuacao:.2f})"
+
+
+def resolver_opcao(opcoes, valor):
+    """
+    Encontra a opção correspondente ao valor desejado
+
+    Args:
+        opcoes: Lista de tuplas (value, label) ou IndiceOpcoes já montado
+        valor: Valor ou texto procurado
+
+    Returns:
+        tuple: (value, label, criterio) ou None se não encontrada
+    """
+    indice = opcoes if isinstance(opcoes, IndiceOpcoes) else IndiceOpcoes(opcoes)
+    return indice.procurar(valor)
+
+
+class CacheOpcoesDropdown:
+    """Cache por sessão das opções de cada dropdown, com invalidação por dependência"""
+
+    def __init__(self, dependencias=None, compartilhado=None):
+        """
+        Args:
+            dependencias (dict): Dropdown pai → dropdowns recarregados quando ele muda
+            compartilhado (CacheOpcoesDropdown): Cache de outra sessão que guarda as listas fixas
+                (ex.: o do RPA principal no modo paralelo); só os dropdowns dependentes, cuja lista
+                depende do que foi escolhido nesta sessão, ficam neste cache
+        """
+        self.dependencias = DEPENDENCIAS_DROPDOWN if dependencias is None else dependencias
+        self.compartilhado = compartilhado
+        self._dependentes = {dependente for lista in self.dependencias.values() for dependente in lista}
+        self._opcoes = {}
+        self._indices = {}
+        self.lock = threading.Lock()
+
+    def _cache(self, element_id):
+        if self.compartilhado is not None and element_id not in self._dependentes:
+            return self.compartilhado
+        return self
+
+    def obter(self, element_id, carregar):
+        """
+        Retorna as opções do dropdown, carregando-as na primeira utilização
+
+        Args:
+            element_id (str): ID do dropdown PrimeFaces
+            carregar (callable): Função que lê as opções da página em uma chamada
+        """
+        cache = self._cache(element_id)
+        with cache.lock:
+            opcoes = cache._opcoes.get(element_id)
+        if opcoes is not None:
+            return opcoes
+        opcoes = [(str(value), str(label).strip()) for value, label in carregar(element_id)]
+        # Lista com apenas o placeholder indica dropdown ainda carregando: não guarda
+        if len(opcoes) <= 1:
+            return opcoes
+        with cache.lock:
+            return cache._opcoes.setdefault(element_id, opcoes)
+
+    def indice(self, element_id, carregar):
+        """Retorna o IndiceOpcoes do dropdown, montado uma vez por lista carregada"""
+        opcoes = self.obter(element_id, carregar)
+        cache = self._cache(element_id)
+        with cache.lock:
+            if cache._opcoes.get(element_id) is not opcoes:
+                return IndiceOpcoes(opcoes)
+            if element_id not in cache._indices:
+                cache._indices[element_id] = IndiceOpcoes(opcoes)
+            return cache._indices[element_id]
+
+    def invalidar(self, element_id):
+        """Descarta as opções guardadas de um dropdown"""
+        cache = self._cache(element_id)
+        with cache.lock:
+            cache._opcoes.pop(element_id, None)
+            cache._indices.pop(element_id, None)
+
+    def invalidar_dependentes(self, element_id):
+        """Descarta os dropdowns recarregados quando element_id muda"""
+        for dependente in self.dependencias.get(element_id, []):
+            self.invalidar(dependente)
+
+    def limpar(self):
+        """Descarta todo o cache desta sessão (ex.: nova sessão do navegador)"""
+        with self.lock:
+            self._opcoes.clear()
+            self._indices.clear()
+
+    def __contains__(self, element_id):
+        return element_id in self._cache(element_id)._opcoes
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Perfis de inicialização do Chrome
+O perfil 'padrao' mantém o comportamento original (janela visível, tudo carregado).
+O perfil 'desempenho' roda headless com janela fixa pequena e bloqueia, via CDP
+(Network.setBlockedURLs), imagens, fontes e scripts de analytics a cada recarga da página.
+O perfil 'leve' aplica o mesmo bloqueio com a janela visível, para quando é preciso
+fazer o login manualmente. Sem janela não há onde fazer o login: o 'desempenho' só serve
+com o --inicio-rapido e uma sessão já salva no perfil do Chrome (login feito antes com o 'leve').
+"""
+
+# Padrões no formato aceito por Network.setBlockedURLs ('*' casa qualquer sequência)
+BLOQUEIO_IMAGENS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp', '*.bmp']
+BLOQUEIO_FONTES = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+BLOQUEIO_ANALYTICS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*hotjar.com*', '*clarity.ms*', '*/analytics.js*', '*/gtag/js*',
+]
+
+PERFIS_NAVEGADOR = {
+    'padrao': {
+        'descricao': "Chrome visível com todos os recursos da página",
+        'headless': False,
+        'janela': None,
+        'argumentos': [],
+        'bloquear_urls': [],
+    },
+    'leve': {
+        'descricao': "Chrome visível (para o login manual), sem imagens, fontes e analytics",
+        'headless': False,
+        'janela': (1280, 800),
+        'argumentos': ['--disable-extensions', '--no-first-run', '--mute-audio'],
+        'bloquear_urls': BLOQUEIO_IMAGENS + BLOQUEIO_FONTES + BLOQUEIO_ANALYTICS,
+    },
+    'desempenho': {
+        'descricao': "Headless, janela 1280x800, sem imagens, fontes e analytics",
+        'headless': True,
+        'janela': (1280, 800),
+        'argumentos': [
+            '--disable-extensions',
+            '--disable-gpu',
+            '--no-first-run',
+            '--mute-audio',
+            '--disable-background-networking',
+        ],
+        'bloquear_urls': BLOQUEIO_IMAGENS + BLOQUEIO_FONTES + BLOQUEIO_ANALYTICS,
+    },
+}
+
+
+class LoginSemJanela(Exception):
+    """O portal pediu login, mas o Chrome foi aberto sem janela"""
+
+
+def obter_perfil(nome):
+    """Retorna a configuração do perfil, com erro claro para nomes desconhecidos"""
+    try:
+        return PERFIS_NAVEGADOR[nome]
+    except KeyError:
+        raise ValueError(f"Perfil '{nome}' não encontrado. Perfis disponíveis: {list(PERFIS_NAVEGADOR)}")
+
+
+def perfil_sem_janela(perfil, headless=False):
+    """Indica se o Chrome abrirá sem janela (o login manual fica impossível)"""
+    return headless or perfil['headless']
+
+
+def aplicar_perfil_opcoes(chrome_options, perfil, headless=False):
+    """Adiciona às opções do Chrome os argumentos de linha de comando do perfil"""
+    if perfil_sem_janela(perfil, headless):
+        chrome_options.add_argument('--headless=new')
+    largura, altura = perfil['janela'] or ((1366, 900) if headless else (None, None))
+    if largura:
+        chrome_options.add_argument(f'--window-size={largura},{altura}')
+    for argumento in perfil['argumentos']:
+        chrome_options.add_argument(argumento)
+
+
+def aplicar_bloqueio_recursos(driver, perfil):
+    """
+    Ativa o bloqueio de URLs do perfil na sessão do DevTools
+
+    Returns:
+        bool: True se o bloqueio foi aplicado (ou não há nada a bloquear)
+    """
+    if not perfil['bloquear_urls']:
+        return True
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': perfil['bloquear_urls']})
+        return True
+    except Exception:
+        # Drivers sem CDP (ex.: remotos) seguem sem bloqueio
+        return False
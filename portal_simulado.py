@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Portal DEISS simulado para testes locais
+Servidor HTTP que imita a página de emissão (frmConteudo) com os mesmos IDs de elementos,
+AJAX de preenchimento automático pelo CPF e dropdowns de município em cascata, com
+latência configurável. Usado pelo benchmark_rpa.py para medir desempenho sem o portal real.
+Também aceita o POST parcial do JSF (javax.faces.partial.ajax + ViewState + cookie de
+sessão) respondendo com partial-response XML, como destino de teste do envio_http.py.
+
+Uso:
+    python portal_simulado.py --porta 8765 --latencia-ms 150
+"""
+
+import argparse
+import html
+import json
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+UFS = ['SP', 'RJ', 'MG', 'PR']
+
+# Municípios nomeados usados pelos mapeamentos e pelas planilhas de exemplo
+MUNICIPIOS_BASE = {
+    'SP': [
+        ('1111111', 'CIDADE_A'), ('2222222', 'CIDADE_B'), ('3333333', 'CIDADE_C'),
+        ('4444444', 'CIDADE_D'), ('5555555', 'CIDADE_EXEMPLO'), ('3520509', 'INDAIATUBA'),
+        ('3509502', 'CAMPINAS'), ('3550308', 'SÃO PAULO'),
+    ],
+    'RJ': [('3304557', 'RIO DE JANEIRO'), ('3303302', 'NITERÓI')],
+    'MG': [('3106200', 'BELO HORIZONTE')],
+    'PR': [('4106902', 'CURITIBA')],
+}
+
+OPCOES_FIXAS = {
+    'somAtividade': [('501', '501 - SERVIÇOS VETERINÁRIOS'), ('508', '508 - SERVIÇOS DE SAÚDE ANIMAL')],
+    'somTipoPessoa': [('F', 'PESSOA FÍSICA'), ('J', 'PESSOA JURÍDICA')],
+    'somTipoLogradouroT': [
+        ('1', 'RUA'), ('2', 'AVENIDA'), ('3', 'ALAMEDA'), ('4', 'JARDIM'),
+        ('5', 'TRAVESSA'), ('6', 'RODOVIA'), ('7', 'ESTRADA'), ('8', 'PRAÇA'),
+    ],
+    'somExigibilidade': [('1', 'EXIGÍVEL'), ('2', 'NÃO INCIDÊNCIA'), ('3', 'ISENÇÃO')],
+    'somSimplesNacional': [('1', 'Sim'), ('2', 'Não')],
+    'somRegimeEspecial': [('1', 'MICROEMPRESARIO E EMPRESA DE PEQUENO PORTE'), ('2', 'ESTIMATIVA')],
+    'somIssRetido': [('1', 'Sim'), ('2', 'Não')],
+    'somIncentivo': [('1', 'Sim'), ('2', 'Não')],
+}
+
+# Dropdowns UF → município (o segundo é recarregado por AJAX quando o primeiro muda)
+CASCATAS = {
+    'somUfT': 'somMunicipioT',
+    'somUfIncidencia': 'somMunicipioIncidencia',
+    'somUfServico': 'somMunicipioServico',
+}
+
+# Recursos estáticos servidos sem cache (baixados a cada recarga, como no portal real)
+RECURSOS_ESTATICOS = {
+    'brasao.png': ('image/png', 150 * 1024),
+    'banner.jpg': ('image/jpeg', 400 * 1024),
+    'portal.woff2': ('font/woff2', 120 * 1024),
+    'analytics.js': ('application/javascript', 60 * 1024),
+}
+
+PAGINA = r"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>DEISS - Emissão de NFS-e (simulado)</title>
+<style>
+  @font-face { font-family: 'Portal'; src: url('/static/portal.woff2') format('woff2'); }
+  body { font-family: 'Portal', sans-serif; font-size: 13px; }
+  .linha { margin: 4px 0; }
+  .linha label.rotulo { display: inline-block; width: 220px; }
+  .ui-selectonemenu { display: inline-block; min-width: 260px; border: 1px solid #999; padding: 2px; cursor: pointer; }
+  .ui-helper-hidden-accessible { position: absolute; clip: rect(0 0 0 0); height: 1px; width: 1px; overflow: hidden; }
+  .ui-selectonemenu-panel { position: absolute; background: #fff; border: 1px solid #666; max-height: 200px; overflow: auto; z-index: 10; }
+  .ui-selectonemenu-item { list-style: none; padding: 2px 6px; }
+  .ui-selectonemenu-item:hover { background: #ddd; }
+  .ui-blockui { position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0,0,0,.1); }
+  .ui-dialog { position: fixed; top: 30%; left: 30%; background: #fff; border: 2px solid #333; padding: 10px; }
+  .ui-growl { position: fixed; top: 10px; right: 10px; width: 320px; }
+  .ui-growl-item { border: 1px solid #393; background: #efe; padding: 6px; margin-bottom: 4px; }
+  .ui-growl-item.ui-growl-error { border-color: #c33; background: #fee; }
+</style>
+<script async src="/static/analytics.js"></script>
+</head>
+<body>
+<img id="logo" src="/static/brasao.png" alt="Prefeitura" width="120" height="40">
+<img id="banner" src="/static/banner.jpg" alt="" width="600" height="60">
+<form id="frmConteudo" name="frmConteudo" method="post" action="/nf_emissao.jsf" onsubmit="return false;">
+  <input type="hidden" name="frmConteudo" value="frmConteudo">
+  <input type="hidden" name="javax.faces.ViewState" id="javax.faces.ViewState" value="__VIEWSTATE__">
+  <div id="campos"></div>
+  <button type="button" id="frmConteudo:cbEmitirNf">Emitir NFS-e</button>
+</form>
+<div id="frmConteudo:growl" class="ui-growl"></div>
+<div id="blockui" class="ui-blockui" style="display: none"></div>
+<div id="primefacesmessagedlg" class="ui-dialog" style="display: none">
+  <div class="ui-dialog-titlebar"><span>Simples Nacional</span>
+    <a href="#" class="ui-dialog-titlebar-close" onclick="fecharDialogo(); return false;">X</a></div>
+  <div>Confira a alíquota do Simples Nacional.</div>
+</div>
+<script>
+var CONFIG = __CONFIG__;
+var FORM = 'frmConteudo:';
+
+// --- Emulação mínima de jQuery / PrimeFaces para os predicados de espera do RPA ---
+var manipuladores = [];
+window.jQuery = function() {
+    return {
+        on: function(eventos, fn) {
+            eventos.split(' ').forEach(function(ev) {
+                var partes = ev.split('.');
+                manipuladores.push({evento: partes[0], ns: partes[1] || '', fn: fn});
+            });
+            return this;
+        },
+        off: function(eventos) {
+            var ns = eventos.replace(/^\./, '');
+            manipuladores = manipuladores.filter(function(m) { return m.ns !== ns; });
+            return this;
+        }
+    };
+};
+jQuery.active = 0;
+window.PrimeFaces = {ajax: {Queue: {isEmpty: function() { return jQuery.active === 0; }}}};
+
+function ajax(url, corpo) {
+    jQuery.active++;
+    document.getElementById('blockui').style.display = 'block';
+    // Marcadores de requisição parcial do JSF, como os enviados pelo PrimeFaces
+    url += (url.indexOf('?') < 0 ? '?' : '&') + 'javax.faces.partial.ajax=true';
+    var opcoes = {headers: {'Faces-Request': 'partial/ajax'}};
+    if (corpo) {
+        opcoes.method = 'POST';
+        opcoes.body = JSON.stringify(corpo);
+        opcoes.headers['Content-Type'] = 'application/json';
+    }
+    return fetch(url, opcoes).then(function(r) { return r.json(); }).finally(function() {
+        manipuladores.filter(function(m) { return m.evento === 'ajaxComplete'; }).forEach(function(m) { m.fn(); });
+        jQuery.active--;
+        if (jQuery.active === 0) document.getElementById('blockui').style.display = 'none';
+    });
+}
+
+// --- Componentes ---
+function linha(rotulo, elemento) {
+    var div = document.createElement('div');
+    div.className = 'linha';
+    var label = document.createElement('label');
+    label.className = 'rotulo';
+    label.textContent = rotulo;
+    div.appendChild(label);
+    div.appendChild(elemento);
+    document.getElementById('campos').appendChild(div);
+}
+
+function campoTexto(nome, textarea) {
+    var campo = document.createElement(textarea ? 'textarea' : 'input');
+    campo.id = FORM + nome;
+    campo.name = FORM + nome;
+    linha(nome, campo);
+    return campo;
+}
+
+function preencherOpcoes(nome, opcoes) {
+    var select = document.getElementById(FORM + nome + '_input');
+    var lista = document.getElementById(FORM + nome + '_items');
+    select.innerHTML = '';
+    lista.innerHTML = '';
+    [['', 'Selecione']].concat(opcoes).forEach(function(opcao) {
+        var option = document.createElement('option');
+        option.value = opcao[0];
+        option.text = opcao[1];
+        select.appendChild(option);
+        var item = document.createElement('li');
+        item.className = 'ui-selectonemenu-item';
+        item.setAttribute('data-label', opcao[1]);
+        item.setAttribute('role', 'option');
+        item.textContent = opcao[1];
+        item.onclick = function(evento) {
+            evento.stopPropagation();
+            select.value = opcao[0];
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+            document.getElementById(FORM + nome + '_panel').style.display = 'none';
+        };
+        lista.appendChild(item);
+    });
+    document.getElementById(FORM + nome + '_label').textContent = 'Selecione';
+}
+
+function dropdown(nome, opcoes) {
+    var wrapper = document.createElement('div');
+    wrapper.id = FORM + nome;
+    wrapper.className = 'ui-selectonemenu';
+    wrapper.innerHTML =
+        '<div class="ui-helper-hidden-accessible"><select id="' + FORM + nome + '_input" name="' + FORM + nome + '_input"></select></div>' +
+        '<label id="' + FORM + nome + '_label" class="ui-selectonemenu-label">Selecione</label>';
+    linha(nome, wrapper);
+
+    var panel = document.createElement('div');
+    panel.id = FORM + nome + '_panel';
+    panel.className = 'ui-selectonemenu-panel';
+    panel.style.display = 'none';
+    panel.innerHTML = '<ul id="' + FORM + nome + '_items" class="ui-selectonemenu-items"></ul>';
+    document.body.appendChild(panel);
+
+    wrapper.onclick = function() {
+        var rect = wrapper.getBoundingClientRect();
+        panel.style.left = (rect.left + window.scrollX) + 'px';
+        panel.style.top = (rect.bottom + window.scrollY) + 'px';
+        panel.style.display = 'block';
+    };
+
+    var select = document.getElementById(FORM + nome + '_input');
+    select.addEventListener('change', function() {
+        var label = document.getElementById(FORM + nome + '_label');
+        label.textContent = select.selectedIndex >= 0 ? select.options[select.selectedIndex].text : '';
+        if (CONFIG.cascatas[nome]) carregarMunicipios(CONFIG.cascatas[nome], select.value);
+        if (nome === 'somSimplesNacional' && select.value === '1') {
+            document.getElementById('primefacesmessagedlg').style.display = 'block';
+        }
+    });
+    preencherOpcoes(nome, opcoes);
+    return select;
+}
+
+function valorSelect(nome) {
+    return document.getElementById(FORM + nome + '_input').value;
+}
+
+function selecionarValor(nome, valor) {
+    var select = document.getElementById(FORM + nome + '_input');
+    select.value = valor;
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+}
+
+function carregarMunicipios(nome, uf) {
+    var select = document.getElementById(FORM + nome + '_input');
+    select.disabled = true;
+    document.getElementById(FORM + nome).disabled = true;
+    preencherOpcoes(nome, []);
+    if (!uf) return Promise.resolve();
+    return ajax('/ajax/municipios?uf=' + encodeURIComponent(uf)).then(function(municipios) {
+        preencherOpcoes(nome, municipios);
+        select.disabled = false;
+        document.getElementById(FORM + nome).disabled = false;
+    });
+}
+
+function fecharDialogo() {
+    document.getElementById('primefacesmessagedlg').style.display = 'none';
+}
+
+function growl(mensagem, erro) {
+    var item = document.createElement('div');
+    item.className = 'ui-growl-item' + (erro ? ' ui-growl-error' : ' ui-growl-info');
+    item.innerHTML = '<span class="ui-growl-title">' + mensagem + '</span>';
+    document.getElementById('frmConteudo:growl').appendChild(item);
+    setTimeout(function() { item.remove(); }, 5000);
+}
+
+// --- Montagem do formulário ---
+dropdown('somAtividade', CONFIG.opcoes.somAtividade);
+dropdown('somTipoPessoa', CONFIG.opcoes.somTipoPessoa);
+var campoCpf = campoTexto('imCpfCnpjT');
+campoTexto('itRazaoSocialT');
+dropdown('somUfT', CONFIG.ufs);
+dropdown('somMunicipioT', []);
+dropdown('somTipoLogradouroT', CONFIG.opcoes.somTipoLogradouroT);
+['itLogradouroT', 'itNumeroT', 'itCepT', 'itTelefoneT', 'itEmailT'].forEach(function(nome) { campoTexto(nome); });
+dropdown('somUfIncidencia', CONFIG.ufs);
+dropdown('somMunicipioIncidencia', []);
+dropdown('somExigibilidade', CONFIG.opcoes.somExigibilidade);
+dropdown('somSimplesNacional', CONFIG.opcoes.somSimplesNacional);
+dropdown('somRegimeEspecial', CONFIG.opcoes.somRegimeEspecial);
+dropdown('somIssRetido', CONFIG.opcoes.somIssRetido);
+['itValorServico', 'itAliquota', 'itValorDeducoes'].forEach(function(nome) { campoTexto(nome); });
+dropdown('somIncentivo', CONFIG.opcoes.somIncentivo);
+dropdown('somUfServico', CONFIG.ufs);
+dropdown('somMunicipioServico', []);
+campoTexto('itaDescricaoServico', true);
+campoTexto('itaObservacoes', true);
+['itInss', 'itIr', 'itCsll', 'itCofins', 'itPis', 'itOutrasRetencoes'].forEach(function(nome) { campoTexto(nome); });
+
+document.body.addEventListener('click', function(evento) {
+    if (!evento.target.closest || !evento.target.closest('.ui-selectonemenu')) {
+        document.querySelectorAll('.ui-selectonemenu-panel').forEach(function(p) { p.style.display = 'none'; });
+    }
+});
+
+// AJAX do CPF: bloqueia os campos do tomador e preenche com o cadastro, se existir
+var camposTomador = ['itRazaoSocialT', 'somUfT', 'itLogradouroT'];
+campoCpf.addEventListener('change', function() {
+    var cpf = campoCpf.value;
+    camposTomador.forEach(function(nome) { document.getElementById(FORM + nome).disabled = true; });
+    ajax('/ajax/cpf?cpf=' + encodeURIComponent(cpf)).then(function(cadastro) {
+        camposTomador.forEach(function(nome) { document.getElementById(FORM + nome).disabled = false; });
+        if (!cadastro.encontrado) return;
+        document.getElementById(FORM + 'itRazaoSocialT').value = cadastro.nome;
+        document.getElementById(FORM + 'itLogradouroT').value = cadastro.logradouro || '';
+        document.getElementById(FORM + 'itNumeroT').value = cadastro.numero || '';
+        if (cadastro.tipo_logradouro) selecionarValor('somTipoLogradouroT', cadastro.tipo_logradouro);
+        if (cadastro.uf) {
+            selecionarValor('somUfT', cadastro.uf);
+            // selecionarValor dispara o recarregamento; seleciona o município quando chegar
+            var espera = setInterval(function() {
+                var select = document.getElementById(FORM + 'somMunicipioT_input');
+                if (!select.disabled && select.options.length > 1) {
+                    clearInterval(espera);
+                    if (cadastro.municipio) selecionarValor('somMunicipioT', cadastro.municipio);
+                }
+            }, 20);
+        }
+    });
+});
+
+function coletarFormulario() {
+    var dados = {};
+    document.querySelectorAll('#frmConteudo input, #frmConteudo textarea, select').forEach(function(el) {
+        if (el.name) dados[el.name] = el.value;
+    });
+    return dados;
+}
+
+document.getElementById('frmConteudo:cbEmitirNf').addEventListener('click', function() {
+    ajax('/emitir', coletarFormulario()).then(function(resposta) {
+        if (resposta.sucesso) {
+            growl('Nota Fiscal nº ' + resposta.numero + ' emitida com sucesso');
+            // Limpa os dados do tomador; as configurações do prestador permanecem
+            ['imCpfCnpjT', 'itRazaoSocialT', 'itLogradouroT', 'itNumeroT', 'itValorServico',
+             'itaDescricaoServico', 'itaObservacoes'].forEach(function(nome) {
+                document.getElementById(FORM + nome).value = '';
+            });
+            selecionarValor('somUfT', '');
+            selecionarValor('somTipoLogradouroT', '');
+        } else {
+            growl(resposta.erros.join('; '), true);
+        }
+    });
+});
+</script>
+</body>
+</html>
+"""
+
+
+class EstadoPortal:
+    """Estado compartilhado do portal simulado (cadastro de tomadores e notas emitidas)"""
+
+    def __init__(self, latencia_ajax_ms=150, municipios_por_uf=600):
+        self.latencia_ajax_ms = latencia_ajax_ms
+        self.lock = threading.Lock()
+        self.cadastro_cpf = {}
+        self.notas_emitidas = []
+        self.sessoes = {}
+        self.municipios = {}
+        for uf in UFS:
+            nomeados = list(MUNICIPIOS_BASE.get(uf, []))
+            extras = [(f"{uf}{i:05d}", f"MUNICIPIO {uf} {i:03d}") for i in range(municipios_por_uf - len(nomeados))]
+            self.municipios[uf] = sorted(nomeados + extras, key=lambda opcao: opcao[1])
+
+    def aguardar_latencia(self):
+        if self.latencia_ajax_ms:
+            time.sleep(self.latencia_ajax_ms / 1000)
+
+    def consultar_cpf(self, cpf):
+        with self.lock:
+            cadastro = self.cadastro_cpf.get(cpf)
+        return dict(cadastro, encontrado=True) if cadastro else {'encontrado': False}
+
+    def emitir(self, dados):
+        """Valida os campos obrigatórios e registra a nota emitida"""
+        campo = lambda nome: str(dados.get(f'frmConteudo:{nome}', '')).strip()
+        erros = []
+        cpf = campo('imCpfCnpjT')
+        if len(cpf) != 11 or not cpf.isdigit():
+            erros.append('CPF/CNPJ do tomador inválido')
+        if not campo('itRazaoSocialT'):
+            erros.append('Razão social obrigatória')
+        if not campo('itValorServico'):
+            erros.append('Valor do serviço obrigatório')
+        if not campo('somAtividade_input'):
+            erros.append('Atividade obrigatória')
+        if not campo('somMunicipioIncidencia_input'):
+            erros.append('Município de incidência obrigatório')
+        for dropdown_uf, dropdown_municipio in CASCATAS.items():
+            uf, municipio = campo(f'{dropdown_uf}_input'), campo(f'{dropdown_municipio}_input')
+            if municipio and municipio not in {codigo for codigo, _ in self.municipios.get(uf, [])}:
+                erros.append(f'Município {municipio} não pertence à UF {uf or "(vazia)"}')
+        if erros:
+            return {'sucesso': False, 'erros': erros}
+
+        with self.lock:
+            numero = len(self.notas_emitidas) + 1
+            self.notas_emitidas.append(dict(dados, numero=numero))
+            # Tomadores recorrentes passam a ser preenchidos automaticamente pelo CPF
+            self.cadastro_cpf.setdefault(cpf, {
+                'nome': campo('itRazaoSocialT'),
+                'uf': campo('somUfT_input'),
+                'municipio': campo('somMunicipioT_input'),
+                'logradouro': campo('itLogradouroT'),
+                'numero': campo('itNumeroT'),
+                'tipo_logradouro': campo('somTipoLogradouroT_input'),
+            })
+        return {'sucesso': True, 'numero': f"{numero:06d}"}
+
+
+    def nova_sessao(self):
+        """Cria uma sessão (JSESSIONID) com seu ViewState inicial"""
+        with self.lock:
+            sessao = secrets.token_hex(8)
+            self.sessoes[sessao] = 1
+        return sessao, f"{sessao}:1"
+
+    def renovar_view_state(self, sessao, view_state):
+        """Confere o ViewState enviado e devolve o próximo, ou None se expirou/não confere"""
+        with self.lock:
+            sequencia = self.sessoes.get(sessao)
+            if sequencia is None or view_state != f"{sessao}:{sequencia}":
+                return None
+            self.sessoes[sessao] = sequencia + 1
+            return f"{sessao}:{sequencia + 1}"
+
+
+def resposta_parcial(*partes):
+    """Monta um partial-response do JSF"""
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id1">'
+            + ''.join(partes) + '</partial-response>')
+
+
+def update_parcial(id_componente, conteudo):
+    return f'<update id="{id_componente}"><![CDATA[{conteudo}]]></update>'
+
+
+def growl_parcial(mensagens, severidade):
+    msgs = ','.join('{summary:%s,detail:"",severity:\'%s\'}' % (json.dumps(m), severidade) for m in mensagens)
+    return update_parcial('frmConteudo:growl', '<span id="frmConteudo:growl"></span><script>'
+                          "PrimeFaces.cw('Growl','widget_frmConteudo_growl',"
+                          "{id:'frmConteudo:growl',msgs:[%s]});</script>" % msgs)
+
+
+class ManipuladorPortal(BaseHTTPRequestHandler):
+    """Responde às rotas da página de emissão e dos AJAX simulados"""
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def estado(self):
+        return self.server.estado
+
+    def _responder(self, corpo, tipo='application/json; charset=utf-8', status=200, cabecalhos=None):
+        dados = corpo.encode('utf-8') if isinstance(corpo, str) else corpo
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Cache-Control', 'no-store')
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _json(self, objeto):
+        self._responder(json.dumps(objeto, ensure_ascii=False))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+
+        if url.path in ('/', '/nf_emissao.jsf'):
+            config = {
+                'ufs': [[uf, uf] for uf in UFS],
+                'opcoes': OPCOES_FIXAS,
+                'cascatas': CASCATAS,
+            }
+            pagina = PAGINA.replace('__CONFIG__', json.dumps(config, ensure_ascii=False))
+            sessao, view_state = self.estado.nova_sessao()
+            pagina = pagina.replace('__VIEWSTATE__', view_state)
+            self._responder(pagina, 'text/html; charset=utf-8',
+                            cabecalhos={'Set-Cookie': f'JSESSIONID={sessao}; Path=/; HttpOnly'})
+        elif url.path.startswith('/static/') and url.path[8:] in RECURSOS_ESTATICOS:
+            tipo, tamanho = RECURSOS_ESTATICOS[url.path[8:]]
+            self.estado.aguardar_latencia()
+            corpo = b'// analytics simulado\n' + b' ' * tamanho if tipo.endswith('javascript') else bytes(tamanho)
+            self._responder(corpo, tipo)
+        elif url.path == '/ajax/cpf':
+            self.estado.aguardar_latencia()
+            self._json(self.estado.consultar_cpf(parametros.get('cpf', [''])[0]))
+        elif url.path == '/ajax/municipios':
+            self.estado.aguardar_latencia()
+            self._json(self.estado.municipios.get(parametros.get('uf', [''])[0], []))
+        else:
+            self._responder('{}', status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = self.rfile.read(tamanho).decode('utf-8')
+
+        if url.path == '/emitir':
+            self.estado.aguardar_latencia()
+            self._json(self.estado.emitir(json.loads(corpo or '{}')))
+        elif url.path in ('/', '/nf_emissao.jsf') and self.headers.get('Faces-Request') == 'partial/ajax':
+            self.estado.aguardar_latencia()
+            self._responder(self._requisicao_jsf(parse_qs(corpo, keep_blank_values=True)),
+                            'text/xml; charset=utf-8')
+        else:
+            self._responder('{}', status=404)
+
+
+    def _requisicao_jsf(self, parametros):
+        """Trata um POST parcial do JSF: change de UF (cascata) ou clique em Emitir"""
+        campos = {nome: valores[0] for nome, valores in parametros.items()}
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        sessao = cookie['JSESSIONID'].value if 'JSESSIONID' in cookie else None
+        if sessao not in self.estado.sessoes:
+            return resposta_parcial('<redirect url="/login.jsf"/>')
+
+        novo_view_state = self.estado.renovar_view_state(sessao, campos.get('javax.faces.ViewState'))
+        if novo_view_state is None:
+            return resposta_parcial('<error><error-name>javax.faces.application.ViewExpiredException'
+                                    '</error-name><error-message><![CDATA[View não pode ser restaurada]]>'
+                                    '</error-message></error>')
+        atualizar_view_state = update_parcial('j_id1:javax.faces.ViewState:0', novo_view_state)
+
+        origem = campos.get('javax.faces.source', '')
+        nome_origem = origem.split(':', 1)[-1]
+        if nome_origem in CASCATAS:
+            dependente = CASCATAS[nome_origem]
+            opcoes = ''.join(f'<option value="{codigo}">{html.escape(nome)}</option>'
+                             for codigo, nome in self.estado.municipios.get(campos.get(f'{origem}_input'), []))
+            conteudo = (f'<div id="frmConteudo:{dependente}"><select id="frmConteudo:{dependente}_input">'
+                        f'<option value="">Selecione</option>{opcoes}</select></div>')
+            return resposta_parcial('<changes>', update_parcial(f'frmConteudo:{dependente}', conteudo),
+                                    atualizar_view_state, '</changes>')
+
+        if origem == 'frmConteudo:cbEmitirNf':
+            resultado = self.estado.emitir(campos)
+            if resultado['sucesso']:
+                growl = growl_parcial([f"Nota Fiscal nº {resultado['numero']} emitida com sucesso"], 'info')
+            else:
+                growl = growl_parcial(resultado['erros'], 'error')
+            argumentos = json.dumps({'validationFailed': not resultado['sucesso']})
+            return resposta_parcial('<changes>', growl, atualizar_view_state,
+                                    f'<extension ln="primefaces" type="args">{argumentos}</extension>',
+                                    '</changes>')
+
+        return resposta_parcial('<changes>', atualizar_view_state, '</changes>')
+
+
+class PortalSimulado:
+    """Servidor do portal simulado executando em uma thread de fundo"""
+
+    def __init__(self, porta=0, latencia_ajax_ms=150, municipios_por_uf=600):
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', porta), ManipuladorPortal)
+        self.servidor.daemon_threads = True
+        self.servidor.estado = EstadoPortal(latencia_ajax_ms, municipios_por_uf)
+        self.thread = None
+
+    @property
+    def estado(self):
+        return self.servidor.estado
+
+    @property
+    def url(self):
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}/nf_emissao.jsf"
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.servidor.serve_forever, name='portal-simulado', daemon=True)
+        self.thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    """Executa o portal simulado em primeiro plano"""
+    parser = argparse.ArgumentParser(description="Portal DEISS simulado para testes locais")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia-ms', type=int, default=150, help="Latência de cada AJAX simulado")
+    parser.add_argument('--municipios', type=int, default=600, help="Municípios por UF")
+    args = parser.parse_args()
+
+    portal = PortalSimulado(args.porta, args.latencia_ms, args.municipios)
+    print(f"🌐 Portal simulado em {portal.url} (latência AJAX: {args.latencia_ms}ms)")
+    print("Pressione Ctrl+C para encerrar")
+    try:
+        portal.servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Portal simulado encerrado")
+    finally:
+        portal.servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Rastreamento de tempo por etapa do RPA
+Envolve os métodos públicos do RPANotasFiscais em spans aninhados e exporta no formato
+Chrome trace-event (abrir em chrome://tracing ou https://ui.perfetto.dev), além de uma
+tabela de resumo por etapa. Desligado por padrão: sem rastreador nenhum método é envolvido.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Métodos que não fazem sentido como etapa (ou que são chamados antes do rastreador existir)
+METODOS_IGNORADOS = {'setup_logging'}
+
+
+class Rastreador:
+    """Coleta spans aninhados por thread e exporta como Chrome trace"""
+
+    def __init__(self, caminho_saida='rpa_trace.json'):
+        self.caminho_saida = caminho_saida
+        self.eventos = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.inicio = time.perf_counter()
+        self.threads_nomeadas = set()
+
+    def _pilha(self):
+        if not hasattr(self.local, 'pilha'):
+            self.local.pilha = []
+        return self.local.pilha
+
+    def _registrar_thread(self, tid):
+        if tid in self.threads_nomeadas:
+            return
+        self.threads_nomeadas.add(tid)
+        self.eventos.append({
+            'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+            'args': {'name': threading.current_thread().name},
+        })
+
+    @contextmanager
+    def span(self, nome, **args):
+        """Mede o bloco como um span; spans abertos dentro dele ficam aninhados"""
+        pilha = self._pilha()
+        quadro = {'filhos': 0.0}
+        pilha.append(quadro)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            pilha.pop()
+            if pilha:
+                pilha[-1]['filhos'] += duracao
+
+            tid = threading.get_ident()
+            evento = {
+                'name': nome, 'cat': 'rpa', 'ph': 'X', 'pid': self.pid, 'tid': tid,
+                'ts': round((inicio - self.inicio) * 1e6, 1),
+                'dur': round(duracao * 1e6, 1),
+                # Tempo próprio (sem os spans filhos), usado no resumo
+                'args': dict(args, proprio_ms=round((duracao - quadro['filhos']) * 1000, 3)),
+            }
+            with self.lock:
+                self._registrar_thread(tid)
+                self.eventos.append(evento)
+
+    def envolver(self, nome, funcao):
+        """
+        Retorna a função envolvida em um span com o nome informado
+
+        Em funções geradoras, chamar só cria o gerador: cada avanço da iteração (o trabalho
+        até o próximo item) vira um span, aninhado no span de quem consome os itens.
+        """
+        if inspect.isgeneratorfunction(funcao):
+            @functools.wraps(funcao)
+            def rastreada(*args, **kwargs):
+                gerador = funcao(*args, **kwargs)
+                try:
+                    while True:
+                        with self.span(nome):
+                            try:
+                                item = next(gerador)
+                            except StopIteration:
+                                return
+                        yield item
+                finally:
+                    gerador.close()
+        else:
+            @functools.wraps(funcao)
+            def rastreada(*args, **kwargs):
+                with self.span(nome):
+                    return funcao(*args, **kwargs)
+
+        rastreada.rastreada = True
+        return rastreada
+
+    def instrumentar(self, objeto):
+        """Envolve, na instância, todos os métodos públicos definidos na classe"""
+        for nome, _ in inspect.getmembers(type(objeto), inspect.isfunction):
+            if nome.startswith('_') or nome in METODOS_IGNORADOS:
+                continue
+            setattr(objeto, nome, self.envolver(nome, getattr(objeto, nome)))
+        return objeto
+
+    @staticmethod
+    def desinstrumentar(objeto):
+        """Remove os métodos envolvidos da instância (ex.: cópia rasa feita para um worker)"""
+        for nome, valor in list(vars(objeto).items()):
+            if getattr(valor, 'rastreada', False):
+                delattr(objeto, nome)
+        return objeto
+
+    def resumo(self):
+        """
+        Agrega os spans por etapa
+
+        Returns:
+            list: Dicionários ordenados pelo tempo próprio total, com chamadas, total_ms,
+            proprio_ms, medio_ms e max_ms
+        """
+        etapas = {}
+        with self.lock:
+            spans = [evento for evento in self.eventos if evento['ph'] == 'X']
+        for evento in spans:
+            etapa = etapas.setdefault(evento['name'], {
+                'etapa': evento['name'], 'chamadas': 0, 'total_ms': 0.0, 'proprio_ms': 0.0, 'max_ms': 0.0,
+            })
+            duracao_ms = evento['dur'] / 1000
+            etapa['chamadas'] += 1
+            etapa['total_ms'] += duracao_ms
+            etapa['proprio_ms'] += evento['args']['proprio_ms']
+            etapa['max_ms'] = max(etapa['max_ms'], duracao_ms)
+
+        for etapa in etapas.values():
+            etapa['medio_ms'] = etapa['total_ms'] / etapa['chamadas']
+        return sorted(etapas.values(), key=lambda etapa: etapa['proprio_ms'], reverse=True)
+
+    def exportar(self, caminho=None):
+        """Grava os eventos no formato Chrome trace-event JSON"""
+        caminho = caminho or self.caminho_saida
+        with self.lock:
+            eventos = list(self.eventos)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, arquivo, ensure_ascii=False)
+        return caminho
+
+    def mostrar_resumo(self, limite=20):
+        """Imprime a tabela de tempo por etapa (ordenada pelo tempo próprio)"""
+        etapas = self.resumo()
+        if not etapas:
+            return
+
+        print("\n" + "=" * 84)
+        print("🔍 TEMPO POR ETAPA")
+        print("=" * 84)
+        print(f"{'Etapa':<40} {'Chamadas':>8} {'Próprio':>10} {'Total':>10} {'Médio':>10}")
+        for etapa in etapas[:limite]:
+            print(f"{etapa['etapa'][:40]:<40} {etapa['chamadas']:>8} "
+                  f"{etapa['proprio_ms'] / 1000:>9.2f}s {etapa['total_ms'] / 1000:>9.2f}s "
+                  f"{etapa['medio_ms']:>8.0f}ms")
+        print("=" * 84)
+
+    def finalizar(self):
+        """Exporta o trace e mostra o resumo"""
+        caminho = self.exportar()
+        self.mostrar_resumo()
+        print(f"💾 Trace salvo em {caminho} (abra em chrome://tracing ou ui.perfetto.dev)")
+        return caminho
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Rastreamento das requisições AJAX do JSF/PrimeFaces pela rede (Chrome DevTools Protocol)
+Lê os eventos Network.requestWillBeSent / loadingFinished / loadingFailed dos logs de
+desempenho do ChromeDriver, conta as requisições parciais (javax.faces.partial.ajax) em
+andamento e guarda a latência de cada uma. Com isso a espera por "AJAX ocioso" não depende
+de jQuery.active nem da fila do PrimeFaces, que perdem requisições e competem com a renderização.
+"""
+
+import json
+import threading
+import time
+
+# Capability do ChromeDriver que habilita os eventos de rede em driver.get_log('performance')
+CAPABILITY_LOGS = ('goog:loggingPrefs', {'performance': 'ALL'})
+
+# Requisições que nunca terminam (ex.: interrompidas por navegação sem loadingFailed) são descartadas
+IDADE_MAXIMA_EM_VOO = 30.0
+
+
+def percentil(valores, p):
+    """Percentil com interpolação linear (p entre 0 e 100)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def eh_ajax_jsf(requisicao):
+    """Identifica uma requisição parcial do JSF pelo cabeçalho, URL ou corpo do POST"""
+    cabecalhos = {nome.lower(): valor for nome, valor in requisicao.get('headers', {}).items()}
+    if cabecalhos.get('faces-request') == 'partial/ajax':
+        return True
+    return ('javax.faces.partial.ajax' in requisicao.get('url', '')
+            or 'javax.faces.partial.ajax' in requisicao.get('postData', ''))
+
+
+class RastreadorRede:
+    """Contador de requisições AJAX do JSF em andamento, alimentado pelos logs de desempenho"""
+
+    def __init__(self, driver, filtro=eh_ajax_jsf):
+        self.driver = driver
+        self.filtro = filtro
+        self.em_voo = {}
+        self.latencias_ms = []
+        self.falhas = 0
+        self.ultimo_evento = 0.0
+        self.disponivel = True
+        self.lock = threading.Lock()
+
+    def processar_eventos(self):
+        """Consome os eventos acumulados no log de desempenho do ChromeDriver"""
+        try:
+            entradas = self.driver.get_log('performance')
+        except Exception:
+            # Driver sem a capability de logs: as esperas seguem apenas pelo JavaScript
+            self.disponivel = False
+            return
+
+        with self.lock:
+            for entrada in entradas:
+                try:
+                    mensagem = json.loads(entrada['message'])['message']
+                except (KeyError, ValueError):
+                    continue
+                metodo = mensagem.get('method', '')
+                if not metodo.startswith('Network.'):
+                    continue
+                self._tratar_evento(metodo, mensagem.get('params', {}))
+            self._descartar_antigas()
+
+    def _tratar_evento(self, metodo, params):
+        id_requisicao = params.get('requestId')
+        if metodo == 'Network.requestWillBeSent':
+            requisicao = params.get('request', {})
+            if self.filtro(requisicao):
+                self.em_voo[id_requisicao] = (params.get('timestamp', 0.0), time.monotonic())
+                self.ultimo_evento = time.monotonic()
+        elif metodo in ('Network.loadingFinished', 'Network.loadingFailed'):
+            inicio = self.em_voo.pop(id_requisicao, None)
+            if inicio is None:
+                return
+            self.ultimo_evento = time.monotonic()
+            if metodo == 'Network.loadingFailed':
+                self.falhas += 1
+            else:
+                self.latencias_ms.append((params.get('timestamp', inicio[0]) - inicio[0]) * 1000)
+
+    def _descartar_antigas(self):
+        agora = time.monotonic()
+        for id_requisicao, (_, visto_em) in list(self.em_voo.items()):
+            if agora - visto_em > IDADE_MAXIMA_EM_VOO:
+                del self.em_voo[id_requisicao]
+
+    def requisicoes_em_voo(self):
+        """Quantidade de requisições AJAX do JSF ainda sem resposta"""
+        self.processar_eventos()
+        return len(self.em_voo)
+
+    def aguardar_rede_ociosa(self, timeout=8, ociosidade_ms=50, intervalo=0.02):
+        """
+        Aguarda até não haver requisição AJAX em andamento por um intervalo de ociosidade
+
+        A janela de ociosidade cobre a requisição que a página ainda vai disparar logo após
+        a ação (ex.: o change do CPF); ela conta a partir do último evento de rede ou do
+        início da espera, o que for mais recente.
+
+        Args:
+            timeout (float): Tempo máximo de espera (segundos)
+            ociosidade_ms (int): Tempo sem requisições em andamento para considerar a rede ociosa
+            intervalo (float): Intervalo entre leituras do log (segundos)
+
+        Returns:
+            bool: True se a rede ficou ociosa; False em timeout ou sem suporte a logs
+        """
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        while True:
+            self.processar_eventos()
+            if not self.disponivel:
+                return False
+            agora = time.monotonic()
+            if not self.em_voo and agora - max(inicio, self.ultimo_evento) >= ociosidade_ms / 1000:
+                return True
+            if agora >= limite:
+                return False
+            time.sleep(intervalo)
+
+    def estatisticas(self):
+        """Resumo das latências das requisições AJAX concluídas"""
+        with self.lock:
+            latencias = list(self.latencias_ms)
+            falhas = self.falhas
+        return {
+            'requisicoes': len(latencias),
+            'falhas': falhas,
+            'media_ms': sum(latencias) / len(latencias) if latencias else 0.0,
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'max_ms': max(latencias) if latencias else 0.0,
+        }
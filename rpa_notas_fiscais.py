@@ -8,36 +8,112 @@ Sistema genérico adaptável para diferentes prestadores de serviço
 import pandas as pd
 import time
 import logging
+import copy
+import queue
+import threading
+from itertools import chain
+from openpyxl import load_workbook
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, SessionNotCreatedException
+from js_pagina import (JS_AGUARDAR_CONDICOES, JS_AGUARDAR_AUTOPREENCHIMENTO, JS_PREENCHER_PLANO,
+                       JS_LER_ESTADO_FORMULARIO, JS_EMITIR_E_AGUARDAR, JS_ENCONTRAR_OPCAO_PAINEL,
+                       CONDICOES_PAGINA_PRONTA)
+from opcoes_dropdown import CacheOpcoesDropdown, DEPENDENCIAS_DROPDOWN, DROPDOWNS_DEPENDENTES, IndiceOpcoes
+from diario_execucao import DiarioExecucao, ImpressoesLinhas, STATUS_EMITIDA, STATUS_EM_ANDAMENTO
+from cache_planilha import ler_planilha
+from nota_fiscal import notas_do_dataframe
+from endereco import extrair_endereco, mapear_tipo_logradouro
+from cache_cpf import CacheCPF, ARQUIVO_CACHE_CPF, CAMPOS_AUTOPREENCHIMENTO
+from catalogo_municipios import CatalogoMunicipios, ARQUIVO_CATALOGO, DROPDOWNS_MUNICIPIO, MUNICIPIO_TOMADOR
+from controle_tempo import ControladorTempo, ARQUIVO_TEMPOS
+from inicio_rapido import PASTA_PERFIL_CHROME, resolver_chromedriver, pasta_perfil, pagina_emissao_aberta
+from rastreamento import Rastreador
+from envio_http import (EnvioHTTP, ResultadoEmissao, classificar_mensagens, ENVIO_EMITIDA, ENVIO_ERRO,
+                        ENVIO_SEM_CONFIRMACAO, ENVIO_SESSAO_EXPIRADA)
+from rede_cdp import CAPABILITY_LOGS, RastreadorRede
+from perfis_navegador import (PERFIS_NAVEGADOR, LoginSemJanela, obter_perfil, perfil_sem_janela, aplicar_perfil_opcoes,
+                              aplicar_bloqueio_recursos)
+from validacao import normalizar_planilha, completar_colunas_cliente, contar_problemas, cpf_valido
 try:
     from webdriver_manager.chrome import ChromeDriverManager
     from selenium.webdriver.chrome.service import Service
     WEBDRIVER_MANAGER_DISPONIVEL = True
 except ImportError:
     WEBDRIVER_MANAGER_DISPONIVEL = False
-import re
+
+# Linhas normalizadas de uma vez na leitura em streaming (memória constante, primeira nota logo)
+TAMANHO_BLOCO_STREAMING = 200
 
 class RPANotasFiscais:
-    def __init__(self, url_site, caminho_excel, mapeamento_cliente, delay=2):
+    def __init__(self, url_site, caminho_excel, mapeamento_cliente, delay=2, preenchimento_lote=False,
+                 caminho_diario='rpa_diario.sqlite3', retomar=False, leitura_streaming=False, dados=None,
+                 headless=False, rastreador=None, perfil_navegador='padrao', envio_http=False,
+                 usar_cache_cpf=True, preenchimento_diferencial=False, tempos_adaptativos=True,
+                 caminho_tempos=ARQUIVO_TEMPOS, inicio_rapido=False, caminho_catalogo=ARQUIVO_CATALOGO,
+                 atualizar_municipios=False, caminho_cache_cpf=ARQUIVO_CACHE_CPF):
         """
         Inicializa o RPA
 
         Args:
             url_site (str): URL do site de emissão de notas fiscais
             caminho_excel (str): Caminho para o arquivo Excel com os dados
-            mapeamento_cliente (str): Nome do cliente para usar o mapeamento ('cliente_a' ou 'cliente_b')
+            mapeamento_cliente (str): Nome do cliente para usar o mapeamento ('cliente_a' ou 'cliente_b');
+                None adia a escolha para configurar_cliente (ex.: Chrome aberto antes da escolha no iniciar_rpa.py)
             delay (int): Tempo de delay entre ações (segundos)
+            preenchimento_lote (bool): Preenche o formulário em uma única chamada JavaScript
+            caminho_diario (str): Arquivo SQLite do diário de emissões (modo produção)
+            retomar (bool): Pula notas já emitidas segundo o diário de uma execução anterior
+            leitura_streaming (bool): Lê o Excel linha a linha durante o processamento
+            dados (pd.DataFrame): Planilha já lida e normalizada por ler_planilha (ex.: pela validação do iniciar_rpa.py)
+            headless (bool): Executa o Chrome sem janela (ex.: benchmark com o portal simulado)
+            rastreador (Rastreador): Mede o tempo de cada etapa (desligado por padrão)
+            perfil_navegador (str): Perfil do Chrome ('padrao' ou 'desempenho', ver perfis_navegador.py)
+            envio_http (bool): No modo produção, emite as notas por POST direto após o login (envio_http.py)
+            usar_cache_cpf (bool): Usa o cache persistente do preenchimento automático por CPF (cache_cpf.py)
+            preenchimento_diferencial (bool): Escreve só os campos cujo valor atual difere do desejado
+            tempos_adaptativos (bool): Deriva as esperas das latências medidas (controle_tempo.py)
+            caminho_tempos (str): Arquivo dos tempos aprendidos, reaproveitados entre execuções (None desativa)
+            inicio_rapido (bool): Reaproveita o ChromeDriver resolvido e um perfil do Chrome com a sessão
+                do portal, pulando o login quando ela ainda é válida (inicio_rapido.py)
+            caminho_catalogo (str): Catálogo de municípios coletado do portal (None mantém só em memória)
+            atualizar_municipios (bool): Coleta os municípios de todas as UFs, mesmo dentro da validade
+            caminho_cache_cpf (str): Arquivo do cache de CPF (None mantém só em memória)
         """
         self.url_site = url_site
         self.caminho_excel = caminho_excel
         self.delay = delay
+        self.preenchimento_lote = preenchimento_lote
+        self.preenchimento_diferencial = preenchimento_diferencial
+        self.caminho_diario = caminho_diario
+        self.retomar = retomar
+        self.leitura_streaming = leitura_streaming
+        self.dados = dados
+        self.headless = headless
+        self.rastreador = rastreador
+        self.envio_http = envio_http
+        self.sessao_http = None
+        self.nome_perfil_navegador = perfil_navegador
+        self.perfil_navegador = obter_perfil(perfil_navegador)
+        self.inicio_rapido = inicio_rapido
+        self.pasta_perfil_chrome = PASTA_PERFIL_CHROME if inicio_rapido else None
         self.driver = None
         self.wait = None
+        self.rede = None
+        self.cache_opcoes = CacheOpcoesDropdown()
+        # Seletor CSS que encontrou os itens de cada painel de dropdown (o mesmo em todos os workers)
+        self.seletores_painel = {}
+        # Compartilhado entre os workers do modo paralelo (thread-safe)
+        self.cache_cpf = CacheCPF(caminho_cache_cpf) if usar_cache_cpf else None
+        self.catalogo_municipios = CatalogoMunicipios(caminho_catalogo)
+        self.atualizar_municipios = atualizar_municipios
+        self.tempo = ControladorTempo(adaptativo=tempos_adaptativos)
+        self.caminho_tempos = caminho_tempos if tempos_adaptativos else None
+        if self.caminho_tempos:
+            self.tempo.carregar(self.caminho_tempos)
         self.setup_logging()
 
         # Definir mapeamentos por cliente
@@ -88,7 +164,16 @@ class RPANotasFiscais:
             }
         }
 
-        # Configurar mapeamento baseado no cliente selecionado
+        self.configuracoes_padrao = None
+        self.cliente_atual = None
+        if mapeamento_cliente is not None:
+            self.configurar_cliente(mapeamento_cliente)
+
+        if self.rastreador:
+            self.rastreador.instrumentar(self)
+
+    def configurar_cliente(self, mapeamento_cliente):
+        """Aplica o mapeamento de configurações do cliente selecionado"""
         if mapeamento_cliente.lower() in self.mapeamentos_clientes:
             self.configuracoes_padrao = self.mapeamentos_clientes[mapeamento_cliente.lower()]
             self.cliente_atual = mapeamento_cliente.lower()
@@ -142,7 +227,7 @@ class RPANotasFiscais:
                 self.logger.info("Modal do Simples Nacional detectado, fechando...")
                 close_btn = modal_simples[0].find_element(By.CSS_SELECTOR, ".ui-dialog-titlebar-close")
                 close_btn.click()
-                time.sleep(1)
+                self.pausa('modal', [['sem_modal']])
 
             # Procura por outros modais/overlays
             modal_overlay = self.driver.find_elements(By.CSS_SELECTOR, ".ui-widget-overlay, .ui-dialog-mask")
@@ -155,7 +240,7 @@ class RPANotasFiscais:
                     try:
                         if btn.is_displayed() and btn.is_enabled():
                             btn.click()
-                            time.sleep(0.5)
+                            self.pausa('modal', [['sem_modal']])
                             break
                     except:
                         continue
@@ -164,7 +249,7 @@ class RPANotasFiscais:
                 if self.driver.find_elements(By.CSS_SELECTOR, ".ui-widget-overlay, .ui-dialog-mask"):
                     from selenium.webdriver.common.keys import Keys
                     self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-                    time.sleep(0.5)
+                    self.pausa('modal', [['sem_modal']])
 
         except Exception as e:
             self.logger.debug(f"Erro ao fechar modal: {str(e)}")
@@ -192,7 +277,7 @@ class RPANotasFiscais:
                     which: 27
                 }));
             """)
-            time.sleep(0.1)
+            self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
         except Exception as e:
             self.logger.debug(f"Erro ao fechar dropdowns: {str(e)}")
 
@@ -203,24 +288,40 @@ class RPANotasFiscais:
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
-
+            aplicar_perfil_opcoes(chrome_options, self.perfil_navegador, self.headless)
+            # Eventos de rede do DevTools, usados pelo RastreadorRede nas esperas de AJAX
+            chrome_options.set_capability(*CAPABILITY_LOGS)
+            if self.pasta_perfil_chrome:
+                chrome_options.add_argument(
+                    f"--user-data-dir={pasta_perfil(self.pasta_perfil_chrome, getattr(self, 'numero_worker', None))}")
+
+            if WEBDRIVER_MANAGER_DISPONIVEL and self.inicio_rapido:
+                self.driver = self.iniciar_chrome_com_driver_em_cache(chrome_options)
             # Tenta usar webdriver-manager para download automático do ChromeDriver
-            if WEBDRIVER_MANAGER_DISPONIVEL:
+            elif WEBDRIVER_MANAGER_DISPONIVEL:
                 try:
-                    print("🔧 Configurando ChromeDriver automaticamente...")
+                    self.logger.info("🔧 Configurando ChromeDriver automaticamente...")
                     service = Service(ChromeDriverManager().install())
                     self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                    print("✅ ChromeDriver configurado automaticamente!")
+                    self.logger.info("✅ ChromeDriver configurado automaticamente!")
                 except Exception as e:
-                    print(f"⚠️  Falha no download automático: {e}")
-                    print("🔧 Tentando usar ChromeDriver local...")
+                    self.logger.warning(f"⚠️  Falha no download automático: {e}")
+                    self.logger.info("🔧 Tentando usar ChromeDriver local...")
                     self.driver = webdriver.Chrome(options=chrome_options)
             else:
                 # Fallback para ChromeDriver local
                 self.driver = webdriver.Chrome(options=chrome_options)
 
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver.set_script_timeout(60)
+            if self.perfil_navegador['bloquear_urls']:
+                if aplicar_bloqueio_recursos(self.driver, self.perfil_navegador):
+                    self.logger.info(f"Perfil '{self.nome_perfil_navegador}': "
+                                     f"{len(self.perfil_navegador['bloquear_urls'])} padrões de URL bloqueados")
+                else:
+                    self.logger.warning("Bloqueio de recursos via CDP indisponível neste driver")
             self.wait = WebDriverWait(self.driver, 10)
+            self.rede = RastreadorRede(self.driver)
 
             self.logger.info("Driver configurado com sucesso")
 
@@ -236,52 +337,57 @@ Possíveis soluções:
 
 Erro técnico: {str(e)}
             """
-            print(error_msg)
-            self.logger.error(f"Erro ao configurar driver: {str(e)}")
+            # Pelo logger: com o Chrome aberto em segundo plano (iniciar_rpa.py) a mensagem só
+            # aparece no terminal quando a thread principal recolhe o resultado
+            self.logger.error(f"Erro ao configurar driver: {str(e)}{error_msg}")
             raise
 
+    def iniciar_chrome_com_driver_em_cache(self, chrome_options):
+        """Abre o Chrome com o ChromeDriver em cache, resolvendo de novo só se o Chrome o recusar"""
+        caminho, do_cache = resolver_chromedriver(lambda: ChromeDriverManager().install())
+        try:
+            return webdriver.Chrome(service=Service(caminho), options=chrome_options)
+        except SessionNotCreatedException as e:
+            if not do_cache:
+                raise
+            # Normalmente o Chrome foi atualizado e o driver em cache ficou para trás
+            self.logger.warning(f"ChromeDriver em cache recusado ({str(e).splitlines()[0]}), resolvendo novamente")
+            caminho, _ = resolver_chromedriver(lambda: ChromeDriverManager().install(), forcar=True)
+            return webdriver.Chrome(service=Service(caminho), options=chrome_options)
+
+    def aguardar_login(self, mensagem="Pressione ENTER após fazer login no site e estar na página de emissão..."):
+        """Pede o login manual, exceto quando o perfil persistente já abriu a página de emissão logada"""
+        if self.inicio_rapido and pagina_emissao_aberta(self.driver):
+            print("🔓 Sessão anterior ainda válida no perfil do Chrome, pulando o login")
+            return
+        self.exigir_janela_para_login()
+        input(mensagem)
+
+    def exigir_janela_para_login(self):
+        """Interrompe a execução se o login manual for necessário com o Chrome sem janela"""
+        if perfil_sem_janela(self.perfil_navegador, self.headless):
+            raise LoginSemJanela(
+                f"O perfil '{self.nome_perfil_navegador}' roda sem janela e a sessão do portal não está "
+                f"aberta. Faça o login uma vez com --perfil leve --inicio-rapido e execute de novo.")
+
     def ler_dados_excel(self):
         """Lê e processa os dados do Excel"""
         try:
-            df = pd.read_excel(self.caminho_excel)
-
-            # Limpeza e formatação dos dados obrigatórios do CPF
-            df['CPF'] = df['CPF'].astype(str).str.replace('zero', '0').str.replace('nan', '00000000000')
-
-            # Remove .0 APENAS do final (quando vem de float do Excel) - mais preciso
-            df['CPF'] = df['CPF'].str.replace(r'\.0$', '', regex=True)  # Remove .0 apenas do final
-
-            # Remove pontos e traços de formatação
-            df['CPF'] = df['CPF'].str.replace('.', '', regex=False).str.replace('-', '', regex=False)
-
-            # Garante que seja apenas dígitos
-            df['CPF'] = df['CPF'].str.replace(r'[^\d]', '', regex=True)
-
-            # Preenche com zeros à esquerda para ter 11 dígitos
-            df['CPF'] = df['CPF'].str.zfill(11)
+            if self.dados is not None:
+                # Já normalizada e validada pelo iniciar_rpa.py (ler_planilha)
+                df = completar_colunas_cliente(self.dados, self.cliente_atual)
+            else:
+                # Normalizada como na leitura em streaming; validação feita sobre os dados brutos
+                df, mascara = ler_planilha(self.caminho_excel, self.cliente_atual)
+                problemas = contar_problemas(mascara)
+                if problemas:
+                    self.logger.warning(f"Problemas encontrados na planilha: {problemas}")
 
             # Log para debug de CPFs processados
             self.logger.info("CPFs processados (primeiros 5):")
             for i, cpf in enumerate(df['CPF'].head(5)):
                 self.logger.info(f"  Registro {i+1}: {cpf} (tamanho: {len(cpf)})")
 
-            df['Valor'] = df['Valor'].astype(str).str.replace(',', '.')
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-
-            # Formatação da data - apenas se a coluna existir
-            if 'Data' in df.columns:
-                df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%y', errors='coerce')
-            else:
-                # Se não tem Data, cria uma coluna vazia
-                df['Data'] = None
-
-            # Verificação de colunas opcionais
-            if self.cliente_atual == 'cliente_b':
-                colunas_opcionais = ['Cidade', 'Endereco']
-                for coluna in colunas_opcionais:
-                    if coluna not in df.columns:
-                        df[coluna] = ''  # Cria coluna vazia se não existir
-
             self.logger.info(f"Dados carregados: {len(df)} registros")
             self.logger.info(f"Colunas disponíveis: {list(df.columns)}")
             return df
@@ -290,12 +396,65 @@ Erro técnico: {str(e)}
             self.logger.error(f"Erro ao ler Excel: {str(e)}")
             raise
 
+    def contar_registros_excel(self):
+        """Estima o total de registros pela dimensão da planilha, sem ler as linhas"""
+        try:
+            workbook = load_workbook(self.caminho_excel, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+                return max_row - 1 if max_row else None
+            finally:
+                workbook.close()
+        except Exception:
+            return None
+
+    def ler_dados_excel_streaming(self):
+        """
+        Lê o Excel linha a linha em modo read_only, normalizando cada registro sob demanda
+
+        Gera tuplas (index, NotaFiscal) como a leitura completa, com memória constante
+        independentemente do tamanho da planilha. As linhas são normalizadas em blocos de
+        TAMANHO_BLOCO_STREAMING pela mesma normalizar_planilha da leitura completa; o navegador
+        começa a trabalhar no primeiro bloco enquanto o restante do arquivo ainda não foi lido.
+        """
+        workbook = load_workbook(self.caminho_excel, read_only=True, data_only=True)
+        try:
+            linhas = workbook.active.iter_rows(values_only=True)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                return
+            colunas = [str(coluna).strip() if coluna is not None else '' for coluna in cabecalho]
+            self.logger.info(f"Leitura em streaming - colunas disponíveis: {colunas}")
+
+            index = 0
+            bloco = []
+            for valores in chain(linhas, [None]):
+                if valores is not None:
+                    if all(valor is None for valor in valores):
+                        continue
+                    # Em read_only as células vazias do final da linha não são retornadas
+                    bloco.append(tuple(valores) + (None,) * (len(colunas) - len(valores)))
+                    if len(bloco) < TAMANHO_BLOCO_STREAMING:
+                        continue
+                if not bloco:
+                    break
+                # Cada bloco passa pela mesma normalização da leitura completa
+                df = normalizar_planilha(pd.DataFrame.from_records(bloco, columns=colunas), self.cliente_atual)
+                for nota in notas_do_dataframe(df):
+                    yield index, nota
+                    index += 1
+                bloco = []
+
+            self.logger.info(f"Dados lidos em streaming: {index} registros")
+        finally:
+            workbook.close()
+
     def navegar_para_site(self):
         """Navega para o site de notas fiscais"""
         try:
             self.driver.get(self.url_site)
             self.logger.info("Navegação para o site realizada")
-            time.sleep(1)
+            self.pausa('navegacao', [['documento_pronto']] + CONDICOES_PAGINA_PRONTA)
         except Exception as e:
             self.logger.error(f"Erro ao navegar para o site: {str(e)}")
             raise
@@ -310,63 +469,115 @@ Erro técnico: {str(e)}
             self.logger.warning(f"Timeout aguardando elemento: {locator}")
             return None
 
-    def aguardar_ajax_cpf(self, timeout=8):
-        """Wait inteligente para AJAX do CPF e preenchimento automático de campos"""
+    def aguardar_condicoes(self, condicoes, timeout):
+        """
+        Aguarda dentro da página até que todas as condições sejam verdadeiras
+
+        A espera roda via execute_async_script com MutationObserver e hooks de AJAX do
+        jQuery/PrimeFaces, retornando assim que o estado muda, sem polling pelo WebDriver.
+        Quando os logs de rede do Chrome estão disponíveis, antes aguarda não haver
+        requisição parcial do JSF em andamento (RastreadorRede).
+
+        Args:
+            condicoes (list): Predicados de js_pagina no formato [nome] ou [nome, argumento]
+            timeout (float): Tempo máximo de espera (segundos)
+        """
+        resultado = self.executar_espera(JS_AGUARDAR_CONDICOES, condicoes, timeout)
+        return bool(resultado and resultado.get('ok'))
+
+    def pausa(self, etapa, condicoes=None):
+        """
+        Espera adaptativa de uma etapa (controle_tempo.py)
+
+        Sem condições é uma pausa com o tempo aprendido para a etapa. Com condições, a página
+        é observada até elas valerem, usando o tempo aprendido como limite; a duração real
+        alimenta o modelo da etapa e um timeout entra como amostra censurada.
+
+        Returns:
+            bool: False se as condições não foram atendidas dentro do limite
+        """
+        espera = self.tempo.espera(etapa)
+        if not condicoes or not self.driver or not self.tempo.adaptativo:
+            time.sleep(espera)
+            return True
+
+        inicio = time.perf_counter()
         try:
-            inicio = time.time()
+            ok = self.aguardar_condicoes(condicoes, espera)
+        except Exception as e:
+            self.logger.debug(f"Espera adaptativa '{etapa}' falhou: {e}")
+            ok = False
+        if ok:
+            self.tempo.registrar(etapa, time.perf_counter() - inicio)
+        else:
+            self.tempo.registrar_timeout(etapa, espera)
+        return ok
 
-            while (time.time() - inicio) < timeout:
-                try:
-                    ajax_ativo = self.driver.execute_script("""
-                        var jqueryAtivo = (typeof jQuery !== 'undefined' && jQuery.active > 0);
-                        var pfAtivo = false;
-                        if (typeof PrimeFaces !== 'undefined' && PrimeFaces.ajax) {
-                            pfAtivo = PrimeFaces.ajax.Queue.isEmpty !== undefined ?
-                                     !PrimeFaces.ajax.Queue.isEmpty() : false;
-                        }
-                        return jqueryAtivo || pfAtivo;
-                    """)
+    def executar_espera(self, script, condicoes, timeout, *argumentos):
+        """Executa um script de espera de js_pagina (rede ociosa antes, se disponível) e retorna seu resultado"""
+        if self.rede and self.rede.disponivel:
+            inicio = time.time()
+            self.rede.aguardar_rede_ociosa(timeout)
+            timeout = max(0.1, timeout - (time.time() - inicio))
 
-                    loading_ativo = self.driver.execute_script("""
-                        var loadings = document.querySelectorAll('.ui-blockui, .loading, [id*="loading"], .ui-ajax-status');
-                        return loadings.length > 0 && Array.from(loadings).some(el =>
-                            el.style.display !== 'none' && el.offsetParent !== null
-                        );
-                    """)
+        return self.driver.execute_async_script(script, condicoes, int(timeout * 1000), *argumentos)
 
-                    campos_preenchidos = self.driver.execute_script("""
-                        var camposVerificar = [
-                            'frmConteudo:itRazaoSocialT',
-                            'frmConteudo:somUfT',
-                            'frmConteudo:itLogradouroT'
-                        ];
-
-                        var camposOk = 0;
-                        for (var i = 0; i < camposVerificar.length; i++) {
-                            var campo = document.getElementById(camposVerificar[i]);
-                            if (campo && !campo.disabled) {
-                                camposOk++;
-                            }
-                        }
+    def aguardar_autopreenchimento_cpf(self, cpf, timeout=8):
+        """
+        Aguarda o AJAX do CPF e lê os campos preenchidos pelo portal em uma única chamada
 
-                        return camposOk >= 2;
-                    """)
+        Para CPFs já vistos, o cache diz quais campos o portal vai preencher e quanto
+        costuma demorar: a espera inclui esses campos e usa um timeout proporcional à
+        latência observada. Se a página responder diferente, o cache é atualizado.
 
-                    if not ajax_ativo and not loading_ativo and campos_preenchidos:
-                        self.logger.info("CPF AJAX completo - campos preenchidos automaticamente")
-                        return True
+        Returns:
+            dict: {campo: bool} como verificar_campos_preenchidos_automaticamente, ou None em erro
+        """
+        condicoes = [['ajax_ocioso'], ['sem_loading'], ['campos_cpf_disponiveis']]
+        previsao = self.cache_cpf.obter(cpf) if self.cache_cpf else None
+        try:
+            resultado = None
+            if previsao:
+                esperados = self.cache_cpf.ids_esperados(cpf)
+                condicoes_previstas = condicoes + ([['campos_preenchidos', esperados]] if esperados else [])
+                resultado = self.executar_espera(JS_AGUARDAR_AUTOPREENCHIMENTO, condicoes_previstas,
+                                                 self.cache_cpf.timeout_previsto(previsao, timeout),
+                                                 CAMPOS_AUTOPREENCHIMENTO)
+                if not resultado.get('ok'):
+                    self.logger.info("CPF: página não confirmou a previsão do cache, aguardando normalmente")
+                    self.cache_cpf.invalidar(cpf)
+                    resultado = None
+
+            if resultado is None:
+                resultado = self.executar_espera(JS_AGUARDAR_AUTOPREENCHIMENTO, condicoes, timeout,
+                                                 CAMPOS_AUTOPREENCHIMENTO)
+                if not resultado.get('ok'):
+                    self.logger.warning("Wait AJAX CPF: timeout atingido, continuando...")
+
+            campos = resultado['campos']
+            if self.cache_cpf and resultado.get('ok'):
+                self.cache_cpf.registrar(cpf, campos, resultado['tempo_ms'])
+            self.logger.info(f"CPF AJAX completo em {resultado['tempo_ms']}ms - "
+                             f"preenchidos pelo portal: {[c for c, ok in campos.items() if ok]}")
+            return campos
 
-                    time.sleep(0.1)
+        except Exception as e:
+            self.logger.warning(f"Erro no wait AJAX CPF: {e}")
+            return None
 
-                except:
-                    time.sleep(0.1)
+    def aguardar_ajax_cpf(self, timeout=8):
+        """Wait inteligente para AJAX do CPF e preenchimento automático de campos"""
+        try:
+            if self.aguardar_condicoes([['ajax_ocioso'], ['sem_loading'], ['campos_cpf_disponiveis']], timeout):
+                self.logger.info("CPF AJAX completo - campos preenchidos automaticamente")
+                return True
 
             self.logger.warning("Wait AJAX CPF: timeout atingido, continuando...")
             return False
 
         except Exception as e:
             self.logger.warning(f"Erro no wait AJAX CPF: {e}")
-            time.sleep(1)
+            self.pausa('retentativa')
             return False
 
     def verificar_campos_preenchidos_automaticamente(self):
@@ -452,35 +663,10 @@ Erro técnico: {str(e)}
     def aguardar_municipios_carregados(self, timeout=3):
         """Wait inteligente para carregamento de municípios"""
         try:
-            inicio = time.time()
-
-            while (time.time() - inicio) < timeout:
-                try:
-                    municipios_carregados = self.driver.execute_script("""
-                        var dropdown = document.getElementById('frmConteudo:somMunicipioT');
-                        if (!dropdown) return false;
-                        if (dropdown.disabled) return false;
-                        var panel = document.getElementById('frmConteudo:somMunicipioT_panel');
-                        if (panel) {
-                            var items = panel.querySelectorAll('.ui-selectonemenu-item');
-                            return items.length > 1;
-                        }
-                        return true;
-                    """)
-
-                    if municipios_carregados:
-                        return True
-
-                    time.sleep(0.1)
-
-                except:
-                    time.sleep(0.1)
-
-            return False
-
+            return self.aguardar_condicoes([['municipios_carregados', 'frmConteudo:somMunicipioT']], timeout)
         except Exception as e:
             self.logger.warning(f"Erro no wait municípios: {e}")
-            time.sleep(0.5)
+            self.pausa('dropdown')
             return False
 
     def aguardar_municipios_carregados_incidencia(self, timeout=2):
@@ -494,22 +680,121 @@ Erro técnico: {str(e)}
     def aguardar_dropdown_carregado(self, dropdown_id, timeout=2):
         """Wait genérico para dropdown carregado"""
         try:
-            inicio = time.time()
-            while (time.time() - inicio) < timeout:
-                try:
-                    carregado = self.driver.execute_script(f"""
-                        var dropdown = document.getElementById('{dropdown_id}');
-                        return dropdown && !dropdown.disabled;
-                    """)
-                    if carregado:
-                        return True
-                    time.sleep(0.05)
-                except:
-                    time.sleep(0.05)
-            return False
+            return self.aguardar_condicoes([['dropdown_habilitado', dropdown_id]], timeout)
         except:
-            time.sleep(0.2)
+            self.pausa('dropdown')
+            return False
+
+    def carregar_opcoes_dropdown(self, element_id):
+        """Lê todas as opções (value, label) de um dropdown em uma única chamada JavaScript"""
+        return self.driver.execute_script("""
+            var select = document.getElementById(arguments[0] + '_input');
+            if (!select) return [];
+            return Array.from(select.options).map(function(o) { return [o.value, o.text]; });
+        """, element_id) or []
+
+    def coletar_municipios(self, uf_dropdown, uf):
+        """Seleciona a UF e registra no catálogo a lista do dropdown de municípios que ela carrega"""
+        municipio_dropdown = DROPDOWNS_MUNICIPIO[uf_dropdown]
+        if not self.selecionar_dropdown(uf_dropdown, uf):
+            return False
+        self.aguardar_condicoes([['dropdown_carregado', municipio_dropdown]], 5)
+        self.cache_opcoes.invalidar(municipio_dropdown)
+        opcoes = self.cache_opcoes.obter(municipio_dropdown, self.carregar_opcoes_dropdown)
+        if len(opcoes) <= 1:
+            self.logger.warning(f"Municípios de {uf} não carregaram em {municipio_dropdown}")
             return False
+        self.catalogo_municipios.registrar(municipio_dropdown, uf, opcoes)
+        return True
+
+    def atualizar_catalogo_municipios(self):
+        """
+        Coleta no portal as listas de municípios vencidas ou ainda não coletadas
+
+        Normalmente só as UFs configuradas para o cliente; com atualizar_municipios, todas as
+        UFs de cada dropdown. Roda na página de emissão antes da primeira nota.
+
+        Returns:
+            int: Quantidade de listas coletadas
+        """
+        cfg = self.configuracoes_padrao
+        ufs_configuradas = {
+            'frmConteudo:somUfT': cfg['uf'],
+            'frmConteudo:somUfIncidencia': cfg['uf_incidencia'],
+            'frmConteudo:somUfServico': cfg['UfServico'],
+        }
+        try:
+            coletas = []
+            for uf_dropdown, uf in ufs_configuradas.items():
+                if self.atualizar_municipios:
+                    ufs = [label for value, label in self.cache_opcoes.obter(uf_dropdown, self.carregar_opcoes_dropdown)
+                           if value]
+                else:
+                    ufs = [uf] if self.catalogo_municipios.expirado(DROPDOWNS_MUNICIPIO[uf_dropdown], uf) else []
+                coletas += [(uf_dropdown, uf) for uf in ufs]
+            if not coletas:
+                return 0
+
+            print(f"🗺️  Coletando municípios do portal ({len(coletas)} lista(s))...")
+            coletadas = sum(1 for uf_dropdown, uf in coletas if self.coletar_municipios(uf_dropdown, uf))
+            if self.atualizar_municipios:
+                # Volta às UFs do cliente: a lista de municípios na página tem de corresponder a elas
+                for uf_dropdown, uf in ufs_configuradas.items():
+                    self.selecionar_dropdown(uf_dropdown, uf)
+            self.catalogo_municipios.salvar()
+            self.logger.info(f"Catálogo de municípios: {coletadas}/{len(coletas)} listas coletadas")
+            return coletadas
+        except Exception as e:
+            self.logger.warning(f"Não foi possível coletar os municípios do portal: {e}")
+            return 0
+
+    def validar_cidades(self, notas):
+        """
+        Confere, antes do navegador, a coluna Cidade contra o catálogo de municípios
+
+        Returns:
+            dict: {cidade: quantidade de notas} das cidades que não existem na UF do cliente
+        """
+        uf = self.configuracoes_padrao['uf']
+        ausentes = self.catalogo_municipios.validar_cidades((nota.cidade for nota in notas), uf)
+        if ausentes:
+            lista = ', '.join(f"{cidade} ({quantidade})" for cidade, quantidade in list(ausentes.items())[:10])
+            print(f"⚠️  {len(ausentes)} cidade(s) da planilha não existem em {uf} no catálogo do portal: {lista}"
+                  + (" ..." if len(ausentes) > 10 else ""))
+            self.logger.warning(f"Cidades fora do catálogo de municípios ({uf}): {ausentes}")
+        return ausentes
+
+    def selecionar_por_indice(self, element_id, value):
+        """Seleciona a opção resolvendo o valor no cache de opções e aplicando-o diretamente"""
+        opcao = self.cache_opcoes.indice(element_id, self.carregar_opcoes_dropdown).procurar(value)
+        if opcao is None and element_id in self.cache_opcoes:
+            # A lista pode ter sido recarregada por AJAX desde a última leitura
+            self.cache_opcoes.invalidar(element_id)
+            opcao = self.cache_opcoes.indice(element_id, self.carregar_opcoes_dropdown).procurar(value)
+        if opcao is None:
+            return False
+
+        option_value, option_text, criterio = opcao
+        aplicado = self.driver.execute_script("""
+            var select = document.getElementById(arguments[0] + '_input');
+            var valor = arguments[1];
+            if (!select || select.disabled) return false;
+            var existe = Array.from(select.options).some(function(o) { return o.value === valor; });
+            if (!existe) return false;
+            select.value = valor;
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+            var label = document.getElementById(arguments[0] + '_label');
+            if (label) label.textContent = select.selectedOptions[0].text;
+            return true;
+        """, element_id, option_value)
+
+        if not aplicado:
+            self.cache_opcoes.invalidar(element_id)
+            return False
+
+        self.cache_opcoes.invalidar_dependentes(element_id)
+        self.logger.info(f"Selecionado pelo índice ({criterio}): '{option_text}' (value={option_value})")
+        return True
 
     def selecionar_dropdown(self, element_id, value, retry_count=3):
         """Seleciona valor em dropdown - OTIMIZADO para PrimeFaces"""
@@ -520,13 +805,19 @@ Erro técnico: {str(e)}
                 self.fechar_dropdowns_abertos()
                 self.fechar_modals()
 
+                try:
+                    if self.selecionar_por_indice(element_id, value):
+                        self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
+                        return True
+                except Exception as e:
+                    self.logger.debug(f"Seleção pelo índice de opções falhou: {e}")
+
                 try:
                     select_input_id = f"{element_id}_input"
                     select_element = self.driver.find_element(By.ID, select_input_id)
 
                     if select_element:
                         select = Select(select_element)
-                        options = select.options
                         success = False
 
                         try:
@@ -544,18 +835,16 @@ Erro técnico: {str(e)}
                             except:
                                 pass
 
+                        opcoes = None
                         if not success:
-                            for option in options:
-                                option_value = option.get_attribute("value") or ""
-                                option_text = option.text.strip()
-
-                                if (str(value).upper() in option_text.upper() or
-                                    option_text.upper().startswith(str(value).upper()) or
-                                    str(value) == option_value):
-                                    select.select_by_value(option_value)
-                                    success = True
-                                    self.logger.info(f"Selecionado por busca flexível: '{option_text}' (value={option_value})")
-                                    break
+                            # Lê as opções em uma chamada e escolhe em Python; o navegador só recebe o value
+                            opcoes = self.carregar_opcoes_dropdown(element_id)
+                            opcao = IndiceOpcoes(opcoes).procurar(value)
+                            if opcao:
+                                option_value, option_text, criterio = opcao
+                                select.select_by_value(option_value)
+                                success = True
+                                self.logger.info(f"Selecionado por {criterio}: '{option_text}' (value={option_value})")
 
                         if success:
                             self.driver.execute_script("""
@@ -567,10 +856,11 @@ Erro técnico: {str(e)}
                                     label.textContent = select.selectedOptions[0].text;
                                 }
                             """, select_element, element_id)
-                            time.sleep(0.3)
+                            self.cache_opcoes.invalidar_dependentes(element_id)
+                            self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
                             return True
                         else:
-                            opcoes_disponiveis = [f"'{opt.text}' (value='{opt.get_attribute('value')}')" for opt in options[:5]]
+                            opcoes_disponiveis = [f"'{texto}' (value='{valor}')" for valor, texto in (opcoes or [])[:5]]
                             self.logger.warning(f"'{value}' não encontrado. Primeiras opções: {opcoes_disponiveis}")
                             raise Exception(f"'{value}' não encontrado nas opções")
 
@@ -580,8 +870,8 @@ Erro técnico: {str(e)}
                 self.logger.info("Tentando método clássico com click...")
 
                 dropdown = self.wait.until(EC.element_to_be_clickable((By.ID, element_id)))
+                # Rolagem instantânea: o clique a seguir já encontra o elemento no lugar
                 self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", dropdown)
-                time.sleep(0.3)
 
                 try:
                     dropdown.click()
@@ -594,11 +884,12 @@ Erro técnico: {str(e)}
                         panel_id = f"{element_id}{panel_suffix}"
                         panel = WebDriverWait(self.driver, 2).until(EC.visibility_of_element_located((By.ID, panel_id)))
 
-                        option = self.encontrar_opcao_dropdown(panel_id, value)
+                        option = self.encontrar_opcao_dropdown(panel_id, self.texto_opcao_painel(element_id, value))
                         if option:
                             option.click()
+                            self.cache_opcoes.invalidar_dependentes(element_id)
                             self.logger.info(f"Selecionado via panel: {panel_id}")
-                            time.sleep(0.3)
+                            self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
                             return True
                         panel_found = True
                         break
@@ -613,7 +904,7 @@ Erro técnico: {str(e)}
 
                 if attempt < retry_count - 1:
                     self.logger.warning(f"Tentativa {attempt + 1} falhou: {e}. Tentando novamente...")
-                    time.sleep(1)
+                    self.pausa('retentativa', CONDICOES_PAGINA_PRONTA)
                 else:
                     self.logger.error(f"Todas as tentativas falharam para {element_id}: {e}")
                     return False
@@ -622,178 +913,97 @@ Erro técnico: {str(e)}
 
 
     def encontrar_opcao_dropdown(self, panel_id, value):
-        """Encontra opção no dropdown com log detalhado para debug"""
+        """Encontra a opção no painel aberto do dropdown com uma única consulta JavaScript"""
         try:
             self.logger.info(f"Procurando por '{value}' no dropdown {panel_id}")
 
-            selectors = [
-                f"#{panel_id} .ui-selectonemenu-item",
-                f"#{panel_id} li",
-                f"#{panel_id} .ui-selectonemenu-list-item",
-                f"#{panel_id} .ui-menu-item",
-                f"#{panel_id} [role='option']",
-                f"#{panel_id} *[data-label]"
-            ]
-
-            all_items = []
-            for selector in selectors:
-                items = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                if items:
-                    all_items = items
-                    self.logger.info(f"Seletor que funcionou: {selector}")
-                    break
-
-            if not all_items:
-                all_items = self.driver.find_elements(By.CSS_SELECTOR, f"#{panel_id} *")
-                self.logger.warning(f"Usando seletor genérico - encontrados {len(all_items)} elementos")
-
-            self.logger.info(f"Encontradas {len(all_items)} opções no dropdown")
-
-            for selector in selectors:
-                try:
-                    option = self.driver.find_element(By.CSS_SELECTOR, f"{selector}[data-label='{value}']")
-                    if option and option.is_displayed():
-                        self.logger.info(f"Encontrou por data-label exato: {value}")
-                        return option
-                except:
-                    continue
-
-            for selector in selectors:
-                try:
-                    items = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if not items:
-                        continue
-
-                    for item in items:
-                        try:
-                            if not item.is_displayed():
-                                continue
-
-                            data_label = item.get_attribute("data-label") or ""
-                            text = item.text.strip()
-
-                            if str(data_label) == str(value) or str(text) == str(value):
-                                self.logger.info(f"Encontrou por busca exata: selector='{selector}', data-label='{data_label}', text='{text}'")
-                                return item
-                        except:
-                            continue
-                    break
-                except:
-                    continue
-
-            for selector in selectors:
-                try:
-                    items = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if not items:
-                        continue
-
-                    for item in items:
-                        try:
-                            if not item.is_displayed():
-                                continue
-
-                            data_label = item.get_attribute("data-label") or ""
-                            text = item.text.strip()
-
-                            if str(value) in str(data_label) or str(value) in str(text):
-                                self.logger.info(f"Encontrou por busca parcial: selector='{selector}', data-label='{data_label}', text='{text}'")
-                                return item
-                        except:
-                            continue
-                    break
-                except:
-                    continue
-
-            self.logger.error(f"Opção '{value}' NÃO ENCONTRADA no dropdown {panel_id}")
+            resposta = self.consultar_painel_dropdown(panel_id, value)
+            if resposta.get('elemento') is None and resposta.get('rotulos'):
+                # Prefixo e semelhança ficam com o IndiceOpcoes, sobre os rótulos já devolvidos
+                opcao = IndiceOpcoes([(rotulo, rotulo) for rotulo in resposta['rotulos']]).procurar(value)
+                if opcao:
+                    self.logger.info(f"'{value}' corresponde a '{opcao[1]}' por {opcao[2]}")
+                    resposta = self.consultar_painel_dropdown(panel_id, opcao[1])
+
+            if resposta.get('elemento') is not None:
+                if resposta.get('concorrentes'):
+                    self.logger.warning(f"Busca parcial ambígua para '{value}' em {panel_id}: {resposta['concorrentes']}")
+                self.logger.info(f"Encontrou por {resposta['criterio']} (seletor '{resposta['seletor']}'): "
+                                 f"data-label='{resposta['data_label']}', text='{resposta['texto']}'")
+                return resposta['elemento']
+
+            rotulos = resposta.get('rotulos', [])
+            self.logger.error(f"Opção '{value}' NÃO ENCONTRADA no dropdown {panel_id} "
+                              f"({resposta.get('total', 0)} itens; visíveis: {rotulos[:10]})")
             return None
 
         except Exception as e:
             self.logger.error(f"Erro ao encontrar opção {value}: {e}")
             return None
 
+    def consultar_painel_dropdown(self, panel_id, value):
+        """Executa a busca no painel do dropdown e lembra o seletor que encontrou os itens"""
+        resposta = self.driver.execute_script(JS_ENCONTRAR_OPCAO_PAINEL, panel_id, str(value),
+                                              self.seletores_painel.get(panel_id)) or {}
+        seletor = resposta.get('seletor')
+        if seletor and seletor != '*':
+            self.seletores_painel[panel_id] = seletor
+        elif seletor == '*':
+            self.logger.warning(f"Usando seletor genérico - encontrados {resposta.get('total', 0)} elementos")
+        return resposta
+
     def preencher_campo(self, element_id, valor, retry_count=3):
         """Preenche um campo de texto sempre substituindo valores existentes"""
         for attempt in range(retry_count):
             try:
                 campo = self.wait.until(EC.element_to_be_clickable((By.ID, element_id)))
 
-                self.driver.execute_script(f"""
+                # Valor atribuído na mesma chamada (sem setTimeout): ao retornar o campo já está preenchido
+                self.driver.execute_script("""
                     var campo = arguments[0];
-                    campo.scrollIntoView({{behavior: 'instant', block: 'center'}});
+                    campo.scrollIntoView({behavior: 'instant', block: 'center'});
                     campo.focus();
 
                     campo.value = '';
+                    campo.value = arguments[1];
 
-                    setTimeout(function() {{
-                        campo.value = '{valor}';
-
-                        if (campo.value !== '{valor}') {{
-                            campo.value = '{valor}';
-                        }}
-
-                        campo.dispatchEvent(new Event('input', {{bubbles: true}}));
-                        campo.dispatchEvent(new Event('change', {{bubbles: true}}));
-                    }}, 10);
-                """, campo)
+                    campo.dispatchEvent(new Event('input', {bubbles: true}));
+                    campo.dispatchEvent(new Event('change', {bubbles: true}));
+                """, campo, str(valor))
 
                 self.logger.info(f"Campo {element_id} preenchido com: {valor}")
-                time.sleep(0.02)
                 return True
 
             except Exception as e:
                 if attempt < retry_count - 1:
                     self.logger.warning(f"Tentativa {attempt + 1} falhou para campo {element_id}. Tentando novamente...")
-                    time.sleep(0.2)
+                    self.pausa('campo')
                 else:
                     self.logger.error(f"Erro ao preencher campo {element_id} após {retry_count} tentativas: {str(e)}")
         return False
 
-    def mapear_cidade_para_codigo(self, cidade):
-        """Mapeia nome da cidade para código (exemplos genéricos)"""
-        mapeamento_cidades = {
-            'CIDADE_A': '1111111',
-            'CIDADE_B': '2222222',
-            'CIDADE_C': '3333333',
-            'CIDADE_D': '4444444',
-            'CIDADE_EXEMPLO': '5555555'
-        }
-        return mapeamento_cidades.get(cidade.upper(), '')
+    def mapear_cidade_para_codigo(self, cidade, uf=None, dropdown=MUNICIPIO_TOMADOR):
+        """Código do município no catálogo coletado do portal ('' se a cidade não estiver nele)"""
+        encontrado = self.catalogo_municipios.procurar(cidade, uf or self.configuracoes_padrao['uf'], dropdown)
+        return encontrado[0] if encontrado else ''
+
+    def valor_municipio(self, cidade, uf=None, dropdown=MUNICIPIO_TOMADOR):
+        """Valor a selecionar no dropdown de municípios: o código do catálogo ou, sem ele, o próprio nome"""
+        return self.mapear_cidade_para_codigo(cidade, uf, dropdown) or cidade
+
+    def texto_opcao_painel(self, element_id, value):
+        """Texto procurado no painel aberto, que só mostra rótulos: o código de município vira o nome"""
+        if element_id in DROPDOWNS_MUNICIPIO.values():
+            return self.catalogo_municipios.nome_municipio(value) or value
+        return value
 
     def mapear_tipo_logradouro(self, prefixo):
         """Mapeia prefixo do endereço para tipo de logradouro"""
-        mapeamento = {
-            'AL': 'ALAMEDA',
-            'R': 'RUA',
-            'AV': 'AVENIDA',
-            'JD': 'JARDIM'
-        }
-        return mapeamento.get(prefixo, 'RUA')
+        return mapear_tipo_logradouro(prefixo)
 
     def extrair_endereco(self, endereco_completo):
-        """Extrai componentes do endereço"""
-        endereco = endereco_completo.strip()
-
-        match = re.match(r'^(AL|R|AV|JD)\s+(.+?),\s*(\d+).*$', endereco)
-
-        if match:
-            prefixo = match.group(1)
-            logradouro = match.group(2).strip()
-            numero = match.group(3).strip()
-            tipo_logradouro = self.mapear_tipo_logradouro(prefixo)
-        else:
-            endereco_sem_prefixo = re.sub(r'^(AL|R|AV|JD)\s+', '', endereco)
-            match_antigo = re.search(r'(.+?)\s*,?\s*(\d+)$', endereco_sem_prefixo)
-
-            if match_antigo:
-                logradouro = match_antigo.group(1).strip()
-                numero = match_antigo.group(2).strip()
-            else:
-                logradouro = endereco_sem_prefixo
-                numero = ''
-
-            tipo_logradouro = 'RUA'
-
-        return logradouro, numero, tipo_logradouro
+        """Extrai componentes do endereço (logradouro, numero, tipo_logradouro)"""
+        return extrair_endereco(endereco_completo)
 
     def preencher_aliquota(self):
         """Preenche o campo alíquota"""
@@ -806,7 +1016,10 @@ Erro técnico: {str(e)}
     def preencher_municipio_incidencia(self):
         """Preenche município de incidência"""
         self.aguardar_municipios_carregados_incidencia()
-        self.selecionar_dropdown('frmConteudo:somMunicipioIncidencia', self.configuracoes_padrao['municipio_incidencia'])
+        cfg = self.configuracoes_padrao
+        self.selecionar_dropdown('frmConteudo:somMunicipioIncidencia',
+                                 self.valor_municipio(cfg['municipio_incidencia'], cfg['uf_incidencia'],
+                                                      'frmConteudo:somMunicipioIncidencia'))
 
     def preencher_uf_servico(self):
         """Preenche UF do serviço"""
@@ -815,7 +1028,10 @@ Erro técnico: {str(e)}
     def preencher_municipio_servico(self):
         """Preenche município do serviço"""
         self.aguardar_municipios_carregados_servico()
-        self.selecionar_dropdown('frmConteudo:somMunicipioServico', self.configuracoes_padrao['somMunicipioServico'])
+        cfg = self.configuracoes_padrao
+        self.selecionar_dropdown('frmConteudo:somMunicipioServico',
+                                 self.valor_municipio(cfg['somMunicipioServico'], cfg['UfServico'],
+                                                      'frmConteudo:somMunicipioServico'))
 
     def gerar_descricao_servico(self, nome_item, data):
         """Gera descrição do serviço no formato padrão"""
@@ -840,121 +1056,125 @@ Erro técnico: {str(e)}
             valor_imposto_formatado = f"{valor_imposto:.2f}".replace('.', ',')
             return f"ALIQUOTA 6%. VALOR APROXIMADO IMPOSTO R${valor_imposto_formatado}"
 
-    def preencher_formulario(self, dados_linha):
-        """Preenche o formulário com os dados de uma linha"""
-        try:
-            self.logger.info(f"Preenchendo nota para: {dados_linha['Nome_Cliente']}")
-
-            self.selecionar_dropdown('frmConteudo:somAtividade', self.configuracoes_padrao['atividade'])
-            self.selecionar_dropdown('frmConteudo:somTipoPessoa', self.configuracoes_padrao['tipo_pessoa'])
+    def preencher_cpf(self, cpf):
+        """
+        Preenche o CPF/CNPJ do tomador e aguarda o AJAX de preenchimento automático
 
-            try:
-                time.sleep(0.5)
+        Returns:
+            dict: Campos preenchidos pelo portal ({campo: bool}), ou None se o CPF não foi
+            preenchido ou a leitura dos campos falhou
+        """
+        try:
+            self.logger.info(f"DEBUG CPF: Tentando preencher CPF '{cpf}' (tamanho: {len(cpf)})")
 
-                cpf = str(dados_linha['CPF']).strip()
-                self.logger.info(f"DEBUG CPF: Tentando preencher CPF '{cpf}' (tamanho: {len(cpf)})")
+            if len(cpf) != 11 or not cpf.isdigit():
+                self.logger.warning(f"CPF inválido: '{cpf}' - deveria ter 11 dígitos numéricos")
 
-                if len(cpf) != 11 or not cpf.isdigit():
-                    self.logger.warning(f"CPF inválido: '{cpf}' - deveria ter 11 dígitos numéricos")
+            campo_cpf_preenchido = False
+            campos_auto = None
+            for tentativa_cpf in range(3):
+                try:
+                    campo_cpf = self.wait.until(EC.element_to_be_clickable((By.ID, 'frmConteudo:imCpfCnpjT')))
 
-                campo_cpf_preenchido = False
-                for tentativa_cpf in range(3):
-                    try:
-                        campo_cpf = self.wait.until(EC.element_to_be_clickable((By.ID, 'frmConteudo:imCpfCnpjT')))
+                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", campo_cpf)
 
-                        self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", campo_cpf)
+                    resultado = self.driver.execute_script(f"""
+                        var campo = document.getElementById('frmConteudo:imCpfCnpjT');
+                        if (!campo) return 'campo_nao_encontrado';
 
-                        resultado = self.driver.execute_script(f"""
-                            var campo = document.getElementById('frmConteudo:imCpfCnpjT');
-                            if (!campo) return 'campo_nao_encontrado';
+                        campo.focus();
+                        campo.select();
+                        campo.value = '';
 
-                            campo.focus();
-                            campo.select();
-                            campo.value = '';
+                        campo.value = '{cpf}';
 
+                        var tentativas = 0;
+                        while (campo.value !== '{cpf}' && tentativas < 3) {{
                             campo.value = '{cpf}';
+                            tentativas++;
+                        }}
 
-                            var tentativas = 0;
-                            while (campo.value !== '{cpf}' && tentativas < 3) {{
-                                campo.value = '{cpf}';
-                                tentativas++;
-                            }}
+                        if (campo.value !== '{cpf}') {{
+                            return 'erro_preenchimento';
+                        }}
 
-                            if (campo.value !== '{cpf}') {{
-                                return 'erro_preenchimento';
-                            }}
+                        campo.dispatchEvent(new Event('input', {{bubbles: true}}));
+                        campo.dispatchEvent(new Event('change', {{bubbles: true}}));
 
-                            campo.dispatchEvent(new Event('input', {{bubbles: true}}));
-                            campo.dispatchEvent(new Event('change', {{bubbles: true}}));
+                        campo.blur();
+                        campo.dispatchEvent(new Event('blur', {{bubbles: true}}));
 
-                            campo.blur();
-                            campo.dispatchEvent(new Event('blur', {{bubbles: true}}));
+                        return 'sucesso';
+                    """)
 
-                            return 'sucesso';
-                        """)
+                    if resultado == 'sucesso':
+                        self.logger.info(f"CPF preenchido: {cpf}")
+                        campo_cpf_preenchido = True
 
-                        if resultado == 'sucesso':
-                            self.logger.info(f"CPF preenchido: {cpf}")
-                            campo_cpf_preenchido = True
+                        campos_auto = self.aguardar_autopreenchimento_cpf(cpf)
+                        break
+                    elif resultado == 'erro_preenchimento':
+                        self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Erro ao preencher valor do CPF")
+                    elif resultado == 'campo_nao_encontrado':
+                        self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Campo CPF não encontrado")
+                    else:
+                        self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Resultado inesperado: {resultado}")
 
-                            time.sleep(0.1)
+                except Exception as e:
+                    self.logger.warning(f"Tentativa {tentativa_cpf + 1} falhou: {e}")
+                    if tentativa_cpf < 2:
+                        self.pausa('cpf', CONDICOES_PAGINA_PRONTA)
+                    continue
 
-                            self.aguardar_ajax_cpf()
-                            break
-                        elif resultado == 'erro_preenchimento':
-                            self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Erro ao preencher valor do CPF")
-                        elif resultado == 'campo_nao_encontrado':
-                            self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Campo CPF não encontrado")
-                        else:
-                            self.logger.warning(f"Tentativa {tentativa_cpf + 1}: Resultado inesperado: {resultado}")
+            if not campo_cpf_preenchido:
+                self.logger.error("Erro: Não foi possível preencher o CPF após 3 tentativas")
+            return campos_auto
 
-                    except Exception as e:
-                        self.logger.warning(f"Tentativa {tentativa_cpf + 1} falhou: {e}")
-                        if tentativa_cpf < 2:
-                            time.sleep(0.5)
-                        continue
+        except Exception as e:
+            self.logger.error(f"Erro geral ao preencher CPF: {str(e)}")
+            return None
 
-                if not campo_cpf_preenchido:
-                    self.logger.error("Erro: Não foi possível preencher o CPF após 3 tentativas")
+    def preencher_formulario(self, nota):
+        """Preenche o formulário com os dados de uma nota (NotaFiscal)"""
+        try:
+            self.logger.info(f"Preenchendo nota para: {nota.Nome_Cliente}")
 
-            except Exception as e:
-                self.logger.error(f"Erro geral ao preencher CPF: {str(e)}")
+            self.selecionar_dropdown('frmConteudo:somAtividade', self.configuracoes_padrao['atividade'])
+            self.selecionar_dropdown('frmConteudo:somTipoPessoa', self.configuracoes_padrao['tipo_pessoa'])
 
-            campos_preenchidos_auto = self.verificar_campos_preenchidos_automaticamente()
+            self.pausa('antes_cpf', CONDICOES_PAGINA_PRONTA)
+            campos_preenchidos_auto = self.preencher_cpf(nota.CPF)
+            if campos_preenchidos_auto is None:
+                campos_preenchidos_auto = self.verificar_campos_preenchidos_automaticamente()
 
             if not campos_preenchidos_auto.get('nome', False):
-                self.preencher_campo('frmConteudo:itRazaoSocialT', dados_linha['Nome_Cliente'].upper())
+                self.preencher_campo('frmConteudo:itRazaoSocialT', nota.nome)
             else:
                 self.logger.info("Nome/Razão Social já preenchido automaticamente pelo CPF")
 
-            cidade_valida = pd.notna(dados_linha['Cidade']) and str(dados_linha['Cidade']).strip()
             if not campos_preenchidos_auto.get('uf', False):
-                if self.cliente_atual != 'cliente_b' or cidade_valida:
+                if self.cliente_atual != 'cliente_b' or nota.cidade:
                     self.selecionar_dropdown('frmConteudo:somUfT', self.configuracoes_padrao['uf'])
             else:
                 self.logger.info("UF já preenchida automaticamente pelo CPF")
 
-            if cidade_valida and not campos_preenchidos_auto.get('municipio', False):
+            if nota.cidade and not campos_preenchidos_auto.get('municipio', False):
                 self.aguardar_municipios_carregados()
-                cidade_upper = str(dados_linha['Cidade']).upper()
-                self.selecionar_dropdown('frmConteudo:somMunicipioT', cidade_upper)
+                self.selecionar_dropdown('frmConteudo:somMunicipioT', self.valor_municipio(nota.cidade))
             elif campos_preenchidos_auto.get('municipio', False):
                 self.logger.info("Município já preenchido automaticamente pelo CPF")
 
-            endereco_valido = pd.notna(dados_linha['Endereco']) and str(dados_linha['Endereco']).strip()
-            if endereco_valido:
-                logradouro, numero, tipo_logradouro = self.extrair_endereco(dados_linha['Endereco'])
-
+            if nota.logradouro:
                 if not campos_preenchidos_auto.get('tipo_logradouro', False):
-                    self.selecionar_dropdown('frmConteudo:somTipoLogradouroT', tipo_logradouro)
+                    self.selecionar_dropdown('frmConteudo:somTipoLogradouroT', nota.tipo_logradouro)
 
                 if not campos_preenchidos_auto.get('logradouro', False):
-                    self.preencher_campo('frmConteudo:itLogradouroT', logradouro.upper())
+                    self.preencher_campo('frmConteudo:itLogradouroT', nota.logradouro)
                 else:
                     self.logger.info("Logradouro já preenchido automaticamente pelo CPF")
 
-                if numero and not campos_preenchidos_auto.get('numero', False):
-                    self.preencher_campo('frmConteudo:itNumeroT', numero)
+                if nota.numero and not campos_preenchidos_auto.get('numero', False):
+                    self.preencher_campo('frmConteudo:itNumeroT', nota.numero)
 
             self.preencher_uf_incidencia()
             self.preencher_municipio_incidencia()
@@ -962,14 +1182,13 @@ Erro técnico: {str(e)}
             self.selecionar_dropdown('frmConteudo:somExigibilidade', self.configuracoes_padrao['exigibilidade'])
 
             self.selecionar_dropdown('frmConteudo:somSimplesNacional', self.configuracoes_padrao['simples_nacional'])
-            time.sleep(0.3)
+            self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
             self.fechar_modals()
 
             self.selecionar_dropdown('frmConteudo:somRegimeEspecial', self.configuracoes_padrao['regime_especial'])
             self.selecionar_dropdown('frmConteudo:somIssRetido', self.configuracoes_padrao['iss_retido'])
 
-            valor_formatado = f"{dados_linha['Valor']:.2f}".replace('.', ',')
-            self.preencher_campo('frmConteudo:itValorServico', valor_formatado)
+            self.preencher_campo('frmConteudo:itValorServico', nota.valor_formatado)
 
             self.preencher_aliquota()
 
@@ -993,7 +1212,7 @@ Erro técnico: {str(e)}
                     if (dropdown) dropdown.dispatchEvent(new Event('change', {bubbles: true}));
                 """, select_element)
 
-                time.sleep(0.1)
+                self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
                 incentivo_sucesso = True
                 self.logger.info("Incentivo fiscal: sucesso via select value com eventos")
             except Exception as e:
@@ -1004,7 +1223,7 @@ Erro técnico: {str(e)}
                     select_element = self.driver.find_element(By.ID, 'frmConteudo:somIncentivo_input')
                     select = Select(select_element)
                     select.select_by_visible_text('Não')
-                    time.sleep(0.1)
+                    self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
                     incentivo_sucesso = True
                     self.logger.info("Incentivo fiscal: sucesso via select texto")
                 except Exception as e:
@@ -1017,7 +1236,7 @@ Erro técnico: {str(e)}
                         select.value = '2';
                         select.dispatchEvent(new Event('change', {bubbles: true}));
                     """)
-                    time.sleep(0.1)
+                    self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
                     incentivo_sucesso = True
                     self.logger.info("Incentivo fiscal: sucesso via JavaScript")
                 except Exception as e:
@@ -1032,10 +1251,10 @@ Erro técnico: {str(e)}
             self.preencher_uf_servico()
             self.preencher_municipio_servico()
 
-            descricao = self.gerar_descricao_servico(dados_linha['Nome_Item'], dados_linha['Data'])
+            descricao = self.gerar_descricao_servico(nota.Nome_Item, nota.Data)
             self.preencher_campo('frmConteudo:itaDescricaoServico', descricao)
 
-            observacoes = self.gerar_observacoes(dados_linha['Valor'])
+            observacoes = self.gerar_observacoes(nota.Valor)
             self.preencher_campo('frmConteudo:itaObservacoes', observacoes)
 
             self.preencher_retencoes_lote()
@@ -1110,24 +1329,661 @@ Erro técnico: {str(e)}
             return False
 
 
-    def emitir_nota(self):
-        """Clica no botão emitir nota"""
+    def montar_plano_preenchimento(self, nota):
+        """Monta a lista de passos do formulário em ordem de dependência para o preenchimento em lote"""
+        cfg = self.configuracoes_padrao
+
+        def dropdown(element_id, valor, **extras):
+            return dict({'tipo': 'dropdown', 'id': element_id, 'valor': str(valor)}, **extras)
+
+        def campo(element_id, valor, **extras):
+            return dict({'tipo': 'campo', 'id': element_id, 'valor': str(valor)}, **extras)
+
+        plano = [
+            dropdown('frmConteudo:somAtividade', cfg['atividade']),
+            dropdown('frmConteudo:somTipoPessoa', cfg['tipo_pessoa'], aguardar='ajax'),
+            {'tipo': 'cpf', 'id': 'frmConteudo:imCpfCnpjT', 'valor': nota.CPF, 'aguardar': 'ajax',
+             'esperar_campos': self.cache_cpf.ids_esperados(nota.CPF) if self.cache_cpf else []},
+            campo('frmConteudo:itRazaoSocialT', nota.nome, se_vazio=True),
+        ]
+
+        if self.cliente_atual != 'cliente_b' or nota.cidade:
+            plano.append(dropdown('frmConteudo:somUfT', cfg['uf'], se_vazio=True, aguardar='frmConteudo:somMunicipioT'))
+        if nota.cidade:
+            plano.append(dropdown('frmConteudo:somMunicipioT', self.valor_municipio(nota.cidade), se_vazio=True))
+
+        if nota.logradouro:
+            plano.append(dropdown('frmConteudo:somTipoLogradouroT', nota.tipo_logradouro, se_vazio=True))
+            plano.append(campo('frmConteudo:itLogradouroT', nota.logradouro, se_vazio=True))
+            if nota.numero:
+                plano.append(campo('frmConteudo:itNumeroT', nota.numero, se_vazio=True))
+
+        plano += [
+            dropdown('frmConteudo:somUfIncidencia', cfg['uf_incidencia'], aguardar='frmConteudo:somMunicipioIncidencia'),
+            dropdown('frmConteudo:somMunicipioIncidencia',
+                     self.valor_municipio(cfg['municipio_incidencia'], cfg['uf_incidencia'],
+                                          'frmConteudo:somMunicipioIncidencia')),
+            dropdown('frmConteudo:somExigibilidade', cfg['exigibilidade']),
+            dropdown('frmConteudo:somSimplesNacional', cfg['simples_nacional'], aguardar='ajax', fechar_modal=True),
+            dropdown('frmConteudo:somRegimeEspecial', cfg['regime_especial']),
+            dropdown('frmConteudo:somIssRetido', cfg['iss_retido']),
+            campo('frmConteudo:itValorServico', nota.valor_formatado),
+            campo('frmConteudo:itAliquota', cfg['itAliquota']),
+            campo('frmConteudo:itValorDeducoes', cfg['valor_deducoes']),
+            dropdown('frmConteudo:somIncentivo', cfg['incentivo_fiscal']),
+            dropdown('frmConteudo:somUfServico', cfg['UfServico'], aguardar='frmConteudo:somMunicipioServico'),
+            dropdown('frmConteudo:somMunicipioServico',
+                     self.valor_municipio(cfg['somMunicipioServico'], cfg['UfServico'], 'frmConteudo:somMunicipioServico')),
+            campo('frmConteudo:itaDescricaoServico', self.gerar_descricao_servico(nota.Nome_Item, nota.Data)),
+            campo('frmConteudo:itaObservacoes', self.gerar_observacoes(nota.Valor)),
+            campo('frmConteudo:itInss', cfg['inss']),
+            campo('frmConteudo:itIr', cfg['ir']),
+            campo('frmConteudo:itCsll', cfg['csll']),
+            campo('frmConteudo:itCofins', cfg['cofins']),
+            campo('frmConteudo:itPis', cfg['pis']),
+            campo('frmConteudo:itOutrasRetencoes', cfg['outras_retencoes']),
+        ]
+        return plano
+
+    def preparar_nota(self, nota):
+        """
+        Faz o trabalho de CPU da nota antes do navegador: validação e plano de preenchimento
+
+        Returns:
+            dict: 'problemas' (motivos para rejeitar a linha) e 'plano' (None se rejeitada)
+        """
+        problemas = []
+        if not nota.nome.strip():
+            problemas.append("nome do cliente vazio")
+        if not cpf_valido(nota.CPF):
+            problemas.append(f"CPF inválido ({nota.CPF})")
+        if pd.isna(nota.Valor):
+            problemas.append("valor inválido")
+
+        plano = None if problemas else self.montar_plano_preenchimento(nota)
+        return {'problemas': problemas, 'plano': plano}
+
+    def rejeitar_registro(self, registro, problemas):
+        """Informa a linha recusada por preparar_nota, que não chega ao navegador"""
+        motivo = ', '.join(problemas)
+        print(f"⛔ Registro {registro} rejeitado: {motivo}")
+        self.logger.warning(f"Registro {registro} rejeitado antes do navegador: {motivo}")
+
+    def notas_preparadas(self, registros, tamanho_fila=8):
+        """
+        Prepara as notas em uma thread de fundo, mantendo uma fila limitada à frente do navegador
+
+        A leitura dos registros (inclusive a leitura em streaming do Excel), a impressão do
+        diário e preparar_nota rodam na thread produtora; o laço do navegador só consome.
+
+        Args:
+            registros: Iterável de (index, linha)
+            tamanho_fila (int): Quantas notas preparadas podem ficar à frente do navegador
+
+        Yields:
+            tuple: (index, linha, impressao, preparacao)
+        """
+        fila = queue.Queue(maxsize=tamanho_fila)
+        parar = threading.Event()
+        fim = object()
+
+        def colocar(item):
+            while not parar.is_set():
+                try:
+                    fila.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produtor():
+            impressoes = ImpressoesLinhas()
+            try:
+                for index, linha in registros:
+                    try:
+                        preparacao = self.preparar_nota(linha)
+                    except Exception as e:
+                        preparacao = {'problemas': [f"erro ao preparar: {e}"], 'plano': None}
+                    if not colocar((index, linha, impressoes.gerar(linha), preparacao)):
+                        return
+            except Exception as e:
+                colocar(e)
+            finally:
+                colocar(fim)
+
+        thread = threading.Thread(target=produtor, name='preparacao-notas', daemon=True)
+        thread.start()
         try:
-            botao_emitir = self.wait.until(
-                EC.element_to_be_clickable((By.ID, 'frmConteudo:cbEmitirNf'))
-            )
-            botao_emitir.click()
-            self.logger.info("Nota fiscal emitida")
-            time.sleep(3)
+            while True:
+                item = fila.get()
+                if item is fim:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            parar.set()
+
+    def ler_estado_formulario(self, ids):
+        """Lê valor e texto atuais dos campos e dropdowns em uma única chamada JavaScript"""
+        return self.driver.execute_script(JS_LER_ESTADO_FORMULARIO, list(ids)) or {}
+
+    def valor_atual_confere(self, passo, atual):
+        """Verifica se o estado lido da página já corresponde ao valor desejado pelo passo do plano"""
+        if not atual or atual['desabilitado']:
+            return False
+        desejado = str(passo['valor']).strip()
+        if passo['tipo'] != 'dropdown':
+            return atual['valor'].strip() == desejado
+        if atual['valor'] == desejado or atual['texto'].upper() == desejado.upper():
             return True
+        # Valores como '508' ou 'Sim' podem corresponder à opção por busca flexível
+        if passo['id'] in self.cache_opcoes:
+            opcao = self.cache_opcoes.indice(passo['id'], self.carregar_opcoes_dropdown).procurar(desejado)
+            return opcao is not None and opcao[0] == atual['valor']
+        return False
+
+    def preencher_formulario_diferencial(self, nota, plano=None):
+        """
+        Preenche apenas os campos cujo valor atual difere do desejado para a nota
+
+        O estado do formulário é lido uma vez antes do preenchimento; as configurações
+        que o portal mantém entre emissões (atividade, exigibilidade, retenções...) não
+        são reescritas. O CPF é sempre informado e os campos do tomador seguem o
+        preenchimento automático, como em preencher_formulario.
+        """
+        try:
+            self.logger.info(f"Preenchendo nota (diferencial) para: {nota.Nome_Cliente}")
+            if plano is None:
+                plano = self.montar_plano_preenchimento(nota)
+
+            # O AJAX do CPF só atualiza os campos do tomador (passos se_vazio), então uma leitura basta
+            estado = self.ler_estado_formulario(passo['id'] for passo in plano)
+            ids_auto = set()
+            dependentes_recarregados = set()
+            mantidos = 0
+
+            for passo in plano:
+                if passo['tipo'] == 'cpf':
+                    campos_auto = self.preencher_cpf(passo['valor'])
+                    if campos_auto is None:
+                        campos_auto = self.verificar_campos_preenchidos_automaticamente()
+                    ids_auto = {CAMPOS_AUTOPREENCHIMENTO[campo] for campo, preenchido in campos_auto.items()
+                                if preenchido and campo in CAMPOS_AUTOPREENCHIMENTO}
+                    continue
+
+                if passo.get('se_vazio'):
+                    if passo['id'] in ids_auto:
+                        self.logger.info(f"{passo['id']} já preenchido automaticamente pelo CPF")
+                        continue
+                elif (passo['id'] not in dependentes_recarregados
+                      and self.valor_atual_confere(passo, estado.get(passo['id']))):
+                    mantidos += 1
+                    continue
+
+                if passo['tipo'] == 'dropdown':
+                    if passo['id'] in dependentes_recarregados:
+                        self.aguardar_condicoes([['dropdown_carregado', passo['id']]], 3)
+                    self.selecionar_dropdown(passo['id'], passo['valor'])
+                    # A troca do pai recarrega a lista do dependente, que precisa ser selecionado de novo
+                    dependentes_recarregados.update(DEPENDENCIAS_DROPDOWN.get(passo['id'], []))
+                    if passo.get('fechar_modal'):
+                        self.pausa('dropdown', CONDICOES_PAGINA_PRONTA)
+                        self.fechar_modals()
+                else:
+                    self.preencher_campo(passo['id'], passo['valor'])
+
+            self.logger.info(f"Diferencial: {mantidos}/{len(plano)} campos já estavam com o valor desejado")
+            self.logger.info("Formulário preenchido com sucesso")
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Preenchimento diferencial falhou ({str(e)}), usando preenchimento campo a campo")
+            return self.preencher_formulario(nota)
+
+    def resolver_dropdowns_plano(self, plano):
+        """
+        Troca o texto desejado em cada dropdown do plano pelo value da opção (IndiceOpcoes)
+
+        JS_PREENCHER_PLANO só compara values, então a opção escolhida é a mesma de
+        selecionar_por_indice e do envio HTTP. A lista dos dropdowns dependentes (municípios)
+        só existe depois da troca da UF: eles chegam com o código do catálogo ou, fora dele,
+        falham no script e são resolvidos no preenchimento individual que segue o lote.
+        """
+        resolvido = []
+        for passo in plano:
+            if passo['tipo'] == 'dropdown' and passo['id'] not in DROPDOWNS_DEPENDENTES:
+                opcao = self.cache_opcoes.indice(passo['id'], self.carregar_opcoes_dropdown).procurar(passo['valor'])
+                if opcao is not None:
+                    passo = dict(passo, valor=opcao[0])
+                else:
+                    self.logger.warning(f"Lote: opção '{passo['valor']}' não encontrada em {passo['id']}")
+            resolvido.append(passo)
+        return resolvido
+
+    def preencher_formulario_lote(self, nota, timeout_ajax=8, plano=None):
+        """Preenche o formulário inteiro em uma única chamada JavaScript, com fallback por campo"""
+        try:
+            self.logger.info(f"Preenchendo nota em lote para: {nota.Nome_Cliente}")
+            if plano is None:
+                plano = self.montar_plano_preenchimento(nota)
+            plano = self.resolver_dropdowns_plano(plano)
+            if self.preenchimento_diferencial:
+                # O próprio script compara com o valor atual e pula change e espera de AJAX
+                plano = [dict(passo, se_diferente=True) if passo['tipo'] != 'cpf' else passo for passo in plano]
+
+            resposta = self.driver.execute_async_script(JS_PREENCHER_PLANO, plano, int(timeout_ajax * 1000))
+            resultados = resposta['resultados']
+
+            passos_com_erro = [passo for passo in plano if str(resultados.get(passo['id'], 'erro')).startswith('erro')]
+            auto = [passo['id'] for passo in plano if resultados.get(passo['id']) == 'auto']
+            mantidos = sum(1 for valor in resultados.values() if valor == 'mantido')
+
+            self.logger.info(f"Lote: {len(plano) - len(passos_com_erro)}/{len(plano)} campos em {resposta['tempo_ms']}ms"
+                             + (f" ({mantidos} já estavam com o valor desejado)" if mantidos else ""))
+            if auto:
+                self.logger.info(f"Campos já preenchidos automaticamente pelo CPF: {', '.join(auto)}")
+            if self.cache_cpf and resultados.get('frmConteudo:imCpfCnpjT') == 'ok':
+                # Só os campos com se_vazio no plano informam o preenchimento automático;
+                # os demais mantêm o que o cache já sabia
+                cpf = nota.CPF
+                observados = {passo['id'] for passo in plano if passo.get('se_vazio')}
+                campos = dict((self.cache_cpf.obter(cpf) or {}).get('campos', {}))
+                campos.update({campo: id_campo in auto for campo, id_campo in CAMPOS_AUTOPREENCHIMENTO.items()
+                               if id_campo in observados})
+                self.cache_cpf.registrar(cpf, campos)
+
+            for passo in passos_com_erro:
+                self.logger.warning(f"Lote: {passo['id']} falhou ({resultados.get(passo['id'])}), usando preenchimento individual")
+                if passo['tipo'] == 'dropdown':
+                    self.selecionar_dropdown(passo['id'], passo['valor'])
+                    if passo.get('fechar_modal'):
+                        self.fechar_modals()
+                elif passo['tipo'] == 'cpf':
+                    self.preencher_cpf(passo['valor'])
+                else:
+                    self.preencher_campo(passo['id'], passo['valor'])
+
+            self.logger.info("Formulário preenchido com sucesso")
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Preenchimento em lote falhou ({str(e)}), usando preenchimento campo a campo")
+            return self.preencher_formulario(nota)
+
+    def preencher_nota(self, nota, plano=None):
+        """Preenche a nota usando o modo configurado (lote, diferencial ou campo a campo)"""
+        if self.preenchimento_lote:
+            return self.preencher_formulario_lote(nota, plano=plano)
+        if self.preenchimento_diferencial:
+            return self.preencher_formulario_diferencial(nota, plano=plano)
+        return self.preencher_formulario(nota)
+
+    def emitir_nota(self, timeout=30):
+        """
+        Clica no botão emitir nota e aguarda a confirmação do portal
+
+        A espera termina assim que surge uma mensagem nova. Erro ou aviso recusam a nota; ela só
+        conta como emitida com mensagem de sucesso que traga o número (classificar_mensagens).
+        Qualquer outra resposta, inclusive nenhuma até o timeout, fica sem confirmação.
+
+        Returns:
+            ResultadoEmissao: status (emitida, erro ou sem_confirmacao), numero_nota,
+            tempo_ms e mensagens; verdadeiro apenas se a nota foi emitida
+        """
+        try:
+            self.wait.until(EC.element_to_be_clickable((By.ID, 'frmConteudo:cbEmitirNf')))
+            resposta = self.driver.execute_async_script(JS_EMITIR_E_AGUARDAR, 'frmConteudo:cbEmitirNf',
+                                                        int(timeout * 1000))
         except Exception as e:
             self.logger.error(f"Erro ao emitir nota: {str(e)}")
+            return ResultadoEmissao(ENVIO_ERRO, mensagens=(('error', str(e)),))
+
+        mensagens = tuple(tuple(mensagem) for mensagem in resposta['mensagens'])
+        if resposta['clicado']:
+            status, numero_nota = classificar_mensagens(mensagens)
+        else:
+            status, numero_nota = ENVIO_ERRO, None
+        resultado = ResultadoEmissao(status, numero_nota, resposta['tempo_ms'], mensagens)
+
+        texto = '; '.join(texto for _, texto in mensagens)
+        if resultado:
+            self.logger.info(f"Nota fiscal emitida (nº {resultado.numero_nota}) em {resultado.tempo_ms}ms")
+        elif status == ENVIO_SEM_CONFIRMACAO:
+            self.logger.warning(f"Portal não confirmou a emissão (sem mensagem de sucesso com o número "
+                                f"da nota em {timeout}s): {texto}")
+        else:
+            self.logger.error(f"Portal recusou a nota: {texto}")
+        return resultado
+
+    def emitir_nota_registrada(self, diario, impressao, registro, linha):
+        """Emite a nota registrando no diário o estado antes e depois do clique"""
+        if diario is None:
+            return self.emitir_nota()
+
+        diario.marcar_em_andamento(impressao, registro, linha)
+        resultado = self.emitir_nota()
+        if resultado:
+            diario.marcar_emitida(impressao, resultado.numero_nota or '')
+        elif resultado.status == ENVIO_SEM_CONFIRMACAO:
+            # Continua "em andamento" no diário: o --resume lista para conferência manual
+            self.logger.warning(f"Nota {registro} sem confirmação do portal - confira antes de reenviar")
+        else:
+            diario.marcar_erro(impressao, '; '.join(texto for _, texto in resultado.mensagens)
+                               or "Falha ao emitir nota")
+        return resultado
+
+    def verificar_diario(self, diario, impressao, registro, pendentes_verificacao):
+        """Indica se o registro deve ser pulado ao retomar uma execução"""
+        if diario is None or not self.retomar:
             return False
 
-    def processar_notas(self, modo_teste=True):
+        status = diario.status(impressao)
+        if status == STATUS_EMITIDA:
+            self.logger.info(f"Registro {registro} já emitido em execução anterior, pulando")
+            return True
+        if status == STATUS_EM_ANDAMENTO:
+            self.logger.warning(f"Registro {registro} ficou em andamento na execução anterior - confira no portal")
+            pendentes_verificacao.append(registro)
+            return True
+        return False
+
+    def mostrar_resumo_diario(self, diario, pulados, pendentes_verificacao):
+        """Mostra o resumo da retomada e as notas que precisam de conferência manual"""
+        if diario is None or not self.retomar:
+            return
+
+        print(f"\n📒 Diário: {diario.caminho}")
+        print(f"   ⏭️  Notas já emitidas puladas: {pulados}")
+        if pendentes_verificacao:
+            print(f"   ⚠️  Registros interrompidos durante a emissão (confira no portal): {pendentes_verificacao}")
+
+    def emitir_nota_http(self, diario, impressao, registro, linha, plano=None):
+        """
+        Emite a nota pelo envio HTTP direto, registrando no diário como emitir_nota_registrada
+
+        Returns:
+            dict: Resultado de EnvioHTTP.enviar (status, numero_nota, mensagens, tempo_ms)
+        """
+        if plano is None:
+            plano = self.montar_plano_preenchimento(linha)
+        if diario:
+            diario.marcar_em_andamento(impressao, registro, linha)
+
+        resultado = self.sessao_http.enviar(plano)
+        mensagens = '; '.join(texto for _, texto in resultado['mensagens'])
+
+        if resultado['status'] == ENVIO_EMITIDA:
+            if diario:
+                diario.marcar_emitida(impressao, resultado['numero_nota'] or '')
+            self.logger.info(f"Nota {registro} emitida por HTTP (nº {resultado['numero_nota']}) "
+                             f"em {resultado['tempo_ms']}ms")
+        elif resultado['status'] == ENVIO_SEM_CONFIRMACAO:
+            # Continua "em andamento" no diário: o --resume lista para conferência manual
+            self.logger.warning(f"Nota {registro} sem confirmação do portal: {mensagens}")
+        else:
+            if diario:
+                diario.marcar_erro(impressao, mensagens or resultado['status'])
+            self.logger.error(f"Nota {registro} não emitida por HTTP ({resultado['status']}): {mensagens}")
+        return resultado
+
+    def mostrar_estatisticas_rede(self):
+        """Mostra a latência das requisições AJAX do portal medida pela rede"""
+        if not self.rede or not self.rede.disponivel:
+            return
+        estatisticas = self.rede.estatisticas()
+        if not estatisticas['requisicoes']:
+            return
+        print(f"\n🌐 AJAX do portal: {estatisticas['requisicoes']} requisições "
+              f"(falhas: {estatisticas['falhas']})")
+        print(f"   Latência: média {estatisticas['media_ms']:.0f}ms | p50 {estatisticas['p50_ms']:.0f}ms | "
+              f"p95 {estatisticas['p95_ms']:.0f}ms | máx {estatisticas['max_ms']:.0f}ms")
+        self.logger.info(f"Latência AJAX do portal: {estatisticas}")
+
+    def criar_worker(self, numero):
+        """
+        Cria uma cópia do RPA com sessão própria do Chrome para o modo paralelo
+
+        Cada worker tem seu driver e o cache dos dropdowns dependentes (municípios da UF
+        escolhida naquela sessão). O restante é o mesmo objeto do RPA principal:
+        - listas fixas dos dropdowns (self.cache_opcoes) e catálogo de municípios: lidos por
+          todos, gravados sob o lock de cada um (só o worker 1 coleta municípios);
+        - ControladorTempo e CacheCPF: todos os workers registram medições e CPFs nos objetos
+          do principal, que serializam as escritas com seus locks e são salvos uma vez no fim;
+        - seletores_painel: dict atualizado por atribuição simples (atômica no CPython).
+        Os resultados de cada worker vão para o dict que executar_worker recebe e são
+        consolidados por mostrar_relatorio_workers.
+        """
+        worker = copy.copy(self)
+        worker.driver = None
+        worker.wait = None
+        worker.rede = None
+        worker.sessao_http = None
+        worker.cache_opcoes = CacheOpcoesDropdown(compartilhado=self.cache_opcoes)
+        worker.numero_worker = numero
+        if self.rastreador:
+            # A cópia rasa herda métodos envolvidos que apontam para a instância original
+            self.rastreador.desinstrumentar(worker)
+            self.rastreador.instrumentar(worker)
+        return worker
+
+    def executar_worker(self, worker, fila, modo_teste, resultado, diario=None, confirmacao=None):
+        """
+        Consome registros da fila compartilhada até receber o marcador de fim (None)
+
+        No modo teste cada formulário preenchido espera o ENTER do usuário antes do próximo
+        registro, como no modo sequencial; o lock confirmacao faz um worker perguntar por vez.
+        """
+        confirmacao = confirmacao or threading.Lock()
+        while True:
+            item = fila.get()
+            if item is None:
+                fila.task_done()
+                break
+            index, linha, impressao, plano = item
+
+            inicio_nota = time.time()
+            try:
+                self.logger.info(f"[Worker {worker.numero_worker}] Processando registro {index + 1}")
+
+                if not worker.preencher_nota(linha, plano=plano):
+                    concluida = False
+                elif modo_teste:
+                    # Preenchida, não emitida: o tempo é só o do preenchimento, sem a espera do ENTER
+                    tempo_nota = time.time() - inicio_nota
+                    resultado['preenchidas'] += 1
+                    resultado['tempos_por_nota'].append(tempo_nota)
+                    with confirmacao:
+                        print(f"📝 [Worker {worker.numero_worker}] Nota {index + 1}: {tempo_nota:.1f}s")
+                        input(f"[Worker {worker.numero_worker}] Registro {index + 1} preenchido. "
+                              f"Pressione ENTER para continuar...")
+                    concluida = True
+                else:
+                    concluida = worker.emitir_nota_registrada(diario, impressao, index + 1, linha)
+                    if concluida:
+                        tempo_nota = time.time() - inicio_nota
+                        resultado['sucessos'] += 1
+                        resultado['tempos_por_nota'].append(tempo_nota)
+                        print(f"✅ [Worker {worker.numero_worker}] Nota {index + 1}: {tempo_nota:.1f}s")
+
+                if not concluida:
+                    resultado['erros'] += 1
+                    resultado['registros_com_erro'].append(index + 1)
+
+            except Exception as e:
+                self.logger.error(f"[Worker {worker.numero_worker}] Erro no registro {index + 1}: {str(e)}")
+                resultado['erros'] += 1
+                resultado['registros_com_erro'].append(index + 1)
+            finally:
+                fila.task_done()
+
+    def processar_notas_paralelo(self, modo_teste=True, num_workers=2):
+        """Processa as notas com várias sessões do Chrome consumindo uma fila compartilhada"""
+        inicio_processamento = time.time()
+        workers = []
+        diario = None
+
+        try:
+            print(f"\n🚀 RPA PARALELO - {num_workers} NAVEGADORES")
+            print("=" * 40)
+
+            if self.leitura_streaming:
+                registros = self.ler_dados_excel_streaming()
+            else:
+                notas = notas_do_dataframe(self.ler_dados_excel())
+                self.validar_cidades(notas)
+                registros = enumerate(notas)
+
+            diario = None if modo_teste else DiarioExecucao(self.caminho_diario)
+            pulados = 0
+            rejeitados = []
+            pendentes_verificacao = []
+
+            workers = [self.criar_worker(numero) for numero in range(1, num_workers + 1)]
+
+            # Inicializa os navegadores em paralelo, a abertura do Chrome é a etapa mais lenta
+            threads_inicio = [threading.Thread(target=worker.configurar_driver) for worker in workers]
+            for thread in threads_inicio:
+                thread.start()
+            for thread in threads_inicio:
+                thread.join()
+
+            workers = [worker for worker in workers if worker.driver]
+            if not workers:
+                raise Exception("Nenhum navegador pôde ser inicializado")
+
+            for worker in workers:
+                worker.navegar_para_site()
+
+            if not all(worker.inicio_rapido and pagina_emissao_aberta(worker.driver) for worker in workers):
+                self.exigir_janela_para_login()
+                input(f"Faça login nas {len(workers)} janelas do navegador e pressione ENTER quando todas estiverem na página de emissão...")
+            else:
+                print("🔓 Sessões anteriores ainda válidas nos perfis do Chrome, pulando o login")
+            # O catálogo é compartilhado: uma única janela coleta os municípios
+            workers[0].atualizar_catalogo_municipios()
+
+            # Fila limitada: com --streaming a planilha é lida enquanto os workers emitem
+            fila = queue.Queue(maxsize=4 * len(workers))
+            resultados = {
+                worker.numero_worker: {'sucessos': 0, 'preenchidas': 0, 'erros': 0, 'tempos_por_nota': [],
+                                       'registros_com_erro': []}
+                for worker in workers
+            }
+
+            confirmacao = threading.Lock()
+            threads = [
+                threading.Thread(
+                    target=self.executar_worker,
+                    args=(worker, fila, modo_teste, resultados[worker.numero_worker], diario, confirmacao),
+                    name=f"worker-{worker.numero_worker}"
+                )
+                for worker in workers
+            ]
+            for thread in threads:
+                thread.start()
+            try:
+                # Mesma validação e plano do modo sequencial, já com o catálogo atualizado
+                for index, linha, impressao, preparacao in self.notas_preparadas(registros):
+                    if self.verificar_diario(diario, impressao, index + 1, pendentes_verificacao):
+                        pulados += 1
+                    elif preparacao['problemas']:
+                        self.rejeitar_registro(index + 1, preparacao['problemas'])
+                        rejeitados.append(index + 1)
+                    else:
+                        fila.put((index, linha, impressao, preparacao['plano']))
+            finally:
+                for _ in threads:
+                    fila.put(None)
+                for thread in threads:
+                    thread.join()
+
+            self.mostrar_relatorio_workers(resultados, time.time() - inicio_processamento, modo_teste)
+            if rejeitados:
+                print(f"\n⛔ Registros rejeitados na preparação ({len(rejeitados)}): "
+                      f"{', '.join(map(str, rejeitados))}")
+            self.mostrar_resumo_diario(diario, pulados - len(pendentes_verificacao), pendentes_verificacao)
+            return resultados
+
+        except Exception as e:
+            self.logger.error(f"Erro no processamento paralelo: {str(e)}")
+        finally:
+            if diario:
+                diario.fechar()
+            if self.cache_cpf:
+                self.cache_cpf.salvar()
+            if self.caminho_tempos:
+                self.tempo.salvar(self.caminho_tempos)
+            if any(worker.driver for worker in workers):
+                if not perfil_sem_janela(self.perfil_navegador, self.headless):
+                    input("Pressione ENTER para fechar os navegadores...")
+                for worker in workers:
+                    if worker.driver:
+                        worker.driver.quit()
+
+    def mostrar_relatorio_workers(self, resultados, tempo_total, modo_teste=False):
+        """
+        Mostra o relatório consolidado e a vazão de cada worker
+
+        No modo teste as notas só foram preenchidas (cada uma esperou o ENTER do usuário):
+        aparecem como "preenchidas (não emitidas)", com o tempo médio de preenchimento e sem vazão.
+        """
+        print("\n" + "=" * 60)
+        print("📊 RELATÓRIO DO PROCESSAMENTO PARALELO" + (" - MODO TESTE" if modo_teste else ""))
+        print("=" * 60)
+        if modo_teste:
+            print(f"{'Worker':<10} {'Preenchidas':<12} {'Erros':<8} {'Médio':<10}")
+        else:
+            print(f"{'Worker':<10} {'Sucessos':<10} {'Erros':<8} {'Médio':<10} {'Notas/min':<10}")
+        print("-" * 60)
+
+        total_sucessos = 0
+        total_preenchidas = 0
+        total_erros = 0
+        for numero, resultado in sorted(resultados.items()):
+            tempos = resultado['tempos_por_nota']
+            tempo_medio = sum(tempos) / len(tempos) if tempos else 0
+            if modo_teste:
+                print(f"{numero:<10} {resultado['preenchidas']:<12} {resultado['erros']:<8} {tempo_medio:<10.1f}")
+            else:
+                notas_minuto = len(tempos) / (sum(tempos) / 60) if tempos else 0
+                print(f"{numero:<10} {resultado['sucessos']:<10} {resultado['erros']:<8} {tempo_medio:<10.1f} {notas_minuto:<10.1f}")
+            total_sucessos += resultado['sucessos']
+            total_preenchidas += resultado['preenchidas']
+            total_erros += resultado['erros']
+
+        print("-" * 60)
+        print(f"⏱️  Tempo total: {tempo_total:.1f}s")
+        if modo_teste:
+            print(f"📝 Preenchidas (não emitidas): {total_preenchidas}")
+        else:
+            print(f"✅ Sucessos: {total_sucessos}")
+        print(f"❌ Erros: {total_erros}")
+        if tempo_total > 0 and not modo_teste:
+            print(f"🚀 Vazão total: {total_sucessos / (tempo_total / 60):.1f} notas/min")
+
+        registros_com_erro = sorted(r for resultado in resultados.values() for r in resultado['registros_com_erro'])
+        if registros_com_erro:
+            print(f"⚠️  Registros com erro: {registros_com_erro}")
+        print("=" * 60)
+
+        self.logger.info(f"Processamento paralelo concluído. Sucessos: {total_sucessos}, "
+                         f"Preenchidas (não emitidas): {total_preenchidas}, Erros: {total_erros}")
+
+    def processar_notas(self, modo_teste=True, num_workers=1):
         """Processa todas as notas do Excel com otimizações de performance"""
+        if self.configuracoes_padrao is None:
+            raise ValueError("Cliente não configurado: informe mapeamento_cliente ou chame configurar_cliente")
+        if num_workers > 1 and self.envio_http and not modo_teste:
+            # Os POSTs dividem o mesmo ViewState da sessão JSF: não podem ser concorrentes
+            print("⚠️  Envio HTTP usa uma única sessão; ignorando --workers")
+            num_workers = 1
+        if num_workers > 1:
+            return self.processar_notas_paralelo(modo_teste=modo_teste, num_workers=num_workers)
+
         import time as tempo_inicial
         inicio_processamento = tempo_inicial.time()
+        diario = None
 
         try:
             print("\n🚀 RPA OTIMIZADO - VERSÃO 2.0")
@@ -1140,43 +1996,89 @@ Erro técnico: {str(e)}
             print("   • Delay entre registros: 2s → 0.5s")
             print("=" * 40)
 
-            self.configurar_driver()
-            df = self.ler_dados_excel()
-            self.navegar_para_site()
+            if self.leitura_streaming:
+                registros = self.ler_dados_excel_streaming()
+                limite = self.contar_registros_excel() or '?'
+            else:
+                notas = notas_do_dataframe(self.ler_dados_excel())
+                self.validar_cidades(notas)
+                registros = enumerate(notas)
+                limite = len(notas)
+
+            # O iniciar_rpa.py pode ter aberto o Chrome em segundo plano durante a validação
+            if self.driver is None:
+                self.configurar_driver()
+                self.navegar_para_site()
 
-            input("Pressione ENTER após fazer login no site e estar na página de emissão...")
+            self.aguardar_login()
+            self.atualizar_catalogo_municipios()
+
+            if self.envio_http and modo_teste:
+                print("⚠️  Envio HTTP só é usado no modo produção; preenchendo pelo navegador")
+            elif self.envio_http:
+                self.sessao_http = EnvioHTTP.capturar_do_navegador(self.driver)
+                print("🌐 Sessão capturada: notas serão enviadas por HTTP direto")
 
             sucessos = 0
             erros = 0
             tempos_por_nota = []
 
-            limite = len(df)
+            diario = None if modo_teste else DiarioExecucao(self.caminho_diario)
+            pulados = 0
+            rejeitados = []
+            pendentes_verificacao = []
 
             print(f"\n⏱️  MONITORAMENTO DE PERFORMANCE:")
             print("=" * 40)
 
-            for index, linha in df.head(limite).iterrows():
+            for index, linha, impressao, preparacao in self.notas_preparadas(registros):
                 try:
+                    if self.verificar_diario(diario, impressao, index + 1, pendentes_verificacao):
+                        pulados += 1
+                        continue
+
+                    if preparacao['problemas']:
+                        self.rejeitar_registro(index + 1, preparacao['problemas'])
+                        rejeitados.append(index + 1)
+                        erros += 1
+                        continue
+
                     inicio_nota = tempo_inicial.time()
                     self.logger.info(f"Processando registro {index + 1}/{limite}")
 
-                    if self.preencher_formulario(linha):
+                    if self.sessao_http:
+                        resultado = self.emitir_nota_http(diario, impressao, index + 1, linha,
+                                                          plano=preparacao['plano'])
+                        if resultado['status'] == ENVIO_EMITIDA:
+                            sucessos += 1
+                            tempo_nota = tempo_inicial.time() - inicio_nota
+                            tempos_por_nota.append(tempo_nota)
+                            print(f"✅ Nota {index + 1}: {tempo_nota:.2f}s (nº {resultado['numero_nota']})")
+                        else:
+                            erros += 1
+                            if resultado['status'] == ENVIO_SESSAO_EXPIRADA:
+                                print("❌ Sessão expirada no portal: faça login novamente e use --resume")
+                                break
+                        continue
+
+                    if self.preencher_nota(linha, plano=preparacao['plano']):
                         if modo_teste:
                             tempo_nota = tempo_inicial.time() - inicio_nota
                             tempos_por_nota.append(tempo_nota)
                             print(f"📝 Nota {index + 1}: {tempo_nota:.1f}s")
                             input(f"Registro {index + 1} preenchido. Pressione ENTER para continuar...")
                         else:
-                            if self.emitir_nota():
+                            emissao = self.emitir_nota_registrada(diario, impressao, index + 1, linha)
+                            if emissao:
                                 sucessos += 1
                                 tempo_nota = tempo_inicial.time() - inicio_nota
                                 tempos_por_nota.append(tempo_nota)
-                                print(f"✅ Nota {index + 1}: {tempo_nota:.1f}s")
+                                print(f"✅ Nota {index + 1}: {tempo_nota:.1f}s (nº {emissao.numero_nota})")
                                 self.logger.info(f"Nota {index + 1} emitida com sucesso")
                             else:
                                 erros += 1
 
-                        time.sleep(0.5)
+                        self.pausa('entre_notas', CONDICOES_PAGINA_PRONTA)
                     else:
                         erros += 1
 
@@ -1208,13 +2110,28 @@ Erro técnico: {str(e)}
                 print(f"   Melhoria: {melhoria:.0f}% mais rápido!")
                 print("=" * 40)
 
+            if rejeitados:
+                print(f"\n⛔ Registros rejeitados na preparação ({len(rejeitados)}): "
+                      f"{', '.join(map(str, rejeitados))}")
+            self.mostrar_estatisticas_rede()
+            self.tempo.mostrar_resumo()
+            self.mostrar_resumo_diario(diario, pulados - len(pendentes_verificacao), pendentes_verificacao)
             self.logger.info(f"Processamento concluído. Sucessos: {sucessos}, Erros: {erros}")
 
         except Exception as e:
             self.logger.error(f"Erro no processamento: {str(e)}")
         finally:
+            if diario:
+                diario.fechar()
+            if self.sessao_http:
+                self.sessao_http.fechar()
+            if self.cache_cpf:
+                self.cache_cpf.salvar()
+            if self.caminho_tempos:
+                self.tempo.salvar(self.caminho_tempos)
             if self.driver:
-                input("Pressione ENTER para fechar o navegador...")
+                if not perfil_sem_janela(self.perfil_navegador, self.headless):
+                    input("Pressione ENTER para fechar o navegador...")
                 self.driver.quit()
 
 def selecionar_mapeamento_cliente():
@@ -1285,6 +2202,44 @@ def mostrar_comparacao_temp():
 
 def main():
     """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RPA de preenchimento de notas fiscais")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Número de navegadores processando notas em paralelo (padrão: 1)")
+    parser.add_argument('--lote', action='store_true',
+                        help="Preenche cada nota em uma única chamada JavaScript")
+    parser.add_argument('--diferencial', action='store_true',
+                        help="Escreve só os campos cujo valor na página difere do desejado para a nota")
+    parser.add_argument('--producao', action='store_true',
+                        help="Emite as notas (padrão: modo teste, apenas preenchimento)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Retoma uma execução interrompida pulando as notas já emitidas")
+    parser.add_argument('--diario', default='rpa_diario.sqlite3',
+                        help="Arquivo do diário de emissões (padrão: rpa_diario.sqlite3)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lê o Excel linha a linha (planilhas grandes, memória constante)")
+    parser.add_argument('--perfil', choices=list(PERFIS_NAVEGADOR), default='padrao',
+                        help="Perfil do Chrome: 'desempenho' roda headless sem imagens/fontes/analytics "
+                             "(exige --inicio-rapido com a sessão já salva pelo perfil 'leve')")
+    parser.add_argument('--http', action='store_true',
+                        help="No modo produção, envia as notas por POST direto após o login no navegador")
+    parser.add_argument('--sem-cache-cpf', action='store_true',
+                        help="Não usa o cache do preenchimento automático por CPF")
+    parser.add_argument('--tempos-fixos', action='store_true',
+                        help="Usa as pausas fixas originais em vez das esperas adaptativas")
+    parser.add_argument('--inicio-rapido', action='store_true',
+                        help="Reaproveita o ChromeDriver e um perfil do Chrome com a sessão do portal entre execuções")
+    parser.add_argument('--atualizar-municipios', action='store_true',
+                        help="Coleta de novo os municípios de todas as UFs do portal para o catálogo")
+    parser.add_argument('--trace', nargs='?', const='rpa_trace.json', metavar='ARQUIVO',
+                        help="Mede o tempo de cada etapa e salva um Chrome trace (padrão: rpa_trace.json)")
+    args = parser.parse_args()
+    if perfil_sem_janela(obter_perfil(args.perfil)) and not args.inicio_rapido:
+        # Sem janela e sem sessão salva o login manual seria impossível
+        parser.error(f"--perfil {args.perfil} roda sem janela e exige --inicio-rapido; faça o login uma vez "
+                     f"com --perfil leve --inicio-rapido")
+
     print("🤖 RPA NOTAS FISCAIS - SISTEMA MULTI-CLIENTE")
 
     cliente_selecionado = selecionar_mapeamento_cliente()
@@ -1293,15 +2248,30 @@ def main():
     CAMINHO_EXCEL = "notas_fiscais.xlsx"
 
     print(f"\n📋 Inicializando RPA para cliente: {cliente_selecionado.upper()}")
-    rpa = RPANotasFiscais(URL_SITE, CAMINHO_EXCEL, cliente_selecionado, delay=2)
-
-    print("\n🧪 Iniciando RPA em MODO TESTE (apenas preenchimento)")
+    rpa = RPANotasFiscais(URL_SITE, CAMINHO_EXCEL, cliente_selecionado, delay=2, preenchimento_lote=args.lote,
+                          caminho_diario=args.diario, retomar=args.resume,
+                          leitura_streaming=args.streaming,
+                          rastreador=Rastreador(args.trace) if args.trace else None,
+                          perfil_navegador=args.perfil, envio_http=args.http,
+                          usar_cache_cpf=not args.sem_cache_cpf,
+                          preenchimento_diferencial=args.diferencial,
+                          tempos_adaptativos=not args.tempos_fixos,
+                          inicio_rapido=args.inicio_rapido,
+                          atualizar_municipios=args.atualizar_municipios)
+
+    if args.producao:
+        print("\n🚀 Iniciando RPA em MODO PRODUÇÃO (preenche e emite as notas)")
+    else:
+        print("\n🧪 Iniciando RPA em MODO TESTE (apenas preenchimento)")
     print("Certifique-se de que:")
     print("1. O arquivo Excel está no formato correto")
     print("2. Você fez login no site")
     print("3. Está na página de emissão de notas")
 
-    rpa.processar_notas(modo_teste=True)
+    rpa.processar_notas(modo_teste=not args.producao, num_workers=max(1, args.workers))
+
+    if rpa.rastreador:
+        rpa.rastreador.finalizar()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from cache_cpf import ARQUIVO_SEGREDO, CacheCPF
+
+CPF = '52998224725'
+CAMPOS = {'nome': 'ANA', 'uf': 'SP'}
+
+
+def test_entradas_persistem_sem_o_cpf_nem_seu_hash(tmp_path):
+    caminho = str(tmp_path / 'cache' / 'cpf.json')
+    cache = CacheCPF(caminho)
+    cache.registrar(CPF, CAMPOS, latencia_ms=300)
+    cache.salvar()
+
+    conteudo = (tmp_path / 'cache' / 'cpf.json').read_text(encoding='utf-8')
+    assert CPF not in conteudo
+    assert hashlib.sha256(CPF.encode('utf-8')).hexdigest()[:24] not in conteudo
+    assert CacheCPF(caminho).obter(CPF)['latencia_ms'] == 300
+
+
+def test_outra_instalacao_nao_reconhece_as_chaves(tmp_path):
+    caminho = tmp_path / 'a' / 'cpf.json'
+    cache = CacheCPF(str(caminho))
+    cache.registrar(CPF, CAMPOS)
+    cache.salvar()
+
+    copia = tmp_path / 'b' / 'cpf.json'
+    copia.parent.mkdir()
+    copia.write_bytes(caminho.read_bytes())
+    assert CacheCPF(str(copia)).obter(CPF) is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="permissões POSIX")
+def test_segredo_criado_so_para_o_usuario(tmp_path):
+    CacheCPF(str(tmp_path / 'cpf.json'))
+    assert os.stat(tmp_path / ARQUIVO_SEGREDO).st_mode & 0o777 == 0o600
+
+
+def test_cache_antigo_com_hash_simples_e_descartado(tmp_path):
+    caminho = tmp_path / 'cpf.json'
+    chave_antiga = hashlib.sha256(CPF.encode('utf-8')).hexdigest()[:24]
+    caminho.write_text(json.dumps({chave_antiga: {'campos': {}, 'latencia_ms': 1, 'confirmacoes': 0}}))
+
+    cache = CacheCPF(str(caminho))
+    assert cache.entradas == {}
+    cache.salvar()
+    assert chave_antiga not in caminho.read_text(encoding='utf-8')
@@ -0,0 +1,124 @@
+import os
+
+import pandas as pd
+import pytest
+
+import cache_planilha
+from cache_planilha import ler_planilha
+
+
+@pytest.fixture(params=['parquet', 'pickle'])
+def formato(request, monkeypatch):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(cache_planilha, 'PARQUET_DISPONIVEL', request.param == 'parquet')
+    return request.param
+
+
+def gravar(caminho, valores, mtime):
+    pd.DataFrame({'CPF': ['529.982.247-25'] * len(valores), 'Valor': valores}).to_excel(caminho, index=False)
+    os.utime(caminho, (mtime, mtime))
+
+
+def arquivos(pasta):
+    return sorted(nome for nome in os.listdir(pasta) if nome.endswith(('.parquet', '.pkl')))
+
+
+def valores(caminho, pasta, cliente=None):
+    return ler_planilha(caminho, cliente, pasta_cache=pasta)[0]['Valor'].tolist()
+
+
+def test_cache_guarda_a_planilha_normalizada(tmp_path, formato):
+    pasta = str(tmp_path / 'cache')
+    planilha = str(tmp_path / 'notas.xlsx')
+    pd.DataFrame({'Nome_Cliente': ['ANA', None], 'CPF': ['529.982.247-25', None],
+                  'Valor': ['150,50', 'abc'], 'Data': ['05/04/24', None]}).to_excel(planilha, index=False)
+
+    lida, mascara_lida = ler_planilha(planilha, 'cliente_b', pasta_cache=pasta)
+    do_cache, mascara_cache = ler_planilha(planilha, 'cliente_b', pasta_cache=pasta)
+
+    assert lida['CPF'].tolist() == ['52998224725', '00000000000']
+    assert lida['Valor'].tolist()[0] == 150.5 and pd.isna(lida['Valor'].iloc[1])
+    assert lida['Endereco'].tolist() == ['', '']
+    assert mascara_lida['valor_invalido'].tolist() == [False, True]
+    assert mascara_lida['CPF_vazio'].tolist() == [False, True]
+    pd.testing.assert_frame_equal(do_cache, lida, check_dtype=False)
+    pd.testing.assert_frame_equal(mascara_cache, mascara_lida)
+
+
+def test_chave_separa_clientes_e_versoes(tmp_path, formato, monkeypatch):
+    pasta = str(tmp_path / 'cache')
+    planilha = str(tmp_path / 'notas.xlsx')
+    gravar(planilha, [1.0], 1_000_000)
+
+    assert 'Endereco' not in ler_planilha(planilha, pasta_cache=pasta)[0].columns
+    assert 'Endereco' in ler_planilha(planilha, 'cliente_b', pasta_cache=pasta)[0].columns
+    monkeypatch.setattr(cache_planilha, 'VERSAO_NORMALIZACAO', 999)
+    ler_planilha(planilha, pasta_cache=pasta)
+    assert len(arquivos(pasta)) == 3
+
+
+def test_cache_guarda_so_a_versao_mais_recente(tmp_path, formato):
+    pasta = str(tmp_path / 'cache')
+    planilha = str(tmp_path / 'notas.xlsx')
+
+    gravar(planilha, [1.0], 1_000_000)
+    assert valores(planilha, pasta) == [1.0]
+    assert valores(planilha, pasta, 'cliente_b') == [1.0]
+    primeiro = arquivos(pasta)
+    assert len(primeiro) == 2
+
+    gravar(planilha, [2.0, 3.0], 1_000_100)
+    assert valores(planilha, pasta) == [2.0, 3.0]
+    segundo = arquivos(pasta)
+    assert len(segundo) == 1 and not set(segundo) & set(primeiro)
+
+    # Mesma versão: vem do cache
+    assert valores(planilha, pasta) == [2.0, 3.0]
+    assert arquivos(pasta) == segundo
+
+
+def test_copia_identica_compartilha_o_cache(tmp_path, formato):
+    pasta = str(tmp_path / 'cache')
+    original = str(tmp_path / 'a.xlsx')
+    gravar(original, [5.0], 1_000_000)
+    valores(original, pasta)
+    copia = str(tmp_path / 'b.xlsx')
+    with open(original, 'rb') as origem, open(copia, 'wb') as destino:
+        destino.write(origem.read())
+    valores(copia, pasta)
+
+    # A cópia muda, mas o cache da versão original continua em uso por a.xlsx
+    gravar(copia, [6.0], 1_000_100)
+    valores(copia, pasta)
+    assert len(arquivos(pasta)) == 2
+    assert valores(original, pasta) == [5.0]
+
+
+def test_planilha_apagada_sai_do_cache(tmp_path, formato):
+    pasta = str(tmp_path / 'cache')
+    antiga = str(tmp_path / 'antiga.xlsx')
+    gravar(antiga, [1.0], 1_000_000)
+    valores(antiga, pasta)
+    os.remove(antiga)
+
+    nova = str(tmp_path / 'nova.xlsx')
+    gravar(nova, [2.0], 1_000_000)
+    valores(nova, pasta)
+    assert len(arquivos(pasta)) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="permissões POSIX")
+def test_pickle_alteravel_por_outros_nao_e_carregado(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_planilha, 'PARQUET_DISPONIVEL', False)
+    pasta = str(tmp_path / 'cache')
+    planilha = str(tmp_path / 'notas.xlsx')
+    gravar(planilha, [1.0], 1_000_000)
+    valores(planilha, pasta)
+    (arquivo,) = arquivos(pasta)
+    os.chmod(os.path.join(pasta, arquivo), 0o666)
+
+    lidos = []
+    monkeypatch.setattr(pd, 'read_pickle', lambda *args, **kwargs: lidos.append(args))
+    assert valores(planilha, pasta) == [1.0]
+    assert lidos == []
@@ -0,0 +1,34 @@
+from catalogo_municipios import CatalogoMunicipios, MUNICIPIO_TOMADOR
+from rpa_notas_fiscais import RPANotasFiscais
+
+MUNICIPIO_INCIDENCIA = 'frmConteudo:somMunicipioIncidencia'
+OPCOES_SP = [('', 'Selecione'), ('3550308', 'SÃO PAULO'), ('3509502', 'CAMPINAS')]
+
+
+def test_procura_sem_acentos_e_valida_cidades(tmp_path):
+    caminho = str(tmp_path / 'catalogo.json')
+    catalogo = CatalogoMunicipios(caminho)
+    catalogo.registrar(MUNICIPIO_TOMADOR, 'SP', OPCOES_SP)
+    catalogo.salvar()
+
+    carregado = CatalogoMunicipios(caminho)
+    assert carregado.procurar('sao  paulo', 'sp') == ('3550308', 'SÃO PAULO')
+    # Os dropdowns de município listam os mesmos nomes: um serve de reserva para o outro
+    assert carregado.procurar('Campinas', 'SP', MUNICIPIO_INCIDENCIA) == ('3509502', 'CAMPINAS')
+    assert carregado.validar_cidades(['CAMPINAS', 'ATLANTIDA', 'ATLANTIDA', ''], 'SP') == {'ATLANTIDA': 2}
+    assert carregado.validar_cidades(['ATLANTIDA'], 'RJ') == {}
+    assert carregado.nome_municipio('3509502') == 'CAMPINAS'
+    assert carregado.nome_municipio('9999999') is None
+
+
+def test_painel_procura_o_nome_do_codigo_do_catalogo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rpa = RPANotasFiscais('http://localhost/', None, 'cliente_a', caminho_diario=None, usar_cache_cpf=False,
+                          caminho_tempos=None, caminho_catalogo=None)
+    rpa.catalogo_municipios.registrar(MUNICIPIO_TOMADOR, 'SP', OPCOES_SP)
+
+    codigo = rpa.valor_municipio('Campinas', 'SP')
+    assert codigo == '3509502'
+    assert rpa.texto_opcao_painel(MUNICIPIO_TOMADOR, codigo) == 'CAMPINAS'
+    assert rpa.texto_opcao_painel(MUNICIPIO_TOMADOR, 'CIDADE FORA DO CATALOGO') == 'CIDADE FORA DO CATALOGO'
+    assert rpa.texto_opcao_painel('frmConteudo:somAtividade', '508') == '508'
@@ -0,0 +1,44 @@
+from controle_tempo import ControladorTempo, MINIMO_AMOSTRAS, TEMPOS_MINIMOS, TEMPOS_PADRAO
+
+
+def test_usa_padrao_ate_ter_amostras():
+    tempo = ControladorTempo()
+    for _ in range(MINIMO_AMOSTRAS - 1):
+        tempo.registrar('dropdown', 0.01)
+    assert tempo.espera('dropdown') == TEMPOS_PADRAO['dropdown']
+
+
+def test_espera_aprendida_respeita_minimo_da_etapa():
+    tempo = ControladorTempo()
+    for _ in range(20):
+        tempo.registrar('dropdown', 0.001)
+    assert tempo.espera('dropdown') == TEMPOS_MINIMOS['dropdown'] > 0.02
+
+
+def test_timeout_faz_a_espera_subir():
+    tempo = ControladorTempo()
+    for _ in range(20):
+        tempo.registrar('navegacao', 0.4)
+    antes = tempo.espera('navegacao')
+    for _ in range(3):
+        tempo.registrar_timeout('navegacao', tempo.espera('navegacao'))
+    assert tempo.espera('navegacao') > antes
+
+
+def test_modelo_salvo_volta_com_o_piso(tmp_path):
+    caminho = str(tmp_path / 'tempos.json')
+    tempo = ControladorTempo()
+    for _ in range(10):
+        tempo.registrar('modal', 0.0)
+    tempo.salvar(caminho)
+
+    carregado = ControladorTempo()
+    assert carregado.carregar(caminho)
+    assert carregado.espera('modal') == TEMPOS_MINIMOS['modal']
+
+
+def test_nao_adaptativo_mantem_padrao():
+    tempo = ControladorTempo(adaptativo=False)
+    for _ in range(20):
+        tempo.registrar('campo', 5.0)
+    assert tempo.espera('campo') == TEMPOS_PADRAO['campo']
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from diario_execucao import (STATUS_EM_ANDAMENTO, STATUS_EMITIDA, STATUS_ERRO, DiarioExecucao,
+                             ImpressoesLinhas)
+
+LINHA = {'CPF': '52998224725', 'Nome_Cliente': 'Ana Souza', 'Nome_Item': 'Consulta',
+         'Valor': 150.0, 'Data': pd.Timestamp('2024-03-01')}
+
+
+def test_linhas_identicas_recebem_impressoes_distintas():
+    impressoes = ImpressoesLinhas()
+    primeira = impressoes.gerar(LINHA)
+    segunda = impressoes.gerar(dict(LINHA, Nome_Cliente='  ANA SOUZA '))
+
+    assert primeira != segunda
+    assert ImpressoesLinhas().gerar(LINHA) == primeira
+
+
+def test_estados_sobrevivem_a_reabertura(tmp_path):
+    caminho = str(tmp_path / 'diario.sqlite3')
+    impressoes = ImpressoesLinhas()
+    emitida, interrompida, com_erro = (impressoes.gerar(LINHA) for _ in range(3))
+
+    diario = DiarioExecucao(caminho)
+    for registro, impressao in enumerate([emitida, interrompida, com_erro], start=1):
+        diario.marcar_em_andamento(impressao, registro, LINHA)
+    diario.marcar_emitida(emitida, 'Nota 123')
+    diario.marcar_erro(com_erro, 'CPF recusado')
+    diario.fechar()
+
+    diario = DiarioExecucao(caminho)
+    assert diario.status(emitida) == STATUS_EMITIDA
+    assert diario.status(interrompida) == STATUS_EM_ANDAMENTO
+    assert diario.status(com_erro) == STATUS_ERRO
+    assert diario.status('nunca-processada') is None
+    assert [linha[:3] for linha in diario.registros_em_andamento()] == [(2, '52998224725', 'ANA SOUZA')]
+    diario.fechar()
@@ -0,0 +1,76 @@
+import pytest
+
+from envio_http import ENVIO_EMITIDA, ENVIO_ERRO, ENVIO_SEM_CONFIRMACAO
+from rpa_notas_fiscais import RPANotasFiscais
+
+
+class EsperaImediata:
+    def until(self, condicao):
+        return True
+
+
+class DriverEmissao:
+    """Devolve a resposta de JS_EMITIR_E_AGUARDAR como o Chrome devolveria"""
+
+    def __init__(self, mensagens, clicado=True):
+        self.resposta = {'clicado': clicado, 'ok': bool(mensagens), 'tempo_ms': 35,
+                         'mensagens': [list(mensagem) for mensagem in mensagens]}
+
+    def execute_async_script(self, script, *argumentos):
+        return self.resposta
+
+
+class DiarioFalso:
+    def __init__(self):
+        self.eventos = []
+
+    def marcar_em_andamento(self, impressao, registro, linha):
+        self.eventos.append('em_andamento')
+
+    def marcar_emitida(self, impressao, numero_nota):
+        self.eventos.append(('emitida', numero_nota))
+
+    def marcar_erro(self, impressao, mensagem):
+        self.eventos.append(('erro', mensagem))
+
+
+@pytest.fixture
+def rpa(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # setup_logging grava o log no diretório atual
+    rpa = RPANotasFiscais('http://localhost/', None, 'cliente_a', caminho_diario=None, usar_cache_cpf=False,
+                          caminho_tempos=None, caminho_catalogo=None)
+    rpa.wait = EsperaImediata()
+    return rpa
+
+
+@pytest.mark.parametrize('mensagens, status, numero_nota', [
+    ([('info', 'Nota Fiscal nº 000042 emitida com sucesso')], ENVIO_EMITIDA, '000042'),
+    ([('info', 'Dados salvos')], ENVIO_SEM_CONFIRMACAO, None),
+    ([('warn', 'Campo obrigatório: Razão social')], ENVIO_ERRO, None),
+    ([('info', 'Nota Fiscal nº 000042 emitida'), ('warn', 'Alíquota divergente')], ENVIO_ERRO, None),
+    ([('error', 'CPF/CNPJ do tomador inválido')], ENVIO_ERRO, None),
+    ([], ENVIO_SEM_CONFIRMACAO, None),
+])
+def test_emitir_nota_classifica_mensagens(rpa, mensagens, status, numero_nota):
+    rpa.driver = DriverEmissao(mensagens)
+    resultado = rpa.emitir_nota()
+    assert (resultado.status, resultado.numero_nota) == (status, numero_nota)
+    assert bool(resultado) == (status == ENVIO_EMITIDA)
+
+
+def test_emitir_nota_sem_clique_e_erro(rpa):
+    rpa.driver = DriverEmissao([('error', 'botão Emitir indisponível')], clicado=False)
+    assert rpa.emitir_nota().status == ENVIO_ERRO
+
+
+@pytest.mark.parametrize('mensagens, eventos', [
+    ([('info', 'Nota Fiscal nº 000007 emitida com sucesso')], ['em_andamento', ('emitida', '000007')]),
+    ([('warn', 'Campo obrigatório')], ['em_andamento', ('erro', 'Campo obrigatório')]),
+    # Sem número não marca como emitida: continua em andamento para conferência no --resume
+    ([('info', 'Operação realizada')], ['em_andamento']),
+])
+def test_emitir_nota_registrada_atualiza_diario(rpa, mensagens, eventos):
+    diario = DiarioFalso()
+    rpa.driver = DriverEmissao(mensagens)
+    rpa.emitir_nota_registrada(diario, 'impressao', 1, None)
+    assert diario.eventos == eventos
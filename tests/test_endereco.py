@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from endereco import extrair_endereco, extrair_enderecos_serie
+
+ENDERECOS = [
+    'AV BRASIL, 1500 AP 12',
+    'PC DA SÉ, 10',
+    'R DAS FLORES, 25',
+    'TRAV CENTRAL 30',
+    'ESTRADA VELHA 7',
+    'SEM NUMERO',
+]
+
+
+def test_formato_com_prefixo():
+    assert extrair_endereco('AV BRASIL, 1500 AP 12') == ('BRASIL', '1500', 'AVENIDA')
+    assert extrair_endereco('  PC DA SÉ, 10 ') == ('DA SÉ', '10', 'PRAÇA')
+    assert extrair_endereco('TRAV CENTRAL, 30') == ('CENTRAL', '30', 'TRAVESSA')
+
+
+def test_fora_do_formato_usa_rua():
+    assert extrair_endereco('TRAV CENTRAL 30') == ('CENTRAL', '30', 'RUA')
+    assert extrair_endereco('ESTRADA VELHA 7') == ('ESTRADA VELHA', '7', 'RUA')
+    assert extrair_endereco('SEM NUMERO') == ('SEM NUMERO', '', 'RUA')
+
+
+def test_serie_concorda_com_versao_escalar():
+    serie = pd.Series(ENDERECOS + ['AV BRASIL, 1500 AP 12'], index=range(10, 17))
+    resultado = extrair_enderecos_serie(serie)
+
+    assert list(resultado.index) == list(serie.index)
+    for indice, endereco in serie.items():
+        assert tuple(resultado.loc[indice]) == extrair_endereco(endereco)
+
+
+def test_serie_com_vazios():
+    resultado = extrair_enderecos_serie(pd.Series([np.nan, 'R DAS FLORES, 25', None]))
+
+    assert tuple(resultado.iloc[0]) == ('', '', '')
+    assert tuple(resultado.iloc[1]) == ('DAS FLORES', '25', 'RUA')
+    assert tuple(resultado.iloc[2]) == ('', '', '')
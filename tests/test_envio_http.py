@@ -0,0 +1,206 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from envio_http import (EnvioHTTP, classificar_mensagens, extrair_numero_nota, interpretar_resposta_parcial,
+                        ENVIO_EMITIDA, ENVIO_ERRO, ENVIO_SEM_CONFIRMACAO, ENVIO_SESSAO_EXPIRADA)
+from portal_simulado import PortalSimulado, OPCOES_FIXAS, UFS, growl_parcial, resposta_parcial
+
+RESPOSTA_EMITIDA = resposta_parcial(
+    '<changes>', growl_parcial(['Nota Fiscal nº 000042 emitida com sucesso'], 'info'),
+    '<update id="j_id1:javax.faces.ViewState:0"><![CDATA[abc:2]]></update>',
+    '<extension ln="primefaces" type="args">{"validationFailed":false}</extension>', '</changes>')
+
+
+def test_interpretar_resposta_parcial_le_growl_e_view_state():
+    resposta = interpretar_resposta_parcial(RESPOSTA_EMITIDA)
+    assert resposta['view_state'] == 'abc:2'
+    assert resposta['mensagens'] == [('info', 'Nota Fiscal nº 000042 emitida com sucesso')]
+    assert not resposta['validacao_falhou']
+    assert resposta['redirect'] is None and resposta['erro'] is None
+
+
+def test_interpretar_resposta_parcial_redirect_e_view_expired():
+    assert interpretar_resposta_parcial(resposta_parcial('<redirect url="/login.jsf"/>'))['redirect'] == '/login.jsf'
+    erro = interpretar_resposta_parcial(resposta_parcial(
+        '<error><error-name>javax.faces.application.ViewExpiredException</error-name>'
+        '<error-message><![CDATA[expirou]]></error-message></error>'))
+    assert 'ViewExpiredException' in erro['erro']
+
+
+def test_interpretar_resposta_parcial_mensagens_html():
+    resposta = interpretar_resposta_parcial(resposta_parcial(
+        '<changes>', '<update id="frmConteudo:msgs"><![CDATA[<span class="ui-messages-warn-summary">'
+        'Campo &amp; obrigat&oacute;rio</span>]]></update>', '</changes>'))
+    assert resposta['mensagens'] == [('warn', 'Campo & obrigatório')]
+
+
+def test_extrair_numero_nota():
+    assert extrair_numero_nota([('info', 'Nota Fiscal nº 000123 emitida')]) == '000123'
+    assert extrair_numero_nota([('info', 'NF No. 4567 gerada')]) == '4567'
+    assert extrair_numero_nota([('info', 'Operação realizada')]) is None
+
+
+@pytest.mark.parametrize('mensagens, esperado', [
+    ([('info', 'Nota Fiscal nº 000042 emitida com sucesso')], (ENVIO_EMITIDA, '000042')),
+    ([('INFO 0', 'Nota Fiscal nº 000042 emitida')], (ENVIO_EMITIDA, '000042')),
+    ([('success', 'Nota nº 777 gerada')], (ENVIO_EMITIDA, '777')),
+    ([('info', 'Operação realizada com sucesso')], (ENVIO_SEM_CONFIRMACAO, None)),
+    ([('warn', 'Campo obrigatório: Razão social')], (ENVIO_ERRO, None)),
+    ([('info', 'Nota nº 000042 emitida'), ('warn', 'Verifique a alíquota')], (ENVIO_ERRO, None)),
+    ([('error', 'CPF inválido')], (ENVIO_ERRO, None)),
+    ([('fatal', 'Erro interno')], (ENVIO_ERRO, None)),
+    ([('warn', 'Número 12345 do documento repetido')], (ENVIO_ERRO, None)),
+    ([], (ENVIO_SEM_CONFIRMACAO, None)),
+])
+def test_classificar_mensagens(mensagens, esperado):
+    assert classificar_mensagens(mensagens) == esperado
+
+
+@pytest.fixture(scope='module')
+def portal():
+    with PortalSimulado(latencia_ajax_ms=0, municipios_por_uf=20) as portal:
+        yield portal
+
+
+def criar_envio(portal, url=None, sessao=None):
+    if sessao is None:
+        sessao, view_state = portal.estado.nova_sessao()
+    else:
+        view_state = f"{sessao}:1"
+    opcoes = {f'frmConteudo:{dropdown}': lista for dropdown, lista in OPCOES_FIXAS.items()}
+    for uf in ('somUfT', 'somUfIncidencia', 'somUfServico'):
+        opcoes[f'frmConteudo:{uf}'] = [('', 'Selecione')] + [(sigla, sigla) for sigla in UFS]
+    return EnvioHTTP(url or portal.url, [{'name': 'JSESSIONID', 'value': sessao}], view_state, opcoes)
+
+
+def plano(cpf='12345678901', razao_social='FULANO DE TAL', municipio='CAMPINAS'):
+    return [
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somAtividade', 'valor': '508'},
+        {'tipo': 'cpf', 'id': 'frmConteudo:imCpfCnpjT', 'valor': cpf},
+        {'tipo': 'campo', 'id': 'frmConteudo:itRazaoSocialT', 'valor': razao_social},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somUfT', 'valor': 'SP'},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somMunicipioT', 'valor': municipio},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somUfIncidencia', 'valor': 'SP'},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somMunicipioIncidencia', 'valor': municipio},
+        {'tipo': 'campo', 'id': 'frmConteudo:itValorServico', 'valor': '150,00'},
+    ]
+
+
+def test_enviar_emite_nota(portal):
+    envio = criar_envio(portal)
+    resultado = envio.enviar(plano())
+    assert resultado['status'] == ENVIO_EMITIDA
+    assert resultado['numero_nota'] == f"{len(portal.estado.notas_emitidas):06d}"
+    emitida = portal.estado.notas_emitidas[-1]
+    assert emitida['frmConteudo:somMunicipioT_input'] == '3509502'
+
+
+def test_enviar_recusa_validacao(portal):
+    resultado = criar_envio(portal).enviar(plano(razao_social=''))
+    assert resultado['status'] == ENVIO_ERRO
+    assert ('error', 'Razão social obrigatória') in resultado['mensagens']
+
+
+def test_enviar_opcao_inexistente_nao_envia(portal):
+    emitidas = len(portal.estado.notas_emitidas)
+    resultado = criar_envio(portal).enviar(plano(municipio='ATLANTIDA'))
+    assert resultado['status'] == ENVIO_ERRO
+    assert len(portal.estado.notas_emitidas) == emitidas
+
+
+def test_enviar_falha_http_na_troca_de_uf_nao_propaga(portal):
+    # O POST de change da UF recebe 404: nenhuma nota foi enviada
+    resultado = criar_envio(portal, url=portal.url.replace('nf_emissao.jsf', 'inexistente')).enviar(plano())
+    assert resultado['status'] == ENVIO_ERRO
+    assert 'HTTP 404' in resultado['mensagens'][0][1]
+
+
+def test_enviar_sessao_desconhecida_na_troca_de_uf(portal):
+    resultado = criar_envio(portal, sessao='desconhecida').enviar(plano())
+    assert resultado['status'] == ENVIO_SESSAO_EXPIRADA
+
+
+def test_enviar_view_state_expirado_na_troca_de_uf(portal):
+    envio = criar_envio(portal)
+    envio.view_state = 'vencido'
+    assert envio.enviar(plano())['status'] == ENVIO_SESSAO_EXPIRADA
+
+
+def test_enviar_conexao_recusada_na_troca_de_uf():
+    envio = EnvioHTTP('http://127.0.0.1:9/nf_emissao.jsf', [], 'x:1',
+                      {'frmConteudo:somUfT': [('SP', 'SP')]}, timeout=2)
+    resultado = envio.enviar([{'tipo': 'dropdown', 'id': 'frmConteudo:somUfT', 'valor': 'SP'}])
+    assert resultado['status'] == ENVIO_ERRO
+
+
+class RedirecionaParaLogin(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(302)
+        self.send_header('Location', '/login.jsf')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def test_enviar_redirect_302_na_troca_de_uf():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), RedirecionaParaLogin)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        host, porta = servidor.server_address[:2]
+        envio = EnvioHTTP(f'http://{host}:{porta}/nf_emissao.jsf', [], 'x:1',
+                          {'frmConteudo:somUfT': [('SP', 'SP')]})
+        resultado = envio.enviar([{'tipo': 'dropdown', 'id': 'frmConteudo:somUfT', 'valor': 'SP'}])
+        assert resultado['status'] == ENVIO_SESSAO_EXPIRADA
+        assert '/login.jsf' in resultado['mensagens'][0][1]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_enviar_dispara_change_do_cpf_antes_de_emitir(portal, monkeypatch):
+    envio = criar_envio(portal)
+    origens = []
+    post_parcial = envio._post_parcial
+    monkeypatch.setattr(envio, '_post_parcial',
+                        lambda origem, *args, **kwargs: origens.append(origem) or post_parcial(origem, *args, **kwargs))
+    assert envio.enviar(plano())['status'] == ENVIO_EMITIDA
+    assert origens.index('frmConteudo:imCpfCnpjT') < origens.index('frmConteudo:cbEmitirNf')
+
+
+class RenovaSessao(BaseHTTPRequestHandler):
+    recebidos = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        RenovaSessao.recebidos.append(self.headers.get('Cookie'))
+        corpo = resposta_parcial('<changes>', '</changes>').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Set-Cookie', f'JSESSIONID=s{len(RenovaSessao.recebidos)}; Path=/; HttpOnly')
+        self.send_header('Set-Cookie', 'BALANCEADOR=; Max-Age=0; Path=/')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def test_cookies_renovados_pelo_portal_sao_reenviados():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), RenovaSessao)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        host, porta = servidor.server_address[:2]
+        envio = EnvioHTTP(f'http://{host}:{porta}/nf_emissao.jsf',
+                          [{'name': 'JSESSIONID', 'value': 's0'}, {'name': 'BALANCEADOR', 'value': 'no1'}], 'x:1', {})
+        envio.enviar([{'tipo': 'cpf', 'id': 'frmConteudo:imCpfCnpjT', 'valor': '12345678901'}])
+        assert RenovaSessao.recebidos == ['JSESSIONID=s0; BALANCEADOR=no1', 'JSESSIONID=s1']
+        assert envio.cookies == {'JSESSIONID': 's2'}
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
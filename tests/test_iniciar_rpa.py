@@ -0,0 +1,68 @@
+import io
+import logging
+import sys
+
+import pytest
+
+import rpa_notas_fiscais
+from iniciar_rpa import NavegadorEmSegundoPlano
+
+
+class RPAFalso:
+    def __init__(self, *args, **kwargs):
+        self.driver = None
+        self.logger = logging.getLogger('rpa_falso')
+
+    def configurar_driver(self):
+        self.logger.warning("ChromeDriver configurado")
+
+    def navegar_para_site(self):
+        pass
+
+
+class RPASemChrome(RPAFalso):
+    def configurar_driver(self):
+        raise RuntimeError("Chrome não encontrado")
+
+
+@pytest.fixture
+def log(tmp_path):
+    raiz = logging.getLogger()
+    terminal = io.StringIO()
+    handlers = [logging.StreamHandler(terminal), logging.FileHandler(tmp_path / 'rpa.log')]
+    for handler in handlers:
+        raiz.addHandler(handler)
+    yield terminal, tmp_path / 'rpa.log'
+    for handler in handlers:
+        raiz.removeHandler(handler)
+        handler.close()
+
+
+def test_log_da_thread_so_chega_ao_terminal_em_obter(log, monkeypatch):
+    terminal, arquivo = log
+    monkeypatch.setattr(rpa_notas_fiscais, 'RPANotasFiscais', RPAFalso)
+    stdout = sys.stdout
+
+    navegador = NavegadorEmSegundoPlano('http://localhost/', 'notas.xlsx')
+    navegador.thread.join()
+    assert sys.stdout is stdout
+    assert terminal.getvalue() == ''
+    assert 'ChromeDriver configurado' in arquivo.read_text(encoding='utf-8')
+
+    inicio = navegador.obter()
+    assert isinstance(inicio.rpa, RPAFalso) and inicio.erro is None
+    assert 'abertura do Chrome (em segundo plano)' in inicio.tempos
+    assert 'ChromeDriver configurado' in terminal.getvalue()
+    # Depois de obter(), a thread principal volta a escrever direto no terminal
+    logging.getLogger('rpa_falso').warning("processando")
+    assert 'processando' in terminal.getvalue()
+
+
+def test_falha_na_abertura_vem_no_resultado(log, monkeypatch, capsys):
+    monkeypatch.setattr(rpa_notas_fiscais, 'RPANotasFiscais', RPASemChrome)
+
+    navegador = NavegadorEmSegundoPlano('http://localhost/', 'notas.xlsx')
+    inicio = navegador.obter()
+    assert inicio.rpa is None and isinstance(inicio.erro, RuntimeError)
+    navegador.obter()
+    assert capsys.readouterr().out.count('Chrome não encontrado') == 1
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import rpa_notas_fiscais
+from rpa_notas_fiscais import RPANotasFiscais
+
+LINHAS = [
+    ['ANA SOUZA', '529.982.247-25', 'Consulta', '150,50', datetime(2024, 3, 1), 'Campinas', 'AV BRASIL, 1500'],
+    ['BRUNO LIMA', 52998224725, 'Vacina', 80, '05/04/24', None, None],
+    ['CARLA DIAS', '1234567890', 'Banho', 'abc', None, 'Santos', 'SEM NUMERO'],
+    ['DANIEL REIS', None, 'Tosa', None, 'data ruim', '', 'PC DA SÉ, 10'],
+    ['ELISA MOTA', '52998224725.0', 'Consulta', 99.9, datetime(2024, 1, 2), 'Itu', 'R DAS FLORES, 25'],
+]
+COLUNAS = ['Nome_Cliente', 'CPF', 'Nome_Item', 'Valor', 'Data', 'Cidade', 'Endereco']
+
+
+@pytest.mark.parametrize('cliente, colunas', [
+    ('cliente_a', COLUNAS),
+    ('cliente_b', [coluna for coluna in COLUNAS if coluna not in ('Data', 'Cidade')]),
+])
+def test_streaming_e_leitura_completa_geram_as_mesmas_notas(tmp_path, monkeypatch, cliente, colunas):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rpa_notas_fiscais, 'TAMANHO_BLOCO_STREAMING', 2)
+    planilha = str(tmp_path / 'notas.xlsx')
+    pd.DataFrame(LINHAS, columns=COLUNAS)[colunas].to_excel(planilha, index=False)
+    rpa = RPANotasFiscais('http://localhost/', planilha, cliente, caminho_diario=None, usar_cache_cpf=False,
+                          caminho_tempos=None, caminho_catalogo=None)
+
+    completa = rpa_notas_fiscais.notas_do_dataframe(rpa.ler_dados_excel())
+    streaming = list(rpa.ler_dados_excel_streaming())
+
+    assert [index for index, _ in streaming] == list(range(len(LINHAS)))
+    pd.testing.assert_frame_equal(pd.DataFrame([nota._asdict() for _, nota in streaming]),
+                                  pd.DataFrame([nota._asdict() for nota in completa]))
@@ -0,0 +1,36 @@
+import pytest
+
+from perfis_navegador import LoginSemJanela
+from rpa_notas_fiscais import RPANotasFiscais
+
+
+class DriverSemSessao:
+    """Página de login no lugar da página de emissão"""
+
+    def execute_script(self, script, *argumentos):
+        return False
+
+
+def criar_rpa(perfil, inicio_rapido=True):
+    rpa = RPANotasFiscais('http://localhost/', None, 'cliente_a', caminho_diario=None, usar_cache_cpf=False,
+                          caminho_tempos=None, caminho_catalogo=None, perfil_navegador=perfil,
+                          inicio_rapido=inicio_rapido)
+    rpa.driver = DriverSemSessao()
+    return rpa
+
+
+def test_login_sem_janela_interrompe_em_vez_de_esperar_enter(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('builtins.input', lambda *_: pytest.fail("input() sem janela para o login"))
+
+    with pytest.raises(LoginSemJanela):
+        criar_rpa('desempenho').aguardar_login()
+
+
+def test_login_com_janela_pede_enter(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pedidos = []
+    monkeypatch.setattr('builtins.input', pedidos.append)
+
+    criar_rpa('leve').aguardar_login()
+    assert len(pedidos) == 1
@@ -0,0 +1,71 @@
+from opcoes_dropdown import CacheOpcoesDropdown, IndiceOpcoes
+
+UFS = [('', 'Selecione'), ('SP', 'SP'), ('RJ', 'RJ')]
+
+
+class Pagina:
+    """Conta as leituras de opções feitas ao navegador"""
+
+    def __init__(self, opcoes):
+        self.opcoes = opcoes
+        self.leituras = []
+
+    def carregar(self, element_id):
+        self.leituras.append(element_id)
+        return self.opcoes[element_id]
+
+
+def test_workers_compartilham_listas_fixas_e_isolam_dependentes():
+    principal = CacheOpcoesDropdown()
+    pagina_1 = Pagina({'frmConteudo:somUfT': UFS,
+                       'frmConteudo:somMunicipioT': [('', 'Selecione'), ('1', 'CAMPINAS')]})
+    pagina_2 = Pagina({'frmConteudo:somUfT': UFS,
+                       'frmConteudo:somMunicipioT': [('', 'Selecione'), ('2', 'NITERÓI')]})
+    worker_1 = CacheOpcoesDropdown(compartilhado=principal)
+    worker_2 = CacheOpcoesDropdown(compartilhado=principal)
+
+    assert worker_1.indice('frmConteudo:somUfT', pagina_1.carregar) is \
+        worker_2.indice('frmConteudo:somUfT', pagina_2.carregar)
+    assert pagina_2.leituras == []
+
+    assert worker_1.indice('frmConteudo:somMunicipioT', pagina_1.carregar).procurar('CAMPINAS')[0] == '1'
+    assert worker_2.indice('frmConteudo:somMunicipioT', pagina_2.carregar).procurar('NITEROI')[0] == '2'
+    assert 'frmConteudo:somMunicipioT' not in principal
+
+
+def test_lista_so_com_placeholder_nao_e_guardada():
+    cache = CacheOpcoesDropdown()
+    pagina = Pagina({'frmConteudo:somMunicipioT': [('', 'Selecione')]})
+    cache.obter('frmConteudo:somMunicipioT', pagina.carregar)
+    cache.obter('frmConteudo:somMunicipioT', pagina.carregar)
+    assert len(pagina.leituras) == 2
+    assert 'frmConteudo:somMunicipioT' not in cache
+
+
+def test_prefixo_escolhe_o_rotulo_mais_curto():
+    indice = IndiceOpcoes([('', 'Selecione'), ('1', 'SÃO CARLOS'), ('2', 'SÃO PAULO'), ('3', 'SANTOS')])
+
+    assert indice.procurar('sao') == ('2', 'SÃO PAULO', 'prefixo')
+    assert indice.procurar('SAO CAR') == ('1', 'SÃO CARLOS', 'prefixo')
+    assert indice.procurar('São Paulo') == ('2', 'SÃO PAULO', 'texto normalizado')
+
+
+def test_placeholder_nao_entra_no_prefixo():
+    indice = IndiceOpcoes([('', 'Selecione'), ('1', 'SERRANA')])
+
+    assert indice.procurar('SEL') is None
+    assert indice.procurar('Selecione') == ('', 'Selecione', 'texto exato')
+
+
+def test_empate_na_busca_aproximada_nao_escolhe_nenhuma():
+    indice = IndiceOpcoes([('1', 'CAMPINAX'), ('2', 'CAMPINAY')])
+
+    assert indice.procurar('CAMPINAS') is None
+
+
+def test_busca_aproximada_sem_empate():
+    indice = IndiceOpcoes([('1', 'CAMPINAS'), ('2', 'CAMPO LIMPO')])
+
+    value, label, criterio = indice.procurar('CAMPINSA')
+    assert (value, label) == ('1', 'CAMPINAS')
+    assert criterio.startswith('aproximada')
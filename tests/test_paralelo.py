@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from rpa_notas_fiscais import RPANotasFiscais
+
+
+class DriverLogado:
+    def execute_script(self, script, *argumentos):
+        return True  # Página de emissão já aberta (sessão salva)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def planilha(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('builtins.input', lambda *_: '')
+    monkeypatch.setattr(RPANotasFiscais, 'configurar_driver', lambda self: setattr(self, 'driver', DriverLogado()))
+    monkeypatch.setattr(RPANotasFiscais, 'navegar_para_site', lambda self: None)
+    monkeypatch.setattr(RPANotasFiscais, 'atualizar_catalogo_municipios', lambda self: None)
+    caminho = str(tmp_path / 'notas.xlsx')
+    pd.DataFrame({
+        'Nome_Cliente': [f'CLIENTE {i}' for i in range(7)],
+        'CPF': ['52998224725'] * 7,
+        'Nome_Item': ['Consulta'] * 7,
+        'Valor': [100 + i for i in range(7)],
+    }).to_excel(caminho, index=False)
+    return caminho
+
+
+def criar_rpa(caminho, **opcoes):
+    return RPANotasFiscais('http://localhost/', caminho, 'cliente_a', caminho_diario=None, usar_cache_cpf=False,
+                           caminho_tempos=None, caminho_catalogo=None, inicio_rapido=True, **opcoes)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_workers_consomem_todos_os_registros(planilha, monkeypatch, streaming):
+    preenchidos = []
+    monkeypatch.setattr(RPANotasFiscais, 'preencher_nota',
+                        lambda self, linha, plano=None: preenchidos.append((self.numero_worker, linha.Valor)) or True)
+    rpa = criar_rpa(planilha, leitura_streaming=streaming)
+    if streaming:
+        monkeypatch.setattr(rpa, 'ler_dados_excel', lambda: pytest.fail("leitura completa com --streaming"))
+
+    rpa.processar_notas_paralelo(modo_teste=True, num_workers=3)
+
+    assert sorted(valor for _, valor in preenchidos) == [100.0 + i for i in range(7)]
+
+
+def test_modo_teste_confirma_cada_nota_e_nao_conta_como_emitida(planilha, monkeypatch, capsys):
+    confirmacoes = []
+    monkeypatch.setattr('builtins.input', lambda mensagem='': confirmacoes.append(mensagem) or '')
+    monkeypatch.setattr(RPANotasFiscais, 'preencher_nota', lambda self, linha, plano=None: True)
+    monkeypatch.setattr(RPANotasFiscais, 'emitir_nota_registrada',
+                        lambda self, *args: pytest.fail("emissão no modo teste"))
+
+    resultados = criar_rpa(planilha).processar_notas_paralelo(modo_teste=True, num_workers=2)
+
+    assert len([mensagem for mensagem in confirmacoes if 'preenchido' in mensagem]) == 7
+    assert sum(resultado['preenchidas'] for resultado in resultados.values()) == 7
+    assert sum(resultado['sucessos'] for resultado in resultados.values()) == 0
+    saida = capsys.readouterr().out
+    assert 'Preenchidas (não emitidas): 7' in saida
+    assert 'Vazão total' not in saida
@@ -0,0 +1,38 @@
+import pytest
+
+from rpa_notas_fiscais import RPANotasFiscais
+
+OPCOES = {
+    'frmConteudo:somAtividade': [('', 'Selecione'), ('501', '501 - SERVIÇOS VETERINÁRIOS'),
+                                 ('508', '508 - SERVIÇOS DE SAÚDE ANIMAL')],
+    'frmConteudo:somExigibilidade': [('', 'Selecione'), ('1', 'EXIGÍVEL'), ('2', 'NÃO INCIDÊNCIA')],
+    'frmConteudo:somUfT': [('', 'Selecione'), ('SP', 'SP'), ('RJ', 'RJ')],
+}
+
+
+@pytest.fixture
+def rpa(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rpa = RPANotasFiscais('http://localhost/', None, 'cliente_a', caminho_diario=None, usar_cache_cpf=False,
+                          caminho_tempos=None, caminho_catalogo=None)
+    rpa.carregar_opcoes_dropdown = lambda element_id: OPCOES[element_id]
+    return rpa
+
+
+def test_plano_do_lote_leva_so_values_escolhidos_pelo_indice(rpa):
+    plano = [
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somAtividade', 'valor': '508'},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somExigibilidade', 'valor': 'exigivel'},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somUfT', 'valor': 'SP'},
+        {'tipo': 'dropdown', 'id': 'frmConteudo:somMunicipioT', 'valor': 'CAMPINAS'},
+        {'tipo': 'campo', 'id': 'frmConteudo:itValorServico', 'valor': '150,00'},
+    ]
+    resolvido = rpa.resolver_dropdowns_plano(plano)
+    assert [passo['valor'] for passo in resolvido] == ['508', '1', 'SP', 'CAMPINAS', '150,00']
+    # O plano preparado na thread de fundo não é alterado
+    assert plano[1]['valor'] == 'exigivel'
+
+
+def test_opcao_inexistente_fica_para_o_preenchimento_individual(rpa):
+    plano = [{'tipo': 'dropdown', 'id': 'frmConteudo:somExigibilidade', 'valor': 'IMUNE'}]
+    assert rpa.resolver_dropdowns_plano(plano) == plano
@@ -0,0 +1,48 @@
+import time
+
+from rastreamento import Rastreador
+
+
+class Etapas:
+    def ler(self, quantidade):
+        for numero in range(quantidade):
+            time.sleep(0.01)
+            yield numero
+
+    def processar(self, quantidade):
+        lidos = []
+        for numero in self.ler(quantidade):
+            time.sleep(0.02)
+            lidos.append(numero)
+        return lidos
+
+
+def test_gerador_e_medido_durante_a_iteracao():
+    rastreador = Rastreador()
+    etapas = rastreador.instrumentar(Etapas())
+
+    assert etapas.processar(3) == [0, 1, 2]
+    resumo = {etapa['etapa']: etapa for etapa in rastreador.resumo()}
+    # Um span por item mais o avanço final que encerra o gerador
+    assert resumo['ler']['chamadas'] == 4
+    assert resumo['ler']['total_ms'] >= 30
+    # O tempo do gerador conta como filho de quem consome, não como tempo próprio
+    assert resumo['processar']['proprio_ms'] >= 60
+    assert resumo['processar']['total_ms'] >= resumo['processar']['proprio_ms'] + 30
+
+
+def test_gerador_interrompido_e_fechado():
+    fechados = []
+
+    class Parcial:
+        def ler(self):
+            try:
+                yield from range(10)
+            finally:
+                fechados.append(True)
+
+    rastreador = Rastreador()
+    leitura = rastreador.instrumentar(Parcial()).ler()
+    assert next(leitura) == 0
+    leitura.close()
+    assert fechados == [True]
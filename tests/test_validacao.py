@@ -0,0 +1,40 @@
+import pandas as pd
+
+from validacao import cpf_valido, digitos_cpf_validos, normalizar_cpf, normalizar_cpf_serie, validar_dados
+
+
+def test_digitos_verificadores():
+    assert cpf_valido('52998224725')
+    assert not cpf_valido('52998224724')
+    assert not cpf_valido('52998224715')
+    assert not cpf_valido('11111111111')
+    assert not cpf_valido('5299822472')
+
+
+def test_serie_e_escalar_concordam():
+    brutos = pd.Series(['529.982.247-25', 52998224725.0, '1234567890', None, 'zero'])
+    normalizados = normalizar_cpf_serie(brutos)
+
+    assert list(normalizados) == [normalizar_cpf(cpf) for cpf in brutos]
+    assert list(digitos_cpf_validos(normalizados)) == [cpf_valido(cpf) for cpf in normalizados]
+
+    # Todos os DV possíveis de algumas bases, válidos e inválidos
+    candidatos = pd.Series([f"{base}{dv:02d}" for base in ('529982247', '123456789', '000000001')
+                            for dv in range(100)])
+    assert list(digitos_cpf_validos(candidatos)) == [cpf_valido(cpf) for cpf in candidatos]
+    assert sum(map(cpf_valido, candidatos)) == 3
+
+
+def test_validar_dados_separa_formato_e_digito():
+    df = pd.DataFrame({
+        'Nome_Cliente': ['ANA', None, 'CARLOS'],
+        'Nome_Pet': ['REX', 'MIA', 'TOM'],
+        'CPF': ['529.982.247-25', '529.982.247-24', '123456789012'],
+        'Valor': ['150,00', 'abc', 80],
+    })
+    mascara = validar_dados(df)
+
+    assert list(mascara['cpf_digito']) == [False, True, False]
+    assert list(mascara['cpf_formato']) == [False, False, True]
+    assert list(mascara['valor_invalido']) == [False, True, False]
+    assert list(mascara['Nome_Cliente_vazio']) == [False, True, False]
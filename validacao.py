@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Validação e normalização dos dados da planilha de notas fiscais
+Módulo único usado pelo iniciar_rpa.py (validação e estatísticas) e pelo RPA,
+com operações vetorizadas do pandas/NumPy para que todos cheguem ao mesmo resultado
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_OBRIGATORIAS = ['Nome_Cliente', 'Nome_Pet', 'CPF', 'Valor']
+COLUNAS_OPCIONAIS = ['Data', 'Cidade', 'Endereco']
+# Colunas opcionais criadas vazias quando ausentes, para os clientes que as usam no formulário
+COLUNAS_VAZIAS_CLIENTE = {'cliente_b': ['Cidade', 'Endereco']}
+FORMATO_DATA = '%d/%m/%y'
+# Incrementar ao mudar normalizar_planilha: invalida as planilhas normalizadas em cache
+VERSAO_NORMALIZACAO = 1
+
+# Pesos do cálculo dos dígitos verificadores do CPF
+_PESOS_DV1 = np.arange(10, 1, -1)
+_PESOS_DV2 = np.arange(11, 1, -1)
+
+_RE_FINAL_PONTO_ZERO = re.compile(r'\.0$')
+_RE_NAO_DIGITO = re.compile(r'[^\d]')
+
+
+def limpar_cpf_serie(serie):
+    """Remove formatação do CPF (pontos, traços, '.0' de float) sem completar com zeros"""
+    # Vazios viram '00000000000' explicitamente: astype(str) trata NaN de forma diferente entre versões do pandas
+    cpfs = serie.astype(object).where(serie.notna(), '00000000000').astype(str)
+    cpfs = cpfs.str.replace('zero', '0', regex=False).str.replace('nan', '00000000000', regex=False)
+    cpfs = cpfs.str.replace(_RE_FINAL_PONTO_ZERO, '', regex=True)
+    return cpfs.str.replace(_RE_NAO_DIGITO, '', regex=True)
+
+
+def normalizar_cpf_serie(serie):
+    """Normaliza a coluna de CPF para 11 dígitos (mesmas regras usadas pelo RPA)"""
+    return limpar_cpf_serie(serie).str.zfill(11)
+
+
+def normalizar_cpf(cpf):
+    """Normaliza um CPF isolado com as mesmas regras de normalizar_cpf_serie"""
+    if cpf is None or (not isinstance(cpf, str) and pd.isna(cpf)):
+        cpf = '00000000000'
+    cpf = str(cpf).replace('zero', '0').replace('nan', '00000000000')
+    cpf = _RE_FINAL_PONTO_ZERO.sub('', cpf)
+    return _RE_NAO_DIGITO.sub('', cpf).zfill(11)
+
+
+def normalizar_valor_serie(serie):
+    """Converte a coluna Valor para número, aceitando vírgula decimal (inválidos viram NaN)"""
+    return pd.to_numeric(serie.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def normalizar_data_serie(serie):
+    """Converte a coluna Data (datas do Excel ou texto DD/MM/AA) para datetime; vazias e inválidas viram NaT"""
+    return pd.to_datetime(serie, format=FORMATO_DATA, errors='coerce')
+
+
+def normalizar_planilha(df, cliente=None):
+    """
+    Normaliza a planilha bruta para o RPA; usada pela leitura completa e, em blocos, pela leitura em streaming
+
+    Args:
+        df (pd.DataFrame): Dados brutos lidos do Excel
+        cliente (str): Cliente do mapeamento, define as colunas opcionais criadas vazias
+
+    Returns:
+        pd.DataFrame: Cópia com CPF de 11 dígitos, Valor numérico (NaN se inválido) e Data
+        datetime (NaT se vazia, inválida ou sem a coluna)
+    """
+    df = df.copy()
+    # Sem CPF ou Valor a planilha é recusada pela validação; aqui só não há o que normalizar
+    if 'CPF' in df.columns:
+        df['CPF'] = normalizar_cpf_serie(df['CPF'])
+    if 'Valor' in df.columns:
+        df['Valor'] = normalizar_valor_serie(df['Valor'])
+    df['Data'] = normalizar_data_serie(df['Data']) if 'Data' in df.columns else pd.NaT
+    return completar_colunas_cliente(df, cliente)
+
+
+def completar_colunas_cliente(df, cliente):
+    """Cria vazias as colunas opcionais que o cliente usa e a planilha não trouxe"""
+    faltando = [coluna for coluna in COLUNAS_VAZIAS_CLIENTE.get(cliente, []) if coluna not in df.columns]
+    if faltando:
+        df = df.assign(**{coluna: '' for coluna in faltando})
+    return df
+
+
+def digitos_cpf_validos(cpfs):
+    """
+    Verifica os dígitos verificadores de uma série de CPFs normalizados
+
+    Args:
+        cpfs (pd.Series): CPFs já normalizados (strings)
+
+    Returns:
+        pd.Series: True para os CPFs com 11 dígitos, não repetidos e com DV correto
+    """
+    cpfs = cpfs.astype(str)
+    formato_ok = (cpfs.str.len() == 11) & cpfs.str.isdigit()
+    validos = pd.Series(False, index=cpfs.index)
+    if not formato_ok.any():
+        return validos
+
+    candidatos = cpfs[formato_ok]
+    digitos = (np.frombuffer(''.join(candidatos).encode('ascii'), dtype=np.uint8) - 48).reshape(-1, 11).astype(np.int64)
+
+    dv1 = (digitos[:, :9] @ _PESOS_DV1) * 10 % 11 % 10
+    dv2 = (digitos[:, :10] @ _PESOS_DV2) * 10 % 11 % 10
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+
+    validos[formato_ok] = (dv1 == digitos[:, 9]) & (dv2 == digitos[:, 10]) & ~repetidos
+    return validos
+
+
+def cpf_valido(cpf):
+    """Versão escalar de digitos_cpf_validos para um CPF normalizado (uma nota por vez)"""
+    cpf = str(cpf)
+    if len(cpf) != 11 or not (cpf.isascii() and cpf.isdigit()) or cpf == cpf[0] * 11:
+        return False
+    digitos = [int(digito) for digito in cpf]
+    dv1 = sum(d * peso for d, peso in zip(digitos, range(10, 1, -1))) * 10 % 11 % 10
+    dv2 = sum(d * peso for d, peso in zip(digitos, range(11, 1, -1))) * 10 % 11 % 10
+    return dv1 == digitos[9] and dv2 == digitos[10]
+
+
+def validar_dados(df, colunas_obrigatorias=None):
+    """
+    Valida a planilha inteira de forma vetorizada
+
+    Args:
+        df (pd.DataFrame): Dados brutos lidos do Excel
+        colunas_obrigatorias (list): Colunas cujo valor vazio é considerado problema
+
+    Returns:
+        pd.DataFrame: Máscara booleana por linha, uma coluna por tipo de problema:
+            '<coluna>_vazio', 'cpf_formato', 'cpf_digito' e 'valor_invalido'
+    """
+    colunas_obrigatorias = COLUNAS_OBRIGATORIAS if colunas_obrigatorias is None else colunas_obrigatorias
+    mascara = pd.DataFrame(index=df.index)
+
+    for coluna in colunas_obrigatorias:
+        if coluna in df.columns:
+            mascara[f'{coluna}_vazio'] = df[coluna].isna()
+
+    if 'CPF' in df.columns:
+        presente = df['CPF'].notna()
+        digitos = limpar_cpf_serie(df['CPF'])
+        tamanho = digitos.str.len()
+        mascara['cpf_formato'] = presente & ((tamanho == 0) | (tamanho > 11))
+        mascara['cpf_digito'] = presente & ~mascara['cpf_formato'] & ~digitos_cpf_validos(digitos.str.zfill(11))
+
+    if 'Valor' in df.columns:
+        mascara['valor_invalido'] = df['Valor'].notna() & normalizar_valor_serie(df['Valor']).isna()
+
+    return mascara
+
+
+def contar_problemas(mascara):
+    """Retorna {tipo_de_problema: quantidade} apenas para os problemas encontrados"""
+    contagem = mascara.sum()
+    return {coluna: int(total) for coluna, total in contagem.items() if total > 0}
+
+
+def linhas_com_problema(mascara):
+    """Série booleana indicando as linhas com pelo menos um problema"""
+    if mascara.empty:
+        return pd.Series(False, index=mascara.index)
+    return mascara.any(axis=1)